@@ -0,0 +1,232 @@
+"""Benchmarks the decode, collect and write phases on synthetic logs.
+
+Run from the repository root, e.g.
+
+    PYTHONPATH=src python -m benchmarks.run --logs 10,100 --ranks 4,16 \
+        --segments 100 --save benchmarks/baselines/mine.json
+    PYTHONPATH=src python -m benchmarks.run --logs 10,100 --ranks 4,16 \
+        --segments 100 --compare benchmarks/baselines/mine.json
+
+Every case (one per combination of `--logs`, `--ranks` and
+`--segments`) reports, per phase, the best wall time over `--repeat`
+runs, the rows and logs handled per second, and the peak memory of a
+separate, traced run. One more case per `--index-jobs` builds a
+`FingerprintIndex` of that many random jobs and times a top-10 query;
+a million jobs should be searched in about 20 milliseconds.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from wfmeta_darshan import write_logs
+from wfmeta_darshan.objs import Log, LogCollection
+from wfmeta_darshan.objs.fingerprint import FingerprintIndex, fingerprint_features
+from wfmeta_darshan.objs.writers import make_writer
+from .synthetic import SyntheticReport
+
+format_version: int = 1
+phases: List[str] = ["decode", "collect", "write"]
+index_phases: List[str] = ["build", "query"]
+
+##############################
+# phases                     #
+##############################
+
+def _decode(reports: List[SyntheticReport], compact: bool) -> List[Log] :
+    return [Log(report, compact=compact).load() for report in reports]
+
+def _collect(logs: List[Log]) -> int :
+    # Counts the rows, so every table is really built.
+    coll: LogCollection = LogCollection(logs)
+    return sum(len(df) for m in LogCollection.module_tables for df in coll.get_module_as_df(m).values())
+
+def _write(logs: List[Log], output_format: str) -> None :
+    with tempfile.TemporaryDirectory() as output_loc :
+        writer = make_writer(output_loc, output_format)
+        write_logs(logs, writer)
+        writer.close()
+
+def _measure(run: Callable[[], Any], repeat: int) -> Tuple[float, float] :
+    """Returns the best time of `repeat` runs, and the peak memory of one more.
+
+    Memory is measured on its own run, as tracing slows everything down.
+    It counts Python and numpy allocations (through tracemalloc) and
+    those of Arrow's memory pool.
+    """
+    best: float = float("inf")
+    for _ in range(repeat) :
+        start: float = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    pool = pa.default_memory_pool()
+    arrow_before: int = pool.bytes_allocated()
+    pool.release_unused()
+    tracemalloc.start()
+    try :
+        run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally :
+        tracemalloc.stop()
+    arrow_peak: int = max(0, pool.max_memory() - arrow_before)
+
+    return best, (traced_peak + arrow_peak) / 2**20
+
+##############################
+# cases                      #
+##############################
+
+def run_case(n_logs: int, n_ranks: int, segments: int, files_per_rank: int,
+             repeat: int, output_format: str, compact: bool) -> Dict[str, Any] :
+    reports: List[SyntheticReport] = [SyntheticReport(jobid, n_ranks, files_per_rank, segments)
+                                      for jobid in range(n_logs)]
+    logs: List[Log] = _decode(reports, compact)
+    rows: Dict[str, int] = {"decode": _collect(logs)}
+    rows["collect"] = rows["decode"]
+    rows["write"] = rows["decode"]
+
+    # collect and write start from the same decoded logs every time, so
+    #   each phase only measures its own work.
+    runs: Dict[str, Callable[[], Any]] = {"decode": lambda: _decode(reports, compact),
+                                          "collect": lambda: _collect(logs),
+                                          "write": lambda: _write(logs, output_format)}
+
+    results: Dict[str, Dict[str, float]] = {}
+    for phase in phases :
+        seconds, peak_mb = _measure(runs[phase], repeat)
+        results[phase] = {"seconds": seconds,
+                          "rows": rows[phase],
+                          "rows_per_sec": rows[phase] / seconds,
+                          "logs_per_sec": n_logs / seconds,
+                          "peak_mb": peak_mb}
+
+    return {"name": "logs=%i,ranks=%i,segments=%i" % (n_logs, n_ranks, segments),
+            "params": {"logs": n_logs, "ranks": n_ranks, "segments": segments,
+                       "files_per_rank": files_per_rank, "format": output_format, "compact": compact},
+            "phases": results}
+
+def run_index_case(n_jobs: int, repeat: int) -> Dict[str, Any] :
+    rng = np.random.default_rng(0)
+    vectors: np.ndarray = rng.random((n_jobs, len(fingerprint_features)), dtype=np.float32)
+    query: np.ndarray = rng.random(len(fingerprint_features))
+    index: FingerprintIndex = FingerprintIndex(np.arange(n_jobs), np.zeros(n_jobs), vectors)
+
+    runs: Dict[str, Callable[[], Any]] = {"build": lambda: FingerprintIndex(np.arange(n_jobs), np.zeros(n_jobs), vectors),
+                                          "query": lambda: index.query(query, k=10)}
+
+    results: Dict[str, Dict[str, float]] = {}
+    for phase in index_phases :
+        seconds, peak_mb = _measure(runs[phase], repeat)
+        results[phase] = {"seconds": seconds,
+                          "rows": n_jobs,
+                          "rows_per_sec": n_jobs / seconds,
+                          "logs_per_sec": n_jobs / seconds,
+                          "peak_mb": peak_mb}
+
+    return {"name": "fingerprints=%i" % n_jobs,
+            "params": {"jobs": n_jobs},
+            "phases": results}
+
+def environment() -> Dict[str, Any] :
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "pyarrow": pa.__version__}
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str] :
+    """Lists the phases whose time or peak memory grew over `baseline` by more than `tolerance`."""
+    regressions: List[str] = []
+    old: Dict[str, Any] = {case["name"]: case for case in baseline["cases"]}
+    for case in results["cases"] :
+        if case["name"] not in old :
+            continue
+        for phase, now in case["phases"].items() :
+            before = old[case["name"]]["phases"].get(phase)
+            if before is None :
+                continue
+            ratio: float = now["seconds"] / before["seconds"]
+            mem_ratio: float = now["peak_mb"] / max(before["peak_mb"], 1e-9)
+            print("%-36s %-8s time x%.2f  memory x%.2f" % (case["name"], phase, ratio, mem_ratio))
+            if ratio > 1 + tolerance :
+                regressions.append("%s %s time x%.2f" % (case["name"], phase, ratio))
+            if mem_ratio > 1 + tolerance :
+                regressions.append("%s %s memory x%.2f" % (case["name"], phase, mem_ratio))
+    return regressions
+
+def _report(case: Dict[str, Any]) -> Dict[str, Any] :
+    for phase, r in case["phases"].items() :
+        print("%-36s %-8s %8.3fs %12.0f rows/s %8.1f logs/s %8.1f MiB" %
+              (case["name"], phase, r["seconds"], r["rows_per_sec"], r["logs_per_sec"], r["peak_mb"]))
+    return case
+
+def int_list(arg: str) -> List[int] :
+    return [int(x) for x in arg.split(",") if x.strip() != ""]
+
+def main(argv: List[str]) -> int :
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description="Benchmark wfmeta_darshan on synthetic logs.")
+    parser.add_argument("--logs", type=int_list, default=[10, 100],
+                        help="Comma-separated numbers of logs per case.")
+    parser.add_argument("--ranks", type=int_list, default=[4],
+                        help="Comma-separated numbers of ranks per log.")
+    parser.add_argument("--segments", type=int_list, default=[100],
+                        help="Comma-separated numbers of DXT segments per file.")
+    parser.add_argument("--index-jobs", type=int_list, default=[1000000],
+                        help="Comma-separated numbers of jobs per fingerprint index case; empty for none.")
+    parser.add_argument("--files-per-rank", type=int, default=8,
+                        help="Number of files each rank opens.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of timed runs per phase; the best one counts.")
+    parser.add_argument("-f", "--format", default="csv",
+                        help="Output format of the write phase.")
+    parser.add_argument("--compact", action="store_true",
+                        help="Decode with the compact schema.")
+    parser.add_argument("--save", default=None,
+                        help="Write the results to this JSON file, e.g. as a new baseline.")
+    parser.add_argument("--compare", default=None,
+                        help="Compare the results to this JSON baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Growth in time or peak memory over the baseline that counts as a regression. "
+                             "Defaults to 0.25 (25%%).")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"version": format_version, "environment": environment(), "cases": []}
+    for n_logs in args.logs :
+        for n_ranks in args.ranks :
+            for segments in args.segments :
+                results["cases"].append(_report(run_case(n_logs, n_ranks, segments, args.files_per_rank,
+                                                         args.repeat, args.format, args.compact)))
+    for n_jobs in args.index_jobs :
+        results["cases"].append(_report(run_index_case(n_jobs, args.repeat)))
+
+    if args.save is not None :
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f :
+            json.dump(results, f, indent=1)
+
+    if args.compare is not None :
+        with open(args.compare) as f :
+            baseline: Dict[str, Any] = json.load(f)
+        if baseline.get("version") != format_version :
+            print("Baseline %s has format version %s, not %i." % (args.compare, baseline.get("version"), format_version))
+            return 2
+        regressions: List[str] = compare(results, baseline, args.tolerance)
+        if len(regressions) > 0 :
+            print("Regressed against the baseline: %s" % "; ".join(regressions))
+            return 1
+
+    return 0
+
+if __name__ == "__main__" :
+    sys.exit(main(sys.argv[1:]))
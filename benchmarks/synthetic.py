@@ -0,0 +1,117 @@
+"""Synthetic stand-ins for pydarshan reports, for benchmarking at scale.
+
+`SyntheticReport` builds something that looks enough like a
+`darshan.DarshanReport` with all its records read for `Log` to decode
+it: job metadata, a module list, and per-module record collections
+whose iteration and `to_df()` give the same shapes as pydarshan's.
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from darshan.backend.cffi_backend import counter_names, fcounter_names
+
+# pydarshan has no counter name tables for LUSTRE components.
+lustre_columns: List[str] = ['LUSTRE_COMP_STRIPE_SIZE', 'LUSTRE_COMP_STRIPE_COUNT',
+                             'LUSTRE_COMP_STRIPE_PATTERN', 'LUSTRE_COMP_FLAGS',
+                             'LUSTRE_COMP_EXT_START', 'LUSTRE_COMP_EXT_END',
+                             'LUSTRE_COMP_MIRROR_ID']
+
+class SyntheticRecords :
+    """Stands in for the `DarshanRecordCollection` of one module."""
+    module_name: str
+    records: List[Dict[str, Any]]
+
+    def __init__(self, module_name: str, records: List[Dict[str, Any]]) :
+        self.module_name = module_name
+        self.records = records
+
+    def __iter__(self) :
+        return iter(self.records)
+
+    def __len__(self) -> int :
+        return len(self.records)
+
+    def _frame(self, key: str, columns: List[str]) -> pd.DataFrame :
+        df = pd.DataFrame(np.stack([r[key] for r in self.records]) if len(self.records) > 0
+                          else np.empty((0, len(columns))), columns=columns)
+        df.insert(0, 'rank', np.array([r['rank'] for r in self.records], dtype=np.int64))
+        df.insert(1, 'id', np.array([r['id'] for r in self.records], dtype=np.uint64))
+        return df
+
+    def to_df(self) -> Dict[str, pd.DataFrame] :
+        if self.module_name == "LUSTRE" :
+            df = self._frame('counters', lustre_columns)
+            df['LUSTRE_POOL_NAME'] = ""
+            df['LUSTRE_OST_IDS'] = ["[%i]" % (r['rank'] % 8) for r in self.records]
+            return {'components': df}
+
+        return {'counters': self._frame('counters', counter_names(self.module_name)),
+                'fcounters': self._frame('fcounters', fcounter_names(self.module_name))}
+
+class SyntheticReport :
+    """Stands in for a `DarshanReport` with every record read."""
+    metadata: Dict[str, Any]
+    filename: str
+    modules: Dict[str, Any]
+    records: Dict[str, SyntheticRecords]
+    name_records: Dict[int, str]
+
+    def __init__(self, jobid: int, n_ranks: int = 4, files_per_rank: int = 8,
+                 segments_per_file: int = 100, modules: Optional[List[str]] = None,
+                 seed: int = 0) :
+        """Builds the records of one job.
+
+        Every rank opens `files_per_rank` files, and does
+        `segments_per_file` DXT-traced reads and writes on each (split
+        evenly between the two).
+        """
+        if modules is None :
+            modules = ["POSIX", "LUSTRE", "STDIO", "DXT_POSIX"]
+        rng = np.random.default_rng(seed + jobid)
+
+        self.filename = "synthetic_id%i.darshan" % jobid
+        self.metadata = {'job': {'uid': 1000, 'jobid': jobid,
+                                 'start_time_sec': 1700000000, 'start_time_nsec': 0,
+                                 'end_time_sec': 1700000600, 'end_time_nsec': 0,
+                                 'nprocs': n_ranks, 'run_time': 600.0, 'log_ver': '3.41',
+                                 'metadata': {'lib_ver': '3.4.4', 'h': 'romio_no_indep_rw=true'}},
+                         'exe': 'synthetic'}
+        self.modules = {m: {} for m in modules}
+
+        ids: List[int] = [int(i) for i in rng.integers(1, 2**63, size=n_ranks * files_per_rank, dtype=np.uint64)]
+        ranks: List[int] = [i // files_per_rank for i in range(len(ids))]
+        self.name_records = {id: "/scratch/synthetic/job%i/rank%i/file%i" % (jobid, rank, i)
+                             for i, (rank, id) in enumerate(zip(ranks, ids))}
+
+        self.records = {}
+        for m in modules :
+            match m :
+                case "DXT_POSIX" :
+                    self.records[m] = SyntheticRecords(m, [SyntheticReport._dxt_record(rng, rank, id, segments_per_file)
+                                                           for rank, id in zip(ranks, ids)])
+                case "LUSTRE" :
+                    self.records[m] = SyntheticRecords(m, [{'rank': rank, 'id': id,
+                                                            'counters': rng.integers(-1, 1 << 20, len(lustre_columns))}
+                                                           for rank, id in zip(ranks, ids)])
+                case _ :
+                    n_c: int = len(counter_names(m))
+                    n_f: int = len(fcounter_names(m))
+                    self.records[m] = SyntheticRecords(m, [{'rank': rank, 'id': id,
+                                                            'counters': rng.integers(-1, 1 << 30, n_c),
+                                                            'fcounters': rng.random(n_f) * 600}
+                                                           for rank, id in zip(ranks, ids)])
+
+    @staticmethod
+    def _dxt_record(rng: np.random.Generator, rank: int, id: int, n_segments: int) -> Dict[str, Any] :
+        def segments(n: int) -> List[Dict[str, Any]] :
+            starts = np.sort(rng.random(n) * 600)
+            lengths = rng.integers(1, 1 << 20, n)
+            return [{'offset': int(o), 'length': int(l), 'start_time': float(s),
+                     'end_time': float(s) + 0.001, 'extra_info': 'pthread_id=%i' % (140000000000000 + rank)}
+                    for o, l, s in zip(np.cumsum(lengths) - lengths, lengths, starts)]
+
+        n_read: int = n_segments // 2
+        n_write: int = n_segments - n_read
+        return {'id': id, 'rank': rank, 'hostname': 'node%i' % (rank // 4),
+                'read_count': n_read, 'write_count': n_write,
+                'read_segments': segments(n_read), 'write_segments': segments(n_write)}
@@ -0,0 +1,219 @@
+import argparse
+import datetime
+import sys
+from typing import Any, List, Optional, Tuple
+from .objs.constants import expected_modules, output_formats, sample_methods
+from .objs.discovery import LogDiscovery, discover_log_files
+
+#####################################################
+# Command line                                      #
+#####################################################
+
+# Everything here only takes the standard library: `--help`, argument
+#   errors and the like answer right away. The pipeline (pandas,
+#   pyarrow, and pydarshan once a log is opened) is only imported by
+#   the command that is run.
+
+# Subcommands of the parser; see `create_parser`.
+commands: List[str] = ["aggregate", "inventory", "merge", "watch"]
+
+def shard_spec(arg: str) -> Tuple[int, int] :
+    """Parses a shard given as `i/N`, e.g. `0/4` for the first of four."""
+    try :
+        i, n = (int(x) for x in arg.split("/"))
+    except ValueError :
+        raise argparse.ArgumentTypeError("Expected a shard as i/N, e.g. 0/4; got %s." % arg)
+    if not 0 <= i < n :
+        raise argparse.ArgumentTypeError("Shard %s does not exist; i goes from 0 to N-1." % arg)
+    return (i, n)
+
+def module_list(arg: str) -> List[str] :
+    """Parses a comma-separated list of module names, e.g. `POSIX,STDIO`."""
+    modules: List[str] = [m.strip() for m in arg.split(",") if m.strip() != ""]
+    for m in modules :
+        if m not in expected_modules :
+            raise argparse.ArgumentTypeError("Unknown module %s; expected some of %s." % (m, ",".join(expected_modules)))
+    return modules
+
+def sample_spec(arg: str) -> Tuple[str, int, int] :
+    """Parses a DXT sampling given as `[method:]size[:seed]`, e.g. `time:1000`."""
+    parts: List[str] = arg.split(":")
+    method: str = parts.pop(0) if parts[0] in sample_methods else sample_methods[0]
+    try :
+        size, seed = int(parts[0]), int(parts[1]) if len(parts) == 2 else 0
+    except (ValueError, IndexError) :
+        raise argparse.ArgumentTypeError("Expected a sampling as [method:]size[:seed], with method one of %s; got %s." % (",".join(sample_methods), arg))
+    if len(parts) > 2 or size <= 0 :
+        raise argparse.ArgumentTypeError("Expected a sampling as [method:]size[:seed], with a positive size; got %s." % arg)
+    return (method, size, seed)
+
+def add_discovery_arguments(parser: argparse.ArgumentParser) -> None :
+    """Adds the options that choose which logs are read (see `LogDiscovery`)."""
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="Find logs in the whole directory tree under input, e.g. darshan's year/month/day log directories.")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB",
+                        help="Only read logs whose path relative to input matches this glob. Can be given more than once.")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB",
+                        help="Skip logs whose path relative to input matches this glob. Can be given more than once.")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, default=None, metavar="YYYY-MM-DD",
+                        help="Only read logs written on or after this day, going by their filename.")
+    parser.add_argument("--until", type=datetime.date.fromisoformat, default=None, metavar="YYYY-MM-DD",
+                        help="Only read logs written on or before this day, going by their filename.")
+    parser.add_argument("--partial", action="store_true",
+                        help="Also read .darshan_partial logs.")
+    parser.add_argument("--shard", type=shard_spec, default=None, metavar="i/N",
+                        help="Only read the i-th of N disjoint shares of the logs (from 0 to N-1), e.g. to split a run over N machines. See merge.")
+
+def discovery_from_args(args: argparse.Namespace) -> LogDiscovery :
+    return LogDiscovery(args.recursive, args.include, args.exclude, args.since, args.until, args.partial,
+                        args.shard)
+
+def create_parser() -> argparse.ArgumentParser :
+    """Builds the parser of the `wfmeta_darshan` command line, with a subparser per command."""
+    parser = argparse.ArgumentParser(prog="wfmeta_darshan")
+    subparsers = parser.add_subparsers(dest="command")
+
+    aggregate = subparsers.add_parser("aggregate",
+                                      help="Read and aggregate the darshan logs in a directory. The default command.")
+    aggregate.add_argument("input",
+                           help="Relative directory containing the darshan logs to parse and aggregate.")
+    aggregate.add_argument("-d", "--debug", action="store_true",
+                           help="If true, prints additional debug messages during runtime.")
+    aggregate.add_argument("-j", "--jobs", type=int, default=None,
+                           help="Number of worker processes used to read the logs. Defaults to the number of CPUs.")
+    aggregate.add_argument("-b", "--batch-size", type=int, default=None,
+                           help="Read and write the logs this many at a time, to bound memory use. By default, all logs are read at once.")
+    aggregate.add_argument("-f", "--format", choices=output_formats, default="csv",
+                           help="Format of the written tables. parquet and arrow write one dataset directory per table, partitioned by jobid.")
+    aggregate.add_argument("-w", "--write-jobs", type=int, default=4,
+                           help="Number of threads writing output tables at once. Defaults to 4.")
+    aggregate.add_argument("--incremental", action="store_true",
+                           help="Only read the logs that are new or changed since the last run into output, and append them to its existing data.")
+    aggregate.add_argument("-m", "--modules", type=module_list, default=None,
+                           help="Comma-separated list of modules to read and write, e.g. POSIX,STDIO. Defaults to all modules.")
+    aggregate.add_argument("--compact", action="store_true",
+                           help="Use the compact schema: uint64 record ids and categorical job keys.")
+    aggregate.add_argument("--cache-dir", default=None,
+                           help="Directory to cache decoded logs in, so later runs over the same logs skip decoding them.")
+    aggregate.add_argument("--cache-size", type=int, default=None,
+                           help="Size cap of the cache, in MiB. Least recently used logs are evicted first. Defaults to no cap.")
+    aggregate.add_argument("--profile", default=None,
+                           help="Profile the run with cProfile, and dump the stats to this file.")
+    aggregate.add_argument("--memory-limit", type=int, default=None,
+                           help="Memory budget for the decoded tables waiting to be written, in MiB. Past it, they are spilled to temporary files in output. Defaults to no limit.")
+    aggregate.add_argument("--dxt-sample", type=sample_spec, default=None, metavar="[METHOD:]N[:SEED]",
+                           help="Keep at most N weighted DXT segments per file and rank, picked by reservoir (the default) or time, and the exact totals of all segments in DXT_*_totals. Defaults to keeping every segment.")
+    add_discovery_arguments(aggregate)
+    aggregate.add_argument("output", default="output/",
+                           help="Relative directory to write the aggregated data.")
+
+    inventory = subparsers.add_parser("inventory",
+                                      help="Only read the job metadata and module list of the darshan logs in a directory.")
+    inventory.add_argument("input",
+                           help="Relative directory containing the darshan logs to take the inventory of.")
+    inventory.add_argument("-d", "--debug", action="store_true",
+                           help="If true, prints additional debug messages during runtime.")
+    inventory.add_argument("-j", "--jobs", type=int, default=None,
+                           help="Number of worker processes used to read the logs. Defaults to the number of CPUs.")
+    inventory.add_argument("-f", "--format", choices=output_formats, default="csv",
+                           help="Format of the written inventory table.")
+    add_discovery_arguments(inventory)
+    inventory.add_argument("output", default="output/",
+                           help="Relative directory to write the inventory to.")
+
+    merge = subparsers.add_parser("merge",
+                                  help="Combine the outputs of several (e.g. --shard) runs into one, without reading any log.")
+    merge.add_argument("-d", "--debug", action="store_true",
+                       help="If true, prints additional debug messages during runtime.")
+    merge.add_argument("output",
+                       help="Relative directory to write the merged data.")
+    merge.add_argument("partials", nargs="+",
+                       help="Relative directories of the outputs to merge.")
+
+    watch = subparsers.add_parser("watch",
+                                  help="Keep ingesting the darshan logs written to a directory, as they are completed.")
+    watch.add_argument("input",
+                       help="Relative directory to watch for darshan logs.")
+    watch.add_argument("-d", "--debug", action="store_true",
+                       help="If true, prints additional debug messages during runtime.")
+    watch.add_argument("-j", "--jobs", type=int, default=None,
+                       help="Number of worker processes used to read the logs. Defaults to the number of CPUs.")
+    watch.add_argument("-b", "--batch-size", type=int, default=64,
+                       help="Write at most this many logs per committed batch. Defaults to 64.")
+    watch.add_argument("-f", "--format", choices=output_formats, default="csv",
+                       help="Format of the written tables. parquet and arrow write one dataset directory per table, partitioned by jobid.")
+    watch.add_argument("-w", "--write-jobs", type=int, default=4,
+                       help="Number of threads writing output tables at once. Defaults to 4.")
+    watch.add_argument("-m", "--modules", type=module_list, default=None,
+                       help="Comma-separated list of modules to read and write, e.g. POSIX,STDIO. Defaults to all modules.")
+    watch.add_argument("--compact", action="store_true",
+                       help="Use the compact schema: uint64 record ids and categorical job keys.")
+    watch.add_argument("--cache-dir", default=None,
+                       help="Directory to cache decoded logs in, so later runs over the same logs skip decoding them.")
+    watch.add_argument("--cache-size", type=int, default=None,
+                       help="Size cap of the cache, in MiB. Least recently used logs are evicted first. Defaults to no cap.")
+    watch.add_argument("--interval", type=float, default=2.0,
+                       help="Seconds between two polls of input. Defaults to 2.")
+    watch.add_argument("--settle", type=float, default=1.0,
+                       help="Seconds a log has to go unmodified before it is read. Defaults to 1.")
+    watch.add_argument("--dxt-sample", type=sample_spec, default=None, metavar="[METHOD:]N[:SEED]",
+                       help="Keep at most N weighted DXT segments per file and rank, picked by reservoir (the default) or time, and the exact totals of all segments in DXT_*_totals. Defaults to keeping every segment.")
+    add_discovery_arguments(watch)
+    watch.add_argument("output", default="output/",
+                       help="Relative directory to write the aggregated data.")
+
+    return parser
+
+def sampling_from_args(args: argparse.Namespace) -> Optional[Any] :
+    if args.dxt_sample is None :
+        return None
+    # Only imported once there are logs to sample.
+    from .objs.sampling import DxtSampling
+    method, size, seed = args.dxt_sample
+    return DxtSampling(size, method, seed)
+
+def parse_args(parser: argparse.ArgumentParser, argv: Optional[List[str]] = None) -> argparse.Namespace :
+    """Parses `argv` (by default, the process's arguments) with `parser`."""
+    if argv is None :
+        argv = sys.argv[1:]
+    # `wfmeta_darshan input output` predates the subcommands; keep it meaning
+    #   `wfmeta_darshan aggregate input output`.
+    if len(argv) > 0 and argv[0] not in commands and argv[0] not in ("-h", "--help") :
+        argv = ["aggregate"] + argv
+    return parser.parse_args(argv)
+
+def create_parser_and_run(argv: Optional[List[str]] = None) :
+    parser: argparse.ArgumentParser = create_parser()
+    args: argparse.Namespace = parse_args(parser, argv)
+
+    if args.command in ("aggregate", "inventory") :
+        # Exits right away if there are no logs at all; this only walks
+        #   up to the first log, before the pipeline is imported.
+        discover_log_files(args.input, args.debug, discovery_from_args(args))
+
+    match args.command:
+        case "aggregate":
+            from .pipeline import aggregate_darshan
+            aggregate_darshan(args.input, args.output, args.debug, args.jobs, args.batch_size,
+                              args.format, args.incremental, args.modules, args.compact,
+                              args.cache_dir, None if args.cache_size is None else args.cache_size << 20,
+                              discovery_from_args(args), args.write_jobs, profile=args.profile,
+                              memory_limit=None if args.memory_limit is None else args.memory_limit << 20,
+                              sampling=sampling_from_args(args))
+        case "inventory":
+            from .pipeline import inventory_darshan
+            inventory_darshan(args.input, args.output, args.debug, args.jobs, args.format,
+                              discovery_from_args(args))
+        case "merge":
+            from .pipeline import merge_outputs
+            merge_outputs(args.partials, args.output, args.debug)
+        case "watch":
+            from .pipeline import watch_darshan
+            watch_darshan(args.input, args.output, args.debug, args.jobs, args.batch_size,
+                          args.format, args.modules, args.compact,
+                          args.cache_dir, None if args.cache_size is None else args.cache_size << 20,
+                          discovery_from_args(args), args.write_jobs, args.interval, args.settle,
+                          sampling=sampling_from_args(args))
+        case _:
+            parser.print_help()
+            exit(2)
@@ -1,2 +1,13 @@
-from . import colls
-from .log import Log, LogCollection
\ No newline at end of file
+import importlib
+from typing import Any, List
+
+# The collections pull in pandas, so they are imported on first use;
+#   see `wfmeta_darshan.__getattr__`.
+__all__: List[str] = ["colls", "Log", "LogCollection"]
+
+def __getattr__(name: str) -> Any :
+    if name == "colls" :
+        return importlib.import_module(".colls", __name__)
+    if name in ("Log", "LogCollection") :
+        return getattr(importlib.import_module(".log", __name__), name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
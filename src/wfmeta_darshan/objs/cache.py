@@ -0,0 +1,208 @@
+import functools
+import hashlib
+import importlib.metadata
+import json
+import os
+import pathlib
+import shutil
+from typing import Any, Dict, List, Optional, Tuple, Union
+import pandas as pd
+import pyarrow as pa
+
+##############################
+# decoded-log cache          #
+##############################
+
+# Modules whose code decides what a decoded table holds.
+decoder_sources: List[str] = ["log.py", "colls.py", "names.py", "sampling.py"]
+
+def _version(package: str) -> str :
+    try :
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError :
+        return "unknown"
+
+@functools.lru_cache(maxsize=None)
+def _source_hash() -> str :
+    h = hashlib.sha256()
+    for name in decoder_sources :
+        h.update(name.encode())
+        try :
+            h.update(pathlib.Path(__file__).with_name(name).read_bytes())
+        except OSError :
+            # e.g. installed without sources; the versions still count.
+            h.update(b"missing")
+    return h.hexdigest()
+
+class DecodeCache :
+    """On-disk cache of decoded logs, keyed by log content hash.
+
+    Each entry is a directory holding the log's header as json, and one
+    Arrow IPC file per decoded module table. Tables are memory-mapped
+    when read back, so a cached log costs no `DarshanReport` decode.
+
+    Entries live under a directory named after `Tag`, which changes with
+    the library versions, `schema_version` and the source of the
+    decoding modules (`decoder_sources`), so editing a source checkout,
+    whose package version stays the same, invalidates them too. Entries
+    written under any other tag are removed when the cache is opened.
+    Once the cache holds more than `max_bytes`, `evict` removes the
+    least recently used entries.
+    """
+    # Bump whenever the decoded tables change shape, to invalidate
+    #   every existing entry.
+    schema_version: int = 3
+    header_name: str = "header.json"
+
+    cache_dir: pathlib.Path
+    max_bytes: Optional[int]
+    tag: str
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None) :
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.tag = DecodeCache.Tag()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        for p in self.cache_dir.iterdir() :
+            if p.is_dir() and p.name != self.tag :
+                shutil.rmtree(p, ignore_errors=True)
+
+    @staticmethod
+    def Tag() -> str :
+        versions: Dict[str, Any] = {'schema': DecodeCache.schema_version,
+                                    'wfmeta_darshan': _version("wfmeta_darshan"),
+                                    'source': _source_hash(),
+                                    'darshan': _version("darshan"),
+                                    'pandas': pd.__version__,
+                                    'pyarrow': pa.__version__}
+        return hashlib.sha256(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:16]
+
+    @property
+    def root(self) -> pathlib.Path :
+        return pathlib.Path(self.cache_dir, self.tag)
+
+    def entry(self, digest: str, compact: bool = False) -> pathlib.Path :
+        # The compact schema decodes to different tables.
+        return pathlib.Path(self.root, digest + ("-compact" if compact else ""))
+
+    @staticmethod
+    def _replace(tmp: pathlib.Path, path: pathlib.Path) -> None :
+        # Entries can be written by several worker processes at once;
+        #   only ever move finished files into place.
+        os.replace(tmp, path)
+
+    def _tmp(self, path: pathlib.Path) -> pathlib.Path :
+        return path.with_name("%s.%i.tmp" % (path.name, os.getpid()))
+
+    ##############################
+    # header                     #
+    ##############################
+
+    def get_header(self, digest: str, compact: bool = False) -> Optional[Dict[str, Any]] :
+        """Returns the saved header of the log, or None if there is none.
+
+        Reading a header marks the entry as recently used.
+        """
+        path: pathlib.Path = pathlib.Path(self.entry(digest, compact), self.header_name)
+        try :
+            with open(path) as f :
+                header: Dict[str, Any] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) :
+            return None
+
+        try :
+            os.utime(path.parent)
+        except FileNotFoundError :
+            return None
+        return header
+
+    def put_header(self, digest: str, compact: bool, header: Dict[str, Any]) -> None :
+        entry: pathlib.Path = self.entry(digest, compact)
+        entry.mkdir(parents=True, exist_ok=True)
+
+        path: pathlib.Path = pathlib.Path(entry, self.header_name)
+        tmp: pathlib.Path = self._tmp(path)
+        with open(tmp, 'w') as f :
+            json.dump(header, f)
+        self._replace(tmp, path)
+
+    ##############################
+    # module tables              #
+    ##############################
+
+    def _table_path(self, digest: str, compact: bool, module_name: str, name: str) -> pathlib.Path :
+        return pathlib.Path(self.entry(digest, compact), "%s.%s.arrow" % (module_name, name))
+
+    def get_tables(self, digest: str, compact: bool, module_name: str,
+                   header: Dict[str, Any]) -> Optional[Dict[str, pd.DataFrame]] :
+        """Returns the cached tables of `module_name`, or None if not cached."""
+        names: Optional[List[str]] = header.get('tables', {}).get(module_name)
+        if names is None :
+            return None
+
+        tables: Dict[str, pd.DataFrame] = {}
+        try :
+            for name in names :
+                with pa.memory_map(str(self._table_path(digest, compact, module_name, name))) as source :
+                    # Without split_blocks, pandas copies all columns of a
+                    #   type into one block; with it, numeric columns stay
+                    #   read-only views of the mapped file, and only get
+                    #   paged in (and copied, if ever written to) on use.
+                    tables[name] = pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+        except (FileNotFoundError, pa.ArrowInvalid) :
+            return None
+
+        return tables
+
+    def put_tables(self, digest: str, compact: bool, module_name: str,
+                   header: Dict[str, Any], tables: Dict[str, Union[pd.DataFrame, pa.Table]]) -> None :
+        """Saves the tables of `module_name`, DataFrames or Arrow tables, and lists them in `header`."""
+        written: List[str] = []
+        for name, df in tables.items() :
+            table: pa.Table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+            path: pathlib.Path = self._table_path(digest, compact, module_name, name)
+            tmp: pathlib.Path = self._tmp(path)
+            with pa.OSFile(str(tmp), 'wb') as sink :
+                with pa.ipc.new_file(sink, table.schema) as writer :
+                    writer.write_table(table)
+            self._replace(tmp, path)
+            written.append(name)
+
+        header.setdefault('tables', {})[module_name] = written
+        self.put_header(digest, compact, header)
+
+    ##############################
+    # eviction                   #
+    ##############################
+
+    def size(self) -> int :
+        return sum(f.stat().st_size for f in self.root.rglob("*") if f.is_file())
+
+    def evict(self) -> None :
+        """Removes least recently used entries until under `max_bytes`.
+
+        This looks at every entry, so it is not done on every put: the
+        process running a batch of logs evicts once the batch is decoded,
+        rather than each worker process after each of its modules.
+        """
+        if self.max_bytes is None :
+            return
+
+        entries: List[Tuple[float, int, pathlib.Path]] = []
+        total: int = 0
+        for entry in self.root.iterdir() :
+            try :
+                size: int = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except FileNotFoundError :
+                # evicted by another process meanwhile.
+                continue
+            total += size
+
+        entries.sort(key=lambda e: e[0])
+        for _, size, entry in entries :
+            if total <= self.max_bytes :
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
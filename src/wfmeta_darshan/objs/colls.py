@@ -1,8 +1,11 @@
 import os
-import re
-from typing import Any, Dict, List, Set, Tuple, Union
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import logging
+from .sampling import DxtSampling, segment_totals
 ##############################
 # counter-only collections   #
 ##############################
@@ -10,7 +13,6 @@ import logging
 class counters_coll :
     report_name: str
     metadata: Dict[str, Union[List,Set,str]]
-    records: List[Any]
 
     counters_df: pd.DataFrame
     module_name: str = "ERR"
@@ -22,42 +24,85 @@ class counters_coll :
     ranks: Set[str]
     IDs: Set[str]
 
+    # Whether to use the compact schema: uint64 ids, and categorical
+    #   jobid, juid, rank (and hostname) columns.
+    compact: bool
 
-    def __init__(self, records, juid: str, jobid: str, counters_name: str = 'counters') :
+
+    def __init__(self, records, juid: str, jobid: str, counters_name: str = 'counters',
+                 compact: bool = False) :
         self.metadata = {}
         self.juid = juid
         self.jobid = jobid
+        self.compact = compact
 
         self.ranks = set()
         # MPI rank of the process that opened the file.
         self.ids = set()
-        # IDs are 64-bit hashes of filenames/paths.
-
-        self.records = []
+        # IDs are 64-bit hashes of filenames/paths; see `Log.names` for
+        #   the paths themselves.
 
         # input 'Records' is of type DarshanRecordCollection
         # We used to want ranks, ids to be able to collapse the df.
         #   but, turns out to_df() works just fine (IN MOST CASES).
         #   we just can't read it AS a pandas df, because then it explodes!
+        # The records themselves are not kept: only the tables are.
         for record in records :
             self.ranks.add(record['rank'])
             self.ids.add(record['id'])
 
-            self.records.append(record)
-
         # to_df() properly creates a single df with ranks, ids set properly.
         #   just use this instead of re-doing work.
         output_df: Dict[str, pd.DataFrame] = records.to_df()
-        self.counters_df = output_df[counters_name].astype({'id':str})
-
-    def get_df_with_ids(self) -> Dict[str, pd.DataFrame] :
-        df = self.counters_df
+        self._set_dfs(output_df, counters_name)
+
+    def _set_dfs(self, output_df: Dict[str, pd.DataFrame], counters_name: str) -> None :
+        self.counters_df = self._typed_ids(output_df[counters_name])
+
+    @classmethod
+    def From_Tables(cls, tables: Dict[str, pd.DataFrame], juid: str, jobid: str,
+                    compact: bool = False) -> 'counters_coll' :
+        """Rebuilds a collection from the tables of its `get_df_with_ids`.
+
+        Used to restore decoded collections, e.g. from a `DecodeCache`.
+        """
+        coll = cls.__new__(cls)
+        coll.metadata = {}
+        coll.juid = juid
+        coll.jobid = jobid
+        coll.compact = compact
+        coll._set_tables(tables)
+        return coll
+
+    def _set_tables(self, tables: Dict[str, pd.DataFrame]) -> None :
+        self.counters_df = tables['counters']
+        self.ranks = set()
+        self.ids = set()
+        if len(self.counters_df.columns) > 0 :
+            self.ranks.update(self.counters_df['rank'].unique())
+            self.ids.update(self.counters_df['id'].unique())
+
+    def _typed_ids(self, df: pd.DataFrame) -> pd.DataFrame :
+        if self.compact :
+            return df.astype({'id': np.uint64, 'rank': 'category'})
+        return df.astype({'id': str})
+
+    def _key_column(self, value: Any, n: int) -> Any :
+        # The same value on every row; in the compact schema, a
+        #   one-category categorical takes a byte per row.
+        if self.compact :
+            return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[value])
+        return value
+
+    def _add_job_keys(self, df: pd.DataFrame) -> pd.DataFrame :
         if 'jobid' not in df.columns:
-            df.insert(0, 'jobid', self.jobid)
+            df.insert(0, 'jobid', self._key_column(self.jobid, len(df)))
         if 'juid' not in df.columns:
-            df.insert(1, 'juid', self.juid)
+            df.insert(1, 'juid', self._key_column(self.juid, len(df)))
+        return df
 
-        df = df.astype({'id': str})
+    def get_df_with_ids(self) -> Dict[str, pd.DataFrame] :
+        df = self._add_job_keys(self.counters_df)
         return {'counters': df}
     
     def get_metadata(self) -> Dict[str, Any]:
@@ -72,8 +117,8 @@ class counters_coll :
 class LUSTRE_coll(counters_coll) :
     module_name: str = "LUSTRE"
 
-    def __init__(self, *args) :
-        super().__init__(*args, counters_name='components')
+    def __init__(self, *args, **kwargs) :
+        super().__init__(*args, counters_name='components', **kwargs)
         # TODO: make cleaner.
 
 ##############################
@@ -87,36 +132,38 @@ class fcounters_coll(counters_coll) :
     module_name: str = "ERR_fcounters"
     fcounters_df: pd.DataFrame
 
-    def __init__(self, records, juid: str, jobid: str):
-        super().__init__(records, juid, jobid)
-            
-        output_df: Dict[str, pd.DataFrame] = records.to_df()
-        self.fcounters_df = output_df['fcounters']
+    def __init__(self, records, juid: str, jobid: str, compact: bool = False):
+        super().__init__(records, juid, jobid, compact=compact)
+
+    def _set_dfs(self, output_df: Dict[str, pd.DataFrame], counters_name: str) -> None :
+        # Both tables come out of the same to_df() call.
+        super()._set_dfs(output_df, counters_name)
+        self.fcounters_df = self._typed_ids(output_df['fcounters'])
+
+    def _set_tables(self, tables: Dict[str, pd.DataFrame]) -> None :
+        super()._set_tables(tables)
+        self.fcounters_df = tables['fcounters']
 
     def get_df_with_ids(self) -> Dict[str, pd.DataFrame]:
-        df_c = self.counters_df
-        if 'jobid' not in df_c.columns:
-            df_c.insert(0, 'jobid', self.jobid)
-        if 'juid' not in df_c.columns:
-            df_c.insert(1, 'juid', self.juid)
-
-        df_f = self.fcounters_df
-        if 'jobid' not in df_f.columns:
-            df_f.insert(0, 'jobid', self.jobid)
-        if 'juid' not in df_f.columns:
-            df_f.insert(1, 'juid', self.juid)
+        df_c = self._add_job_keys(self.counters_df)
+        df_f = self._add_job_keys(self.fcounters_df)
 
         return {'counters': df_c, 'fcounters': df_f}
 
 class STDIO_coll(fcounters_coll) :
     module_name:str = "STDIO"
-    def __init__(self, *args) :
-        super().__init__(*args)
+    def __init__(self, *args, **kwargs) :
+        super().__init__(*args, **kwargs)
 
 class POSIX_coll(fcounters_coll) :
     module_name:str = "POSIX"
-    def __init__(self, *args) :
-        super().__init__(*args)
+    def __init__(self, *args, **kwargs) :
+        super().__init__(*args, **kwargs)
+
+class MPIIO_coll(fcounters_coll) :
+    module_name:str = "MPI-IO"
+    def __init__(self, *args, **kwargs) :
+        super().__init__(*args, **kwargs)
 
 class DXT_POSIX_coll(fcounters_coll) :
     hostnames: Set
@@ -128,108 +175,423 @@ class DXT_POSIX_coll(fcounters_coll) :
     read_segments: pd.DataFrame
     write_segments: pd.DataFrame
 
-    def __init__(self, records, juid: str, jobid: str) :
+    # With a sampling, the segment tables only hold a weighted sample of
+    #   the segments, and `totals` sums up all of them per record.
+    sampling: Optional[DxtSampling]
+    totals: Optional[pd.DataFrame]
+
+    def __init__(self, records, juid: str, jobid: str, compact: bool = False,
+                 sampling: Optional[DxtSampling] = None,
+                 rngs: Optional[Tuple[np.random.Generator, np.random.Generator]] = None) :
+        # `rngs` carries the sampling's generators over from the records
+        #   before these, when a log is decoded a chunk at a time.
         self.has_read = False
         self.has_write = False
 
         self.juid = juid
         self.jobid = jobid
+        self.compact = compact
+        self.sampling = sampling
+        self.totals = None
         self.ranks = set()
         self.IDs = set()
         self.hostnames = set()
         # to_df behaves differently for DXT, so we need to make some changes.
 
-        self.records = []    
-
-        collected_read: List = []
-        collected_write: List = []
-
+        # Only kept until the segment tables are built.
+        records = list(records)
         for record in records:
             self.ranks.add(record['rank'])
             self.IDs.add(record['id'])
             self.hostnames.add(record['hostname'])
-            self.records.append(record)
-
-            # In this specfic feature branch, there is an additional
-            #   column called "extra_info" in both r_segs and w_segs
-            # This content always contains "pthread_id=[-1-9]+"
-            # Let's turn this into a real column, and just throw a
-            #   warning if it's ever anything else.
 
             if record['read_count'] > 0:
                 self.has_read = True
-
-                df: pd.DataFrame = record.to_df()[0]['read_segments']
-                df.insert(0,"rank", record['rank'])
-                df.insert(1, "id", record['id'])
-                df.astype({'id':'str'})
-
-                df = DXT_POSIX_coll._add_pthreadid_col(df, "read_segments")
-
-                collected_read.append(df)
-
             if record['write_count'] > 0:
                 self.has_write = True
 
-                df: pd.DataFrame = record.to_df()[0]['write_segments']
-                df.insert(0,"rank", record['rank'])
-                df.insert(1, "id", record['id'])
-                df = df.astype({'id':'str'})
+        # In this specfic feature branch, there is an additional
+        #   column called "extra_info" in both r_segs and w_segs
+        # This content always contains "pthread_id=[-1-9]+"
+        # Let's turn this into a real column, and just throw a
+        #   warning if it's ever anything else.
+        if sampling is not None and rngs is None :
+            rngs = sampling.rngs(juid, jobid)
+        read_rng, write_rng = rngs if rngs is not None else (None, None)
+        if self.has_read:
+            self.read_segments = DXT_POSIX_coll._build_segments_df(records, "read_segments", compact,
+                                                                   sampling, read_rng)
 
-                df = DXT_POSIX_coll._add_pthreadid_col(df, "write_segments")
+        if self.has_write:
+            self.write_segments = DXT_POSIX_coll._build_segments_df(records, "write_segments", compact,
+                                                                    sampling, write_rng)
 
-                collected_write.append(df)
-            
-        if len(collected_read) > 0:
-            self.read_segments = pd.concat(collected_read, ignore_index=True)
-        
-        if len(collected_write) > 0 :
-            self.write_segments = pd.concat(collected_write, ignore_index=True)
+        if sampling is not None :
+            self.totals = segment_totals(records, compact)
+
+    @staticmethod
+    def _build_segments_df(records: List[Any], which_df: str, compact: bool = False,
+                           sampling: Optional[DxtSampling] = None,
+                           rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+        """Builds one DataFrame holding the `which_df` segments of all records.
+
+        Every column is filled in a single pass over the segments, rather
+        than building (and then concatenating) one DataFrame per record.
+        Gives the same frame as concatenating each record's `to_df()`
+        segments with their rank and id columns added.
+
+        With `compact`, ids stay uint64, rank is categorical and a
+        categorical hostname column is added after the id. With a
+        `sampling`, only the sampled segments of each record are kept,
+        and their weights are added as a last `weight` column.
+        """
+        segments: List[List[Dict[str, Any]]] = [record[which_df] for record in records]
+        weights: Optional[np.ndarray] = None
+        if sampling is not None :
+            picks: List[Tuple[np.ndarray, np.ndarray]] = [sampling.pick(segs, rng) for segs in segments]
+            segments = [[segs[i] for i in kept] for segs, (kept, _) in zip(segments, picks)]
+            weights = np.concatenate([w for _, w in picks]) if len(picks) > 0 else np.empty(0)
+        counts: np.ndarray = np.fromiter((len(segs) for segs in segments), dtype=np.int64, count=len(segments))
+        total: int = int(counts.sum())
+
+        # Segment fields in the order the darshan backend lists them.
+        fields: List[str] = next(list(segs[0].keys()) for segs in segments if len(segs) > 0)
+
+        columns: Dict[str, Any] = {}
+        ranks: np.ndarray = np.repeat(np.fromiter((record['rank'] for record in records), dtype=np.int64, count=len(records)), counts)
+        if compact:
+            columns['rank'] = pd.Categorical(ranks)
+            columns['id'] = np.repeat(np.fromiter((record['id'] for record in records), dtype=np.uint64, count=len(records)), counts)
+            hostnames, host_codes = np.unique(np.array([record['hostname'] for record in records], dtype=object), return_inverse=True)
+            columns['hostname'] = pd.Categorical.from_codes(np.repeat(host_codes, counts), categories=hostnames)
+        else:
+            columns['rank'] = ranks
+            # ids are 64-bit unsigned hashes; convert the (few) distinct ids to
+            #   str before repeating them over the (many) segments.
+            id_strs: np.ndarray = np.array([str(record['id']) for record in records], dtype=object)
+            columns['id'] = pd.Series(np.repeat(id_strs, counts)).astype(str)
+
+        for field in fields:
+            first = segments[int(np.argmax(counts > 0))][0][field]
+            dtype = np.int64 if isinstance(first, (int, np.integer)) else \
+                    np.float64 if isinstance(first, (float, np.floating)) else object
+            columns[field] = np.fromiter((seg[field] for segs in segments for seg in segs),
+                                         dtype=dtype, count=total)
+
+        df: pd.DataFrame = pd.DataFrame(columns)
+
+        if 'extra_info' in df.columns:
+            df = DXT_POSIX_coll._add_pthreadid_col(df, which_df)
+        if weights is not None :
+            df['weight'] = weights
+
+        return df
+
+    def _set_tables(self, tables: Dict[str, pd.DataFrame]) -> None :
+        # Missing segments come back as tables without columns.
+        self.has_read = len(tables['read_segments'].columns) > 0
+        self.has_write = len(tables['write_segments'].columns) > 0
+        self.totals = tables.get('totals')
+        self.sampling = None
+        self.ranks = set()
+        self.IDs = set()
+        self.hostnames = set()
+
+        for name in ['read_segments', 'write_segments'] :
+            if len(tables[name].columns) > 0 :
+                setattr(self, name, tables[name])
+                self.ranks.update(tables[name]['rank'].unique())
+                self.IDs.update(tables[name]['id'].unique())
+                if 'hostname' in tables[name].columns :
+                    self.hostnames.update(tables[name]['hostname'].unique())
 
     def get_metadata(self) -> Dict[str, Any]:
         metadata = super().get_metadata()
         metadata['hostnames'] = self.hostnames
         return metadata
 
+    def segment_time(self) -> float :
+        """Sums the durations of all read and write segments, in seconds, sampled or not."""
+        if self.totals is not None :
+            return float(self.totals['read_time'].sum() + self.totals['write_time'].sum())
+        time: float = 0.0
+        for name, present in [('read_segments', self.has_read), ('write_segments', self.has_write)] :
+            if present :
+                df: pd.DataFrame = getattr(self, name)
+                time += float((df['end_time'] - df['start_time']).sum())
+        return time
+
     def get_df_with_ids(self) -> Dict[str, pd.DataFrame]:
         if self.has_read:
-            df_c = self.read_segments
-            if 'jobid' not in df_c.columns:
-                df_c.insert(0, 'jobid', self.jobid)
-            if 'juid' not in df_c.columns:
-                df_c.insert(1, 'juid', self.juid)
+            df_c = self._add_job_keys(self.read_segments)
         else :
             df_c = pd.DataFrame()
 
         if self.has_write:
-            df_f = self.write_segments
-            if 'jobid' not in df_f.columns:
-                df_f.insert(0, 'jobid', self.jobid)
-            if 'juid' not in df_f.columns:
-                df_f.insert(1, 'juid', self.juid)
+            df_f = self._add_job_keys(self.write_segments)
         else :
             df_f = pd.DataFrame()
 
-        return {'read_segments': df_c, 'write_segments': df_f}
+        output: Dict[str, pd.DataFrame] = {'read_segments': df_c, 'write_segments': df_f}
+        if self.totals is not None :
+            output['totals'] = self._add_job_keys(self.totals)
+        return output
 
     @staticmethod
     def _add_pthreadid_col(df: pd.DataFrame, which_df: str, keep_extra: bool = False):
-        pthread_id_col: List[str] = []    
-        for values in df['extra_info']:
-            res: re.Match[str] | None = re.search(r'pthread\_id=(?P<threadid>[0-9]+)(?P<other>.+)?', values)
-            if res :
-                pthread_id: str | Any | None = res.groupdict().get('threadid')
-                other: str | Any | None      = res.groupdict().get('other')
-                if other:
-                    logging.warning("There is additional info in {which_df}'s extra_info column this is currently unhandled.")
-                if pthread_id:
-                    pthread_id_col.append(pthread_id)
-                else :
-                    logging.error("Was not able to find a pthread_id for a column in {which_df}.")
+        extracted: pd.DataFrame = df['extra_info'].astype(object).str.extract(r'pthread\_id=(?P<threadid>[0-9]+)(?P<other>.+)?')
+
+        if extracted['other'].notna().any() :
+            logging.warning("There is additional info in %s's extra_info column this is currently unhandled." % which_df)
+        if extracted['threadid'].isna().any() :
+            logging.error("Was not able to find a pthread_id for a column in %s." % which_df)
 
         _, n_cols = df.shape
-        df.insert(n_cols - 1, 'pthread_id', pthread_id_col)
+        df.insert(n_cols - 1, 'pthread_id', extracted['threadid'].to_numpy(dtype=object))
         if not keep_extra :
             df = df.drop('extra_info', axis=1)
 
-        return df
\ No newline at end of file
+        return df
+
+class DXT_MPIIO_coll(DXT_POSIX_coll) :
+    # Same records and segment tables as DXT_POSIX.
+    module_name:str = "DXT_MPIIO"
+    def __init__(self, *args, **kwargs) :
+        super().__init__(*args, **kwargs)
+
+##############################
+# spilled DXT segments       #
+##############################
+
+class DxtSpill :
+    """Where, and in chunks of what size, DXT records are spilled as they are decoded.
+
+    Rather than reading all of a DXT module's records before building
+    its segment tables, the records are read one at a time, and grouped
+    into chunks of about `chunk_bytes` (see `chunks`). The tables of each
+    chunk are written to Arrow IPC files in `spill_dir` and let go
+    before the next chunk is read; see `spilled_coll`.
+    """
+    # Rough memory of one segment while it is decoded: its dict in the
+    #   pydarshan record, and its row in the segment table.
+    segment_nbytes: int = 400
+
+    spill_dir: str
+    chunk_bytes: int
+
+    def __init__(self, spill_dir: str, chunk_bytes: int) :
+        self.spill_dir = spill_dir
+        self.chunk_bytes = chunk_bytes
+
+    def chunks(self, records: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]] :
+        """Groups `records`, in order, into lists of about `chunk_bytes`.
+
+        A record is never split, so one with more segments than fit in a
+        chunk makes a chunk of its own.
+        """
+        chunk: List[Dict[str, Any]] = []
+        held: int = 0
+        for record in records :
+            chunk.append(record)
+            held += (record['read_count'] + record['write_count'] + 1) * self.segment_nbytes
+            if held >= self.chunk_bytes :
+                yield chunk
+                chunk = []
+                held = 0
+        if len(chunk) > 0 :
+            yield chunk
+
+class spilled_coll :
+    """The tables of a DXT module, kept in Arrow IPC files rather than in memory.
+
+    Filled with `add`, one collection of a chunk of records at a time
+    (see `DxtSpill`), each of whose tables goes to a file of its own.
+    Only the ranks, ids and hostnames, and the segment time, stay in
+    memory, so the collection is cheap to send between processes. The
+    files are read back memory-mapped by `arrow_chunks`, and deleted by
+    `remove`.
+    """
+    module_name: str
+    juid: str
+    jobid: str
+    compact: bool
+    spill_dir: str
+
+    ranks: Set
+    IDs: Set
+    hostnames: Set
+    has_read: bool
+    has_write: bool
+    # Table name -> its files, one per chunk, in record order.
+    files: Dict[str, List[str]]
+    _segment_time: float
+
+    def __init__(self, module_name: str, juid: str, jobid: str, spill_dir: str,
+                 compact: bool = False, sampled: bool = False) :
+        self.module_name = module_name
+        self.juid = juid
+        self.jobid = jobid
+        self.compact = compact
+        self.spill_dir = spill_dir
+        self.ranks = set()
+        self.IDs = set()
+        self.hostnames = set()
+        self.has_read = False
+        self.has_write = False
+        self.files = {'read_segments': [], 'write_segments': []}
+        if sampled :
+            self.files['totals'] = []
+        self._segment_time = 0.0
+
+    def add(self, coll: DXT_POSIX_coll) -> None :
+        """Writes the tables of `coll`, the collection of the next chunk of records, to files."""
+        self.ranks.update(coll.ranks)
+        self.IDs.update(coll.IDs)
+        self.hostnames.update(coll.hostnames)
+        self.has_read = self.has_read or coll.has_read
+        self.has_write = self.has_write or coll.has_write
+        self._segment_time += coll.segment_time()
+
+        for name, df in coll.get_df_with_ids().items() :
+            # Chunks without reads (or writes) have tables without columns.
+            if len(df.columns) == 0 :
+                continue
+            table: pa.Table = pa.Table.from_pandas(df, preserve_index=False)
+            fd, path = tempfile.mkstemp(prefix="%s.%s." % (self.module_name, name), suffix=".arrow",
+                                        dir=self.spill_dir)
+            os.close(fd)
+            with pa.OSFile(path, 'wb') as sink :
+                with pa.ipc.new_file(sink, table.schema) as writer :
+                    writer.write_table(table)
+            self.files[name].append(path)
+
+    def arrow_chunks(self) -> Dict[str, List[pa.Table]] :
+        """Returns the chunks of every table, memory-mapped; a table without any is one empty table."""
+        output: Dict[str, List[pa.Table]] = {}
+        for name, paths in self.files.items() :
+            output[name] = []
+            for path in paths :
+                with pa.memory_map(path) as source :
+                    output[name].append(pa.ipc.open_file(source).read_all())
+            if len(output[name]) == 0 :
+                output[name].append(pa.table({}))
+        return output
+
+    def get_df_with_ids(self) -> Dict[str, pd.DataFrame] :
+        """Reads the whole tables back into memory."""
+        return {name: pa.concat_tables(tables, promote_options="permissive").to_pandas(split_blocks=True)
+                for name, tables in self.arrow_chunks().items()}
+
+    def segment_time(self) -> float :
+        return self._segment_time
+
+    def get_metadata(self) -> Dict[str, Any]:
+        return {'jobid': self.jobid, 'juid': self.juid, 'ranks': self.ranks, 'ids': self.IDs,
+                'hostnames': self.hostnames}
+
+    def remove(self) -> None :
+        """Deletes the spilled files."""
+        for paths in self.files.values() :
+            for path in paths :
+                try :
+                    os.remove(path)
+                except FileNotFoundError :
+                    pass
+            paths.clear()
+
+##############################
+# heatmaps                   #
+##############################
+
+class HEATMAP_coll(counters_coll) :
+    """Heatmaps of a log: bytes read and written per rank and time bin.
+
+    Darshan keeps one heatmap per instrumented module (POSIX, STDIO,
+    MPIIO, ...). Each is decoded into dense (rank, bin) int64 arrays in
+    `read_bins` and `write_bins`, keyed by module, with the matching
+    `rank_ids`, `bin_widths` in seconds and bins starting at the job's
+    start.
+    """
+    module_name: str = "HEATMAP"
+
+    submodules: List[str]
+    rank_ids: Dict[str, np.ndarray]
+    bin_widths: Dict[str, float]
+    read_bins: Dict[str, np.ndarray]
+    write_bins: Dict[str, np.ndarray]
+
+    def __init__(self, heatmaps, juid: str, jobid: str, compact: bool = False) :
+        """Decodes `heatmaps`, as pydarshan's `DarshanReport.heatmaps`."""
+        self.metadata = {}
+        self.juid = juid
+        self.jobid = jobid
+        self.compact = compact
+        self._clear()
+
+        for submodule, heatmap in heatmaps.items() :
+            read: pd.DataFrame = heatmap.to_df(ops=['read'], interval_index=False).sort_index()
+            write: pd.DataFrame = heatmap.to_df(ops=['write'], interval_index=False).sort_index()
+            # pydarshan has no public accessor for the bin width.
+            self._add(str(submodule), read.index.to_numpy(dtype=np.int64), float(heatmap._bin_width_seconds),
+                      read.to_numpy(dtype=np.int64), write.to_numpy(dtype=np.int64))
+
+    def _clear(self) -> None :
+        self.submodules = []
+        self.rank_ids = {}
+        self.bin_widths = {}
+        self.read_bins = {}
+        self.write_bins = {}
+        self.ranks = set()
+        self.ids = set()
+
+    def _add(self, submodule: str, ranks: np.ndarray, bin_width: float,
+             read: np.ndarray, write: np.ndarray) -> None :
+        self.submodules.append(submodule)
+        self.rank_ids[submodule] = ranks
+        self.bin_widths[submodule] = bin_width
+        self.read_bins[submodule] = read
+        self.write_bins[submodule] = write
+        self.ranks.update(ranks.tolist())
+
+    def _set_tables(self, tables: Dict[str, pd.DataFrame]) -> None :
+        # Scatters the long `bins` table back into dense arrays.
+        self._clear()
+        df: pd.DataFrame = tables['bins']
+        if len(df.columns) == 0 :
+            return
+
+        for submodule, rows in df.groupby('module', observed=True, sort=False) :
+            ranks, rank_idx = np.unique(rows['rank'].to_numpy(dtype=np.int64), return_inverse=True)
+            bins: np.ndarray = rows['bin'].to_numpy(dtype=np.int64)
+            shape: Tuple[int, int] = (len(ranks), int(bins.max()) + 1 if len(bins) > 0 else 0)
+            read: np.ndarray = np.zeros(shape, dtype=np.int64)
+            write: np.ndarray = np.zeros(shape, dtype=np.int64)
+            read[rank_idx, bins] = rows['read_bytes'].to_numpy(dtype=np.int64)
+            write[rank_idx, bins] = rows['write_bytes'].to_numpy(dtype=np.int64)
+            self._add(str(submodule), ranks, float(rows['bin_width'].iloc[0]), read, write)
+
+    def totals(self, submodule: str) -> Tuple[np.ndarray, np.ndarray] :
+        """Returns the bytes read and written per bin by all ranks together."""
+        return self.read_bins[submodule].sum(axis=0), self.write_bins[submodule].sum(axis=0)
+
+    def get_df_with_ids(self) -> Dict[str, pd.DataFrame] :
+        """Returns the `bins` table: one row per module, rank and bin."""
+        frames: List[pd.DataFrame] = []
+        for submodule in self.submodules :
+            n_ranks, n_bins = self.read_bins[submodule].shape
+            width: float = self.bin_widths[submodule]
+            bins: np.ndarray = np.tile(np.arange(n_bins, dtype=np.int64), n_ranks)
+            frames.append(pd.DataFrame({'module': submodule,
+                                        'rank': np.repeat(self.rank_ids[submodule], n_bins),
+                                        'bin': bins,
+                                        'bin_start': bins * width,
+                                        'bin_width': width,
+                                        'read_bytes': self.read_bins[submodule].ravel(),
+                                        'write_bytes': self.write_bins[submodule].ravel()}))
+
+        if len(frames) == 0 :
+            return {'bins': pd.DataFrame()}
+        df: pd.DataFrame = pd.concat(frames, ignore_index=True)
+        if self.compact :
+            df = df.astype({'module': 'category', 'rank': 'category'})
+        return {'bins': self._add_job_keys(df)}
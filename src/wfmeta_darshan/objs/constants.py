@@ -0,0 +1,18 @@
+from typing import List
+
+##############################
+# shared names               #
+##############################
+
+# Kept free of heavy imports, so the command line can check its
+#   arguments without loading pandas or pydarshan.
+
+# Modules a log can hold, in the order of the has_<module> metadata
+#   columns; see `Log.expected_modules`.
+expected_modules: List[str] = ["POSIX", "LUSTRE", "STDIO", "DXT_POSIX", "HEATMAP", "MPI-IO", "DXT_MPIIO"]
+
+# Formats the aggregated tables can be written in; see `make_writer`.
+output_formats: List[str] = ['csv', 'parquet', 'arrow']
+
+# Ways DXT segments can be sampled; see `DxtSampling`.
+sample_methods: List[str] = ['reservoir', 'time']
@@ -0,0 +1,295 @@
+import datetime
+import fnmatch
+import itertools
+import os
+import re
+import time
+import zlib
+from typing import Container, Dict, Iterator, List, Optional, Set, Tuple
+
+##############################
+# log discovery              #
+##############################
+
+# e.g. python3.10_id11297-11297_4-18-57270-11270316508385156860_1.darshan;
+#   user and executable names come first, and may themselves hold `_`.
+darshan_filename = re.compile(r"_id(?P<jobid>[0-9]+)(-(?P<pid>[0-9]+))?"
+                              r"_(?P<month>[0-9]{1,2})-(?P<day>[0-9]{1,2})-(?P<seconds>[0-9]+)-(?P<hash>[0-9]+)"
+                              r"(_(?P<n>[0-9]+))?\.darshan(_partial)?$")
+
+def date_layout(parts: List[str]) -> bool :
+    """Whether `parts` is a `year[/month[/day]]` directory path, like darshan's log directories.
+
+    Only a 4-digit year, a month from 1 to 12 and a day from 1 to 31
+    count, so numeric directories of other layouts (jobids, run
+    numbers, a tree rooted at a year) are not taken for dates.
+    """
+    if not 1 <= len(parts) <= 3 or not all(p.isdigit() for p in parts) or len(parts[0]) != 4 :
+        return False
+    if len(parts) >= 2 and not 1 <= int(parts[1]) <= 12 :
+        return False
+    return len(parts) < 3 or 1 <= int(parts[2]) <= 31
+
+def log_date(name: str, parents: List[str], mtime: float) -> datetime.date :
+    """Returns the day a log was written, from its filename where possible.
+
+    Darshan names logs after the month and day they were written, but
+    not the year. The year comes from a `year/month/day` directory
+    layout (the one darshan's log directories use) if `parents` ends in
+    one, and from the file's `mtime` otherwise. Logs whose name does
+    not parse fall back to the mtime date.
+    """
+    modified: datetime.date = datetime.date.fromtimestamp(mtime)
+    match = darshan_filename.search(name)
+    if match is None :
+        return modified
+
+    month: int = int(match['month'])
+    day: int = int(match['day'])
+    if len(parents) >= 3 and date_layout(parents[-3:]) and \
+       (int(parents[-2]), int(parents[-1])) == (month, day) :
+        year: int = int(parents[-3])
+    else :
+        # A log written late on Dec 31 can be modified on Jan 1.
+        year = modified.year - 1 if month > modified.month else modified.year
+
+    try :
+        return datetime.date(year, month, day)
+    except ValueError :
+        return modified
+
+class LogDiscovery :
+    """Finds the Darshan logs under a directory.
+
+    By default, only the `.darshan` files directly inside the directory
+    are found. With `recursive`, its whole tree is walked, one directory
+    at a time, so the first logs are handed out long before the walk is
+    done. Logs are always handed out in sorted path order.
+
+    `include` and `exclude` are glob patterns matched against each log's
+    path relative to the directory: a log has to match one `include`
+    pattern (if any are given) and no `exclude` pattern. `since` and
+    `until` keep only the logs written within those days (inclusive;
+    see `log_date`). With `partial`, `.darshan_partial` logs are found
+    as well.
+
+    With a `shard` (i, N), only the i-th of N disjoint shares of the
+    logs is found, picked by a hash of each log's relative path. Every
+    machine picks the same share for the same (i, N), so N runs, one
+    per shard, read every log exactly once.
+    """
+    recursive: bool
+    include: List[str]
+    exclude: List[str]
+    since: Optional[datetime.date]
+    until: Optional[datetime.date]
+    partial: bool
+    shard: Optional[Tuple[int, int]]
+
+    def __init__(self, recursive: bool = False,
+                 include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 since: Optional[datetime.date] = None, until: Optional[datetime.date] = None,
+                 partial: bool = False, shard: Optional[Tuple[int, int]] = None) :
+        self.recursive = recursive
+        self.include = include or []
+        self.exclude = exclude or []
+        self.since = since
+        self.until = until
+        self.partial = partial
+        self.shard = shard
+        if shard is not None and not 0 <= shard[0] < shard[1] :
+            raise ValueError("Shard %i/%i does not exist; shards go from 0 to N-1." % shard)
+
+    def unsharded(self) -> 'LogDiscovery' :
+        """Returns the same discovery, over all shards."""
+        return LogDiscovery(self.recursive, self.include, self.exclude, self.since, self.until, self.partial)
+
+    def _is_log(self, name: str) -> bool :
+        return name.endswith(".darshan") or (self.partial and name.endswith(".darshan_partial"))
+
+    def _matches(self, relpath: str) -> bool :
+        if len(self.include) > 0 and not any(fnmatch.fnmatchcase(relpath, p) for p in self.include) :
+            return False
+        return not any(fnmatch.fnmatchcase(relpath, p) for p in self.exclude)
+
+    def _in_shard(self, relpath: str) -> bool :
+        return self.shard is None or zlib.crc32(relpath.encode()) % self.shard[1] == self.shard[0]
+
+    def _in_range(self, date: datetime.date) -> bool :
+        if self.since is not None and date < self.since :
+            return False
+        return self.until is None or date <= self.until
+
+    def _prune(self, parents: List[str]) -> bool :
+        """Whether a `year[/month[/day]]` directory lies outside the date range.
+
+        Only directories laid out like darshan's, from the top of the walk
+        down, are pruned (see `date_layout`); logs anywhere else are
+        checked one by one.
+        """
+        if (self.since is None and self.until is None) or not date_layout(parents) :
+            return False
+
+        prefix: Tuple[int, ...] = tuple(int(p) for p in parents)
+        n: int = len(prefix)
+        if self.since is not None and prefix < (self.since.year, self.since.month, self.since.day)[:n] :
+            return True
+        return self.until is not None and prefix > (self.until.year, self.until.month, self.until.day)[:n]
+
+    def walk(self, directory: str) -> Iterator[str] :
+        """Yields the path of every matching log under `directory`."""
+        # Depth-first, with each directory's entries sorted by name; the
+        #   stack holds (path, path components below `directory`).
+        stack: List[Tuple[str, List[str]]] = [(directory, [])]
+        while len(stack) > 0 :
+            path, parents = stack.pop()
+
+            with os.scandir(path) as it :
+                entries: List[os.DirEntry] = sorted(it, key=lambda e: e.name)
+
+            subdirs: List[Tuple[str, List[str]]] = []
+            for entry in entries :
+                if entry.is_dir() :
+                    if self.recursive and not self._prune(parents + [entry.name]) :
+                        subdirs.append((entry.path, parents + [entry.name]))
+                    continue
+
+                if not self._is_log(entry.name) or not entry.is_file() :
+                    continue
+                relpath: str = "/".join(parents + [entry.name])
+                if not self._matches(relpath) or not self._in_shard(relpath) :
+                    continue
+                if (self.since is not None or self.until is not None) and \
+                   not self._in_range(log_date(entry.name, parents, entry.stat().st_mtime)) :
+                    continue
+
+                yield entry.path
+
+            # Files sort before the subdirectories next to them.
+            stack.extend(reversed(subdirs))
+
+class LogWatcher :
+    """Hands out the logs under a directory as they are completed, poll by poll.
+
+    Every `poll` walks the directory with `discovery` and returns the
+    complete logs that were not handed out before. Darshan writes a log
+    as `.darshan_partial`, and only renames it to `.darshan` once it is
+    done; on top of that, a log is only complete once it has not been
+    modified for `settle` seconds, in case it is still being copied in.
+    The logs found but not complete yet are kept in `pending`.
+
+    A log that could not be read (see `failed`) is not handed out
+    again, unless its size or mtime changes.
+    """
+    directory: str
+    discovery: LogDiscovery
+    settle: float
+
+    # path -> mtime of the logs that are not complete yet.
+    pending: Dict[str, float]
+    # Absolute paths of the logs handed out.
+    _handed: Set[str]
+    # Absolute path -> (size, mtime_ns) of the logs that failed.
+    _failed: Dict[str, Tuple[int, int]]
+
+    def __init__(self, directory: str, discovery: Optional[LogDiscovery] = None, settle: float = 1.0) :
+        if discovery is None :
+            discovery = LogDiscovery()
+        if discovery.partial :
+            raise ValueError("Only complete logs can be watched for, not .darshan_partial ones.")
+        if not os.path.isdir(directory) :
+            raise ValueError("Provided path %s is not a directory." % directory)
+
+        self.directory = directory
+        self.discovery = discovery
+        self.settle = settle
+        self.pending = {}
+        self._handed = set()
+        self._failed = {}
+
+    def poll(self, done: Container[str] = ()) -> List[str] :
+        """Returns the newly completed logs, leaving out those whose absolute path is in `done`."""
+        now: float = time.time()
+        ready: List[str] = []
+        pending: Dict[str, float] = {}
+        for f in self.discovery.walk(self.directory) :
+            key: str = os.path.abspath(f)
+            if key in self._handed or key in done :
+                continue
+            try :
+                st = os.stat(f)
+            except FileNotFoundError :
+                # Moved away since the walk.
+                continue
+            if self._failed.get(key) == (st.st_size, st.st_mtime_ns) :
+                continue
+
+            if now - st.st_mtime >= self.settle :
+                ready.append(f)
+                self._handed.add(key)
+            else :
+                pending[f] = st.st_mtime
+
+        self.pending = pending
+        return ready
+
+    def failed(self, path: str) -> None :
+        """Marks a handed out log as unreadable, until it changes."""
+        key: str = os.path.abspath(path)
+        self._handed.discard(key)
+        try :
+            st = os.stat(path)
+        except FileNotFoundError :
+            return
+        self._failed[key] = (st.st_size, st.st_mtime_ns)
+
+def discover_log_files(directory: str, debug: bool = False,
+                       discovery: Optional[LogDiscovery] = None) -> Iterator[str]:
+    """Yields the paths of the Darshan logs found in the provided directory.
+
+    Which logs are found is up to `discovery` (see `LogDiscovery`); by
+    default, the `.darshan` files directly in the directory, not
+    `.darshan_partial` ones. The logs are yielded as the directory is
+    walked, so they can be read before the walk is done.
+    """
+    if not os.path.exists(directory) :
+        raise ValueError("Provided path %s does not exist." % directory)
+    
+    if not os.path.isdir(directory) :
+        raise ValueError("Provided path %s is not a directroy." % directory)
+    
+    if debug :
+        print("\tPath %s has been found and confirmed a directory. Moving on..." % directory)
+
+    if discovery is None :
+        discovery = LogDiscovery()
+
+    logfiles: Iterator[str] = discovery.walk(directory)
+    first: Optional[str] = next(logfiles, None)
+    if first is None:
+        # A shard can get none of the logs; it still leaves an (empty)
+        #   output to merge. Only an input without any log is an error.
+        if discovery.shard is not None and next(discovery.unsharded().walk(directory), None) is not None :
+            if debug :
+                print("\tShard %i/%i holds none of the logs." % discovery.shard)
+            return iter([])
+        print("No darshan log files found in provided directory!")
+        exit(1)
+
+    return itertools.chain([first], logfiles)
+
+def collect_log_files(directory:str, debug:bool = False,
+                      discovery: Optional[LogDiscovery] = None) -> List[str]:
+    """Collects all the `.darshan` log files in the provided directory.
+
+    Collects all the `.darshan` log files in the provided direction,
+    specifically only filtering to `.darshan` files, not
+    `.darshan_partial`. Returns their paths relative to the directory.
+    See `discover_log_files`.
+    """
+    logfiles: List[str] = [os.path.relpath(f, directory) for f in discover_log_files(directory, debug, discovery)]
+
+    if debug :
+        print("\tFound %i .darshan log files." % len(logfiles))
+
+    return logfiles
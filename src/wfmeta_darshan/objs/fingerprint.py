@@ -0,0 +1,231 @@
+import os
+import pathlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .rollup import record_summary, rollup_columns
+
+##############################
+# job fingerprints           #
+##############################
+
+# Darshan's access size bins, and the lower bound of each, in bytes.
+size_bins: List[str] = ['0_100', '100_1K', '1K_10K', '10K_100K', '100K_1M',
+                        '1M_4M', '4M_10M', '10M_100M', '100M_1G', '1G_PLUS']
+size_bounds: np.ndarray = np.array([0, 100, 1 << 10, 10 << 10, 100 << 10,
+                                    1 << 20, 4 << 20, 10 << 20, 100 << 20, 1 << 30])
+
+# POSIX access pattern counters, summed over reads and writes.
+pattern_counters: Dict[str, List[str]] = {'sequential': ['POSIX_SEQ_READS', 'POSIX_SEQ_WRITES'],
+                                          'consecutive': ['POSIX_CONSEC_READS', 'POSIX_CONSEC_WRITES'],
+                                          'rw_switch': ['POSIX_RW_SWITCHES']}
+
+# Features of a fingerprint, in order; see `job_fingerprint`.
+fingerprint_features: List[str] = ["read_size_" + b for b in size_bins] + \
+                                  ["write_size_" + b for b in size_bins] + \
+                                  ['read_bytes_fraction', 'read_ops_fraction',
+                                   'sequential_fraction', 'consecutive_fraction', 'rw_switch_fraction',
+                                   'meta_time_share', 'io_time_share', 'dxt_time_share',
+                                   'stdio_bytes_fraction', 'shared_bytes_fraction',
+                                   'bytes_scale', 'files_scale', 'nprocs_scale']
+
+def _fraction(part: float, whole: float) -> float :
+    return min(1.0, float(part / whole)) if whole > 0 else 0.0
+
+def _scale(value: float, decades: int) -> float :
+    # Orders of magnitude, out of `decades`.
+    return min(1.0, float(np.log10(1 + max(value, 0))) / decades)
+
+def _share(counts: np.ndarray) -> np.ndarray :
+    total: float = counts.sum()
+    return counts / total if total > 0 else counts
+
+def job_fingerprint(tables: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]],
+                    nprocs: int, run_time: float, dxt_time: float = 0.0) -> np.ndarray :
+    """Computes the fingerprint of one job, from its POSIX and STDIO tables.
+
+    `tables` holds the counters and fcounters tables of each module. The
+    fingerprint has one value per `fingerprint_features`, each in [0, 1]:
+
+    - `read_size_*`, `write_size_*`: the share of read (write) operations
+      in each of Darshan's access size bins. STDIO has no histograms, so
+      the operations of a STDIO record are counted at their average size.
+    - `read_bytes_fraction`, `read_ops_fraction`: the share of reads.
+    - `sequential_fraction`, `consecutive_fraction`, `rw_switch_fraction`:
+      POSIX sequential and consecutive accesses, and switches between
+      reading and writing, per POSIX operation.
+    - `meta_time_share`: metadata time, out of all I/O time.
+    - `io_time_share`, `dxt_time_share`: I/O time, and the time of the
+      DXT segments (`dxt_time`), out of the run time of all processes.
+    - `stdio_bytes_fraction`, `shared_bytes_fraction`: bytes moved by
+      STDIO, and on files shared by all ranks.
+    - `bytes_scale`, `files_scale`, `nprocs_scale`: the orders of
+      magnitude of the bytes moved (out of 15), files (out of 7) and
+      processes (out of 6).
+    """
+    sums: Dict[str, float] = dict.fromkeys(rollup_columns, 0.0)
+    patterns: Dict[str, float] = dict.fromkeys(pattern_counters, 0.0)
+    sizes: Dict[str, np.ndarray] = {'READ': np.zeros(len(size_bins)), 'WRITE': np.zeros(len(size_bins))}
+    posix_ops: float = 0.0
+    stdio_bytes: float = 0.0
+    shared_bytes: float = 0.0
+    ids: set = set()
+
+    for m, (counters_df, fcounters_df) in tables.items() :
+        records: pd.DataFrame = record_summary(m, counters_df, fcounters_df)
+        for c in rollup_columns :
+            sums[c] += float(records[c].sum())
+        nbytes: np.ndarray = (records['bytes_read'] + records['bytes_written']).to_numpy(dtype=np.float64)
+        shared_bytes += float(nbytes[np.asarray(records['rank']) == -1].sum())
+        ids.update(records['id'].astype(str))
+        if m == "STDIO" :
+            stdio_bytes += float(nbytes.sum())
+
+        for op, count, volume in [('READ', 'reads', 'bytes_read'), ('WRITE', 'writes', 'bytes_written')] :
+            histogram: List[str] = ["%s_SIZE_%s_%s" % (m, op, b) for b in size_bins]
+            if all(c in counters_df.columns for c in histogram) :
+                sizes[op] += np.clip(counters_df[histogram].to_numpy(dtype=np.float64), 0, None).sum(axis=0)
+                continue
+            ops: np.ndarray = records[count].to_numpy(dtype=np.float64)
+            done: np.ndarray = ops > 0
+            average: np.ndarray = records[volume].to_numpy(dtype=np.float64)[done] / ops[done]
+            np.add.at(sizes[op], np.searchsorted(size_bounds, average, side='right') - 1, ops[done])
+
+        if m == "POSIX" :
+            posix_ops += float((records['reads'] + records['writes']).sum())
+            for name, counters in pattern_counters.items() :
+                for c in counters :
+                    if c in counters_df.columns :
+                        patterns[name] += float(np.clip(counters_df[c].to_numpy(dtype=np.float64), 0, None).sum())
+
+    total_bytes: float = sums['bytes_read'] + sums['bytes_written']
+    io_time: float = sums['read_time'] + sums['write_time'] + sums['meta_time']
+    process_time: float = max(run_time, 0.0) * max(nprocs, 1)
+    return np.concatenate([_share(sizes['READ']), _share(sizes['WRITE']), [
+        _fraction(sums['bytes_read'], total_bytes),
+        _fraction(sums['reads'], sums['reads'] + sums['writes']),
+        _fraction(patterns['sequential'], posix_ops),
+        _fraction(patterns['consecutive'], posix_ops),
+        _fraction(patterns['rw_switch'], posix_ops),
+        _fraction(sums['meta_time'], io_time),
+        _fraction(io_time, process_time),
+        _fraction(dxt_time, process_time),
+        _fraction(stdio_bytes, total_bytes),
+        _fraction(shared_bytes, total_bytes),
+        _scale(total_bytes, 15),
+        _scale(len(ids), 7),
+        _scale(nprocs, 6)]])
+
+def fingerprint_table(keys: List[Tuple[Any, Any]], vectors: List[np.ndarray]) -> pd.DataFrame :
+    """Builds the `fingerprints` table: the jobid and juid of each (jobid, juid) in `keys`, and its vector.
+
+    Features are kept as float32, like in `FingerprintIndex`.
+    """
+    matrix: np.ndarray = np.array(vectors, dtype=np.float32).reshape(len(vectors), len(fingerprint_features))
+    df: pd.DataFrame = pd.DataFrame(matrix, columns=fingerprint_features)
+    df.insert(0, 'juid', [juid for _, juid in keys])
+    df.insert(0, 'jobid', [jobid for jobid, _ in keys])
+    return df
+
+class FingerprintIndex :
+    """Finds the jobs whose fingerprints are most similar to a given one.
+
+    Holds the fingerprints of many jobs as one float32 matrix, each row
+    scaled to unit length, so the cosine similarity of a query to every
+    job is a single matrix-vector product. The `k` best are then picked
+    out with a partial sort, without sorting all jobs. A million jobs
+    take about 130 MB, and are searched in about 20 milliseconds.
+    """
+    jobids: np.ndarray
+    juids: np.ndarray
+    vectors: np.ndarray
+
+    def __init__(self, jobids: Any, juids: Any, vectors: Any) :
+        self.jobids = np.asarray(jobids, dtype=np.int64)
+        self.juids = np.asarray(juids, dtype=np.int64)
+        # Stored by column, so the product with a query reads each
+        #   feature of every job in one contiguous run.
+        vectors = np.asfortranarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != len(fingerprint_features) :
+            raise ValueError("Fingerprints must have %i features, not shape %s." % (len(fingerprint_features),
+                                                                                    vectors.shape))
+        if not len(self.jobids) == len(self.juids) == len(vectors) :
+            raise ValueError("Need one jobid and juid per fingerprint.")
+        self.vectors = FingerprintIndex._normalize(vectors)
+
+    def __len__(self) -> int :
+        return len(self.vectors)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray :
+        norms: np.ndarray = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        # Jobs without any I/O stay all zeros, similar to nothing.
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    @staticmethod
+    def From_Table(df: pd.DataFrame) -> 'FingerprintIndex' :
+        """Indexes a `fingerprints` table, as written by `aggregate_darshan`."""
+        missing: List[str] = [c for c in ['jobid', 'juid'] + fingerprint_features if c not in df.columns]
+        if len(missing) > 0 :
+            raise ValueError("Fingerprint table has no column %s." % ", ".join(missing))
+        return FingerprintIndex(df['jobid'].to_numpy(), df['juid'].to_numpy(),
+                                df[fingerprint_features].to_numpy(dtype=np.float32))
+
+    @staticmethod
+    def From_Output(output_loc: str) -> 'FingerprintIndex' :
+        """Indexes the `fingerprints` table of the output at `output_loc`."""
+        from .query import OutputReader
+        return FingerprintIndex.From_Table(OutputReader(output_loc).read("fingerprints"))
+
+    def query(self, vector: Any, k: int = 10) -> pd.DataFrame :
+        """Returns the `k` jobs most similar to fingerprint `vector`, most similar first.
+
+        Each row holds the jobid, the juid and the cosine `similarity`.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (len(fingerprint_features),) :
+            raise ValueError("Fingerprints must have %i features, not shape %s." % (len(fingerprint_features),
+                                                                                    vector.shape))
+        return self._top(self.vectors @ FingerprintIndex._normalize(vector), k)
+
+    def query_job(self, jobid: Any, juid: Optional[Any] = None, k: int = 10) -> pd.DataFrame :
+        """Returns the `k` jobs most similar to job `jobid` (and `juid`), leaving it out; see `query`."""
+        match: np.ndarray = self.jobids == int(jobid)
+        if juid is not None :
+            match &= self.juids == int(juid)
+        found: np.ndarray = np.flatnonzero(match)
+        if len(found) == 0 :
+            raise ValueError("No fingerprint of job %s in the index." % jobid)
+        similarity: np.ndarray = self.vectors @ self.vectors[found[0]]
+        similarity[found] = -np.inf
+        return self._top(similarity, k, len(found))
+
+    def _top(self, similarity: np.ndarray, k: int, left_out: int = 0) -> pd.DataFrame :
+        k = max(0, min(k, len(similarity) - left_out))
+        n: int = len(similarity)
+        best: np.ndarray = np.argpartition(similarity, n - k)[n - k:] if 0 < k < n else np.arange(k)
+        best = best[np.argsort(-similarity[best], kind='stable')]
+        return pd.DataFrame({'jobid': self.jobids[best], 'juid': self.juids[best],
+                             'similarity': similarity[best].astype(np.float64)})
+
+    def save(self, path: str) -> None :
+        """Saves the index to `path`, an uncompressed `.npz` file."""
+        # Write to a temporary file first, so an interrupted save never
+        #   leaves a half-written index behind.
+        tmp: pathlib.Path = pathlib.Path(str(path) + ".tmp")
+        with open(tmp, 'wb') as f :
+            np.savez(f, jobids=self.jobids, juids=self.juids, vectors=self.vectors,
+                     features=np.array(fingerprint_features))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def Load(path: str) -> 'FingerprintIndex' :
+        """Loads an index saved by `save`."""
+        with np.load(path) as saved :
+            if list(saved['features']) != fingerprint_features :
+                raise ValueError("Index in %s was saved with other fingerprint features." % path)
+            index: FingerprintIndex = FingerprintIndex.__new__(FingerprintIndex)
+            index.jobids = saved['jobids']
+            index.juids = saved['juids']
+            index.vectors = np.asfortranarray(saved['vectors'])
+        return index
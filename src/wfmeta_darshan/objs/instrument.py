@@ -0,0 +1,269 @@
+import collections
+import contextlib
+import datetime
+import heapq
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+try :
+    import resource
+except ImportError :
+    # Not available on Windows; peak RSS is then left out.
+    resource = None
+
+##############################
+# run instrumentation        #
+##############################
+
+class Timer :
+    """Measures the wall and CPU time of a block, e.g. `with Timer() as t:`.
+
+    CPU time is that of the calling thread only, so blocks running on
+    several threads at once can be added up.
+    """
+    wall: float
+    cpu: float
+
+    def __init__(self) :
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self) -> 'Timer' :
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc) -> None :
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.thread_time() - self._cpu
+
+def _peak_rss() -> Dict[str, int] :
+    if resource is None :
+        return {}
+    # ru_maxrss is in KiB on Linux, but in bytes on macOS.
+    unit: int = 1 if os.uname().sysname == "Darwin" else 1024
+    return {'main': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit}
+
+def estimate_nbytes(df: pd.DataFrame, sample: int = 100) -> int :
+    """Estimates the memory held by `df`, without going over every row.
+
+    The objects (e.g. strings) of object columns are sized from a
+    `sample` of rows; an object shared by many rows, like a job key,
+    only counts once.
+    """
+    nbytes: int = int(df.memory_usage(index=False, deep=False).sum())
+    n: int = len(df)
+    if n == 0 :
+        return nbytes
+
+    rows: np.ndarray = np.unique(np.linspace(0, n - 1, min(n, sample)).astype(np.int64))
+    for column in df.columns :
+        if df[column].dtype == object :
+            values: Dict[int, Any] = {id(v): v for v in df[column].to_numpy()[rows]}
+            nbytes += int(sum(sys.getsizeof(v) for v in values.values()) * n / len(rows))
+    return nbytes
+
+class RunReport :
+    """Collects where the time of an aggregation run goes.
+
+    Phases (discovery, decode, metadata, concat, write) add up the wall
+    and CPU time spent in them; for phases that run on several threads
+    or worker processes at once, these are summed over all of them.
+    Per module, the decode time and the rows and bytes written are kept,
+    as well as the `n_slowest` logs to decode, and the bytes spilled to
+    disk to stay within a memory limit. `save` writes it all to
+    `run_report.json`.
+    """
+    file_name: str = "run_report.json"
+    version: int = 1
+
+    phases: Dict[str, Dict[str, float]]
+    modules: Dict[str, Dict[str, float]]
+    settings: Dict[str, Any]
+    n_logs: int
+    n_slowest: int
+    spilled_bytes: int
+    # min-heap of (decode seconds, path, per-module seconds).
+    _slowest: List[Tuple[float, str, Dict[str, float]]]
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, n_slowest: int = 10) :
+        self.phases = {}
+        self.modules = {}
+        self.settings = settings or {}
+        self.n_logs = 0
+        self.n_slowest = n_slowest
+        self.spilled_bytes = 0
+        self._slowest = []
+        self._lock = threading.Lock()
+
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self._wall = time.perf_counter()
+        self._times = os.times()
+
+    def add_time(self, phase: str, wall: float, cpu: float) -> None :
+        with self._lock :
+            p = self.phases.setdefault(phase, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            p['wall_seconds'] += wall
+            p['cpu_seconds'] += cpu
+            p['calls'] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None] :
+        with Timer() as t :
+            yield
+        self.add_time(name, t.wall, t.cpu)
+
+    def timed_iter(self, name: str, items: Iterable[Any]) -> Iterator[Any] :
+        """Yields from `items`, adding the time spent producing each item to phase `name`."""
+        it: Iterator[Any] = iter(items)
+        while True :
+            with Timer() as t :
+                item = next(it, StopIteration)
+            self.add_time(name, t.wall, t.cpu)
+            if item is StopIteration :
+                return
+            yield item
+
+    def add_log(self, path: str, timings: Dict[str, Tuple[float, float]]) -> None :
+        """Adds the decode `timings` of one log (see `Log.timings`)."""
+        with self._lock :
+            self.n_logs += 1
+            for part, (wall, cpu) in timings.items() :
+                p = self.phases.setdefault('decode', {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+                p['wall_seconds'] += wall
+                p['cpu_seconds'] += cpu
+                p['calls'] += 1
+                if part != 'header' :
+                    m = self._module(part)
+                    m['decode_seconds'] += wall
+                    m['decode_cpu_seconds'] += cpu
+
+            total: float = sum(wall for wall, _ in timings.values())
+            entry = (total, path, {part: wall for part, (wall, _) in timings.items()})
+            if len(self._slowest) < self.n_slowest :
+                heapq.heappush(self._slowest, entry)
+            elif total > self._slowest[0][0] :
+                heapq.heapreplace(self._slowest, entry)
+
+    def add_table(self, module_name: str, rows: int, nbytes: int) -> None :
+        with self._lock :
+            m = self._module(module_name)
+            m['rows'] += rows
+            m['bytes'] += nbytes
+
+    def add_spill(self, nbytes: int) -> None :
+        with self._lock :
+            self.spilled_bytes += nbytes
+
+    def _module(self, module_name: str) -> Dict[str, float] :
+        return self.modules.setdefault(module_name, {'decode_seconds': 0.0, 'decode_cpu_seconds': 0.0,
+                                                     'rows': 0, 'bytes': 0})
+
+    def to_dict(self) -> Dict[str, Any] :
+        now = os.times()
+        return {'version': self.version,
+                'started': self.started.isoformat(),
+                'wall_seconds': time.perf_counter() - self._wall,
+                # Worker processes only count once they have exited.
+                'cpu_seconds': sum(now[:4]) - sum(self._times[:4]),
+                'logs': self.n_logs,
+                'settings': self.settings,
+                'phases': self.phases,
+                'modules': self.modules,
+                'slowest_logs': [{'path': path, 'decode_seconds': total, 'parts': parts}
+                                 for total, path, parts in sorted(self._slowest, reverse=True)],
+                'spilled_bytes': self.spilled_bytes,
+                'peak_rss_bytes': _peak_rss()}
+
+    def save(self, output_loc: str) -> None :
+        path = pathlib.Path(output_loc, self.file_name)
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, 'w') as f :
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+class WatchMetrics :
+    """Backlog and latency of a watch run (see `watch_darshan`).
+
+    The backlog is the logs found but not written yet: `pending` ones,
+    not complete yet, and `queued` ones, complete and waiting for their
+    batch. The latency of a log runs from its last modification, i.e.
+    when Darshan finished writing it, to the commit of the batch holding
+    its rows; percentiles are over the last `window` logs. `save`
+    writes it all to `watch_metrics.json`.
+    """
+    file_name: str = "watch_metrics.json"
+    version: int = 1
+
+    polls: int
+    pending: int
+    queued: int
+    ingested: int
+    failed: int
+    batches: int
+    last_batch: Dict[str, float]
+    _latencies: Deque[float]
+
+    def __init__(self, window: int = 1000) :
+        self.polls = 0
+        self.pending = 0
+        self.queued = 0
+        self.ingested = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch = {}
+        self._latencies = collections.deque(maxlen=window)
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+
+    def add_poll(self, pending: int, queued: int) -> None :
+        self.polls += 1
+        self.pending = pending
+        self.queued = queued
+
+    def add_batch(self, mtimes: List[float], failed: int, seconds: float) -> None :
+        """Adds a committed batch, with the mtime of each log written."""
+        now: float = time.time()
+        self._latencies.extend(now - mtime for mtime in mtimes)
+        self.ingested += len(mtimes)
+        self.failed += failed
+        self.batches += 1
+        self.last_batch = {'logs': len(mtimes), 'failed': failed, 'seconds': seconds}
+
+    def latency(self) -> Dict[str, float] :
+        if len(self._latencies) == 0 :
+            return {}
+        latencies: np.ndarray = np.array(self._latencies)
+        return {'last': float(latencies[-1]),
+                'mean': float(latencies.mean()),
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'max': float(latencies.max())}
+
+    def to_dict(self) -> Dict[str, Any] :
+        return {'version': self.version,
+                'started': self.started.isoformat(),
+                'updated': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'polls': self.polls,
+                'backlog': self.pending + self.queued,
+                'pending': self.pending,
+                'queued': self.queued,
+                'ingested': self.ingested,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_batch': self.last_batch,
+                'latency_seconds': self.latency()}
+
+    def save(self, output_loc: str) -> None :
+        path = pathlib.Path(output_loc, self.file_name)
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, 'w') as f :
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
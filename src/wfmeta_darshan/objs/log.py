@@ -1,56 +1,348 @@
 import logging
-from typing import Any, Dict, List, Union
-from darshan import DarshanReport
-import darshan
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 import pandas as pd
-from .colls import POSIX_coll, LUSTRE_coll, STDIO_coll, DXT_POSIX_coll
+import numpy as np
+import pyarrow as pa
+from .colls import POSIX_coll, LUSTRE_coll, STDIO_coll, DXT_POSIX_coll, MPIIO_coll, DXT_MPIIO_coll, HEATMAP_coll, \
+                   DxtSpill, spilled_coll
+from .cache import DecodeCache
+from .constants import expected_modules
+from .instrument import Timer, estimate_nbytes
+from .manifest import file_hash
+from .names import names_table
+from .segments import SegmentStore, spread
+from .rollup import Rollup, record_summary, rollup_levels, rollup_modules, summarize
+from .fingerprint import fingerprint_table, job_fingerprint
+from .sampling import DxtSampling
+
+if TYPE_CHECKING :
+    from darshan import DarshanReport
+
+def _darshan() -> Any :
+    # pydarshan loads its C library when imported, which takes longer
+    #   than anything else the command line does, so it is only
+    #   imported once a log is actually opened.
+    import darshan
+    return darshan
 
 class Log:
     metadata: Dict[str, Any]
     juid: str
     jobid: str
 
-    expected_modules = ["POSIX", "LUSTRE", "STDIO", "DXT_POSIX", "HEATMAP", "MPI-IO", "DXT_MPIIO"]
+    expected_modules = expected_modules
+    # Modules this Log provides data for: present in the log, selected,
+    #   and with a collection class to decode them into.
     loaded_modules: List[str]
 
-    POSIX: POSIX_coll
-    LUSTRE: LUSTRE_coll
-    STDIO: STDIO_coll
-    DXT_POSIX: DXT_POSIX_coll
+    # Collection class for each module that can be decoded.
+    module_colls: Dict[str, type] = {"POSIX": POSIX_coll,
+                                     "LUSTRE": LUSTRE_coll,
+                                     "STDIO": STDIO_coll,
+                                     "DXT_POSIX": DXT_POSIX_coll,
+                                     "HEATMAP": HEATMAP_coll,
+                                     "MPI-IO": MPIIO_coll,
+                                     "DXT_MPIIO": DXT_MPIIO_coll}
 
     report: Any
+    path: str
     modules: List[str]
+    # Whether module tables use the compact schema (see `counters_coll`).
+    compact: bool
+    # Sampling of the DXT segments, if they are not all kept.
+    sampling: Optional[DxtSampling]
+    # Where DXT modules read from the file are spilled as they are
+    #   decoded, if they are not kept in memory; see `spilled_coll`.
+    spill: Optional[DxtSpill]
+
+    # Decoded collections, filled in as modules are first accessed.
+    _colls: Dict[str, Any]
+
+    # Cache the decoded tables are read from and saved to, under the
+    #   content hash `digest` of the log; see `From_File`.
+    cache: Optional[DecodeCache]
+    digest: Optional[str]
+    _header: Dict[str, Any]
+
+    # Wall and CPU seconds spent decoding this log, per module; 'header'
+    #   holds the time spent reading the job header.
+    timings: Dict[str, Tuple[float, float]]
+
+    # Per job, file and rank summaries, made on first use; see `rollup`.
+    _rollup: Optional[Dict[str, pd.DataFrame]]
+    # I/O fingerprint of the job, made on first use; see `fingerprint`.
+    _fingerprint: Optional[np.ndarray]
+
+    # Path of every record id in the log, read along with the first
+    #   decoded modules; None until then.
+    names: Optional[Dict[int, str]]
+
+    def __init__(self, report: 'DarshanReport', modules: Optional[List[str]] = None,
+                 compact: bool = False, sampling: Optional[DxtSampling] = None) :
+        """Wraps the job metadata of `report`.
 
-    def __init__(self, report: DarshanReport) :
-        self.metadata = report.metadata
-        self.juid = report.metadata['job']['uid']
-        self.jobid = report.metadata['job']['jobid']
+        Module records are not decoded here: each module in `modules`
+        (by default, every module with a collection class) is read and
+        decoded the first time it is accessed, e.g. through `log.POSIX`,
+        or all at once through `load`. With `compact`, the module tables
+        use the compact schema. With a `sampling`, DXT modules only keep
+        a weighted sample of their segments (see `DxtSampling`).
+
+        `report` is only kept until every module has been decoded.
+        """
+        self._set_header(report.metadata, report.filename, list(report.modules.keys()), modules, compact,
+                         sampling)
         self.report = report
 
-        self.modules = list(report.modules.keys())
+    def _set_header(self, metadata: Dict[str, Any], path: str, present: List[str],
+                    modules: Optional[List[str]], compact: bool,
+                    sampling: Optional[DxtSampling] = None) -> None :
+        self.metadata = metadata
+        self.juid = metadata['job']['uid']
+        self.jobid = metadata['job']['jobid']
+        self.path = path
+        self.compact = compact
+        self.sampling = sampling
+        self.spill = None
+        self.cache = None
+        self.digest = None
+        self._header = {'metadata': metadata, 'modules': present}
+        self.timings = {}
+        self._rollup = None
+        self._fingerprint = None
+        self.names = None
+
+        self.modules = present
 
         self.loaded_modules = []
+        self._colls = {}
 
         for m in self.modules:
             if m not in self.expected_modules :
                 print("Unexpected module found: %s" % m)
 
-            match m:
-                case "POSIX":
-                    self.POSIX = POSIX_coll(report.records[m], self.juid, self.jobid)
-                    self.loaded_modules.append(m)
-                case "LUSTRE":
-                    self.LUSTRE = LUSTRE_coll(report.records[m], self.juid, self.jobid)
-                    self.loaded_modules.append(m)
-                case "STDIO":
-                    self.STDIO = STDIO_coll(report.records[m], self.juid, self.jobid)
-                    self.loaded_modules.append(m)
-                case "DXT_POSIX":
-                    self.DXT_POSIX = DXT_POSIX_coll(report.records[m], self.juid, self.jobid)
-                    self.loaded_modules.append(m)
+            if m in self.module_colls and (modules is None or m in modules) :
+                self.loaded_modules.append(m)
 
-    def get_metadata_df(self) -> pd.DataFrame:
-        j_m: Dict[str, Any] = self.metadata['job']
+    @property
+    def POSIX(self) -> POSIX_coll:
+        return self._get_coll("POSIX")
+
+    @property
+    def LUSTRE(self) -> LUSTRE_coll:
+        return self._get_coll("LUSTRE")
+
+    @property
+    def STDIO(self) -> STDIO_coll:
+        return self._get_coll("STDIO")
+
+    @property
+    def DXT_POSIX(self) -> DXT_POSIX_coll:
+        return self._get_coll("DXT_POSIX")
+
+    @property
+    def HEATMAP(self) -> HEATMAP_coll:
+        return self._get_coll("HEATMAP")
+
+    @property
+    def MPIIO(self) -> MPIIO_coll:
+        return self._get_coll("MPI-IO")
+
+    @property
+    def DXT_MPIIO(self) -> DXT_MPIIO_coll:
+        return self._get_coll("DXT_MPIIO")
+
+    def _get_coll(self, module_name: str) -> Any:
+        if module_name not in self.loaded_modules :
+            raise AttributeError("Log does not have module %s loaded." % module_name)
+
+        if module_name not in self._colls :
+            self.load([module_name])
+
+        return self._colls[module_name]
+
+    # Modules whose collections take a `sampling`.
+    sampled_modules: List[str] = ["DXT_POSIX", "DXT_MPIIO"]
+
+    def _new_coll(self, module_name: str, records: Any, rngs: Optional[Tuple[Any, Any]] = None) -> Any :
+        if module_name in self.sampled_modules and self.sampling is not None :
+            return self.module_colls[module_name](records, self.juid, self.jobid, compact=self.compact,
+                                                  sampling=self.sampling, rngs=rngs)
+        return self.module_colls[module_name](records, self.juid, self.jobid, compact=self.compact)
+
+    def _spill_module(self, report: 'DarshanReport', module_name: str) -> spilled_coll :
+        # Reads the records one at a time, keeping those with a name
+        #   like `mod_read_all_dxt_records` does, and only ever holds
+        #   one chunk of them.
+        backend: Any = _darshan().backend.cffi_backend
+        if not report.name_records_read :
+            report.read_name_records()
+
+        def records() -> Iterator[Dict[str, Any]] :
+            record = backend.log_get_dxt_record(report.log, module_name)
+            while record is not None :
+                if record['id'] in report.name_records :
+                    yield record
+                record = backend.log_get_dxt_record(report.log, module_name)
+
+        spilled: spilled_coll = spilled_coll(module_name, self.juid, self.jobid, self.spill.spill_dir,
+                                             self.compact, self.sampling is not None)
+        rngs: Optional[Tuple[Any, Any]] = self.sampling.rngs(self.juid, self.jobid) if self.sampling is not None else None
+        for chunk in self.spill.chunks(records()) :
+            spilled.add(self._new_coll(module_name, chunk, rngs))
+        if sum(len(paths) for paths in spilled.files.values()) == 0 :
+            # No records: the same (empty) tables as an unspilled module.
+            spilled.add(self._new_coll(module_name, [], rngs))
+        return spilled
+
+    def _cache_name(self, module_name: str) -> str :
+        # Sampled tables are cached apart from the full ones.
+        if module_name in self.sampled_modules and self.sampling is not None :
+            return "%s@%s" % (module_name, self.sampling.spec.replace(":", "-"))
+        return module_name
+
+    @staticmethod
+    def _read_module_records(report: 'DarshanReport', module_name: str) -> None:
+        match module_name:
+            case "DXT_POSIX" | "DXT_MPIIO":
+                report.mod_read_all_dxt_records(module_name)
+            case "LUSTRE":
+                report.mod_read_all_lustre_records()
+            case "HEATMAP":
+                try :
+                    report.read_all_heatmap_records()
+                except (OverflowError, ValueError, RuntimeError) as e :
+                    # A damaged heatmap region should not cost the
+                    #   other modules; the log then has no heatmaps.
+                    logging.warning("Could not read heatmaps of %s: %s" % (report.filename, e))
+                    report.heatmaps = {}
+            case _:
+                report.mod_read_all_records(module_name)
+
+    @staticmethod
+    def _module_records(report: 'DarshanReport', module_name: str) -> Any:
+        # Heatmaps are kept apart from the other records, per module
+        #   they were recorded for.
+        if module_name == "HEATMAP" :
+            return report.heatmaps
+        return report.records[module_name]
+
+    @staticmethod
+    def _has_records(report: 'DarshanReport', module_name: str) -> bool:
+        if module_name == "HEATMAP" :
+            return len(getattr(report, 'heatmaps', {})) > 0
+        return module_name in report.records
+
+    def load(self, modules: Optional[List[str]] = None) -> 'Log':
+        """Decodes `modules` (by default, all loaded modules) now.
+
+        Modules that were already decoded are left alone. Records the
+        report does not hold yet are read from the log file, opening it
+        once for all of `modules`. The log's name records (see `names`)
+        are read along with the first modules. Once every loaded module
+        is decoded, the report is let go.
+        """
+        if modules is None :
+            modules = self.loaded_modules
+        to_load: List[str] = [m for m in modules if m in self.loaded_modules and m not in self._colls]
+        if self.cache is not None :
+            for m in to_load :
+                with Timer() as t :
+                    tables = self.cache.get_tables(self.digest, self.compact, self._cache_name(m), self._header)
+                    if tables is not None :
+                        self._colls[m] = self.module_colls[m].From_Tables(tables, self.juid, self.jobid,
+                                                                          compact=self.compact)
+                self._add_timing(m, t)
+            to_load = [m for m in to_load if m not in self._colls]
+
+            if self.names is None :
+                tables = self.cache.get_tables(self.digest, self.compact, "names", self._header)
+                if tables is not None :
+                    self._set_names(tables['names'])
+
+        if len(to_load) == 0 :
+            self._release_report()
+            return self
+
+        read_names: bool = self.names is None
+        if self.report is not None and all(Log._has_records(self.report, m) for m in to_load) :
+            for m in to_load :
+                with Timer() as t :
+                    self._colls[m] = self._new_coll(m, Log._module_records(self.report, m))
+                self._add_timing(m, t)
+            if read_names :
+                self.names = dict(getattr(self.report, 'name_records', {}))
+        else :
+            with Timer() as t :
+                report = _darshan().DarshanReport(self.path, read_all=False)
+            self._add_timing('header', t)
+            with report :
+                # Heatmaps are read first: after DXT records, the
+                #   darshan-util heatmap reader may find none.
+                for m in sorted(to_load, key=lambda m: m != "HEATMAP") :
+                    with Timer() as t :
+                        if self.spill is not None and m in self.sampled_modules :
+                            self._colls[m] = self._spill_module(report, m)
+                        else :
+                            Log._read_module_records(report, m)
+                            self._colls[m] = self._new_coll(m, Log._module_records(report, m))
+                    self._add_timing(m, t)
+                if read_names :
+                    if not report.name_records_read :
+                        report.read_name_records()
+                    self.names = dict(report.name_records)
+
+        if self.cache is not None :
+            for m in to_load :
+                with Timer() as t :
+                    self.cache.put_tables(self.digest, self.compact, self._cache_name(m), self._header,
+                                          self._cache_tables(m))
+                self._add_timing(m, t)
+            if read_names :
+                self.cache.put_tables(self.digest, self.compact, "names", self._header,
+                                      {'names': self.get_names_df()})
+
+        self._release_report()
+        return self
+
+    def _cache_tables(self, module_name: str) -> Dict[str, Any] :
+        coll: Any = self._colls[module_name]
+        if isinstance(coll, spilled_coll) :
+            # Copied from file to file, without reading them into memory.
+            return {name: pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+                    for name, tables in coll.arrow_chunks().items()}
+        return coll.get_df_with_ids()
+
+    def _release_report(self) -> None :
+        if all(m in self._colls for m in self.loaded_modules) :
+            self.report = None
+
+    def _set_names(self, df: pd.DataFrame) -> None :
+        self.names = dict(zip(df['id'].astype(np.uint64).tolist(), df['path']))
+
+    def get_names_df(self) -> pd.DataFrame :
+        """Returns the `names` table of this log; see `names_table`."""
+        if self.names is None :
+            self.load()
+        return names_table(self.names or {}, self.compact)
+
+    def _add_timing(self, part: str, t: Timer) -> None :
+        wall, cpu = self.timings.get(part, (0.0, 0.0))
+        self.timings[part] = (wall + t.wall, cpu + t.cpu)
+
+    # Columns of the metadata table; one has_<module> column is added
+    #   per expected module.
+    metadata_header: List[str] = ['uid', 'jobid', 
+                                  'start_time_sec', 'start_time_nsec',
+                                  'end_time_sec', 'end_time_nsec',
+                                  'nprocs', 'run_time',
+                                  'log_ver',
+                                  'meta.lib_ver', 'meta.h', 'exe'] + \
+                                 ["has_%s" % module for module in expected_modules]
+
+    @staticmethod
+    def _metadata_row(metadata: Dict[str, Any], modules: List[str]) -> List[Any]:
+        j_m: Dict[str, Any] = metadata['job']
         j_d: List = [j_m['uid'], j_m['jobid'], 
                      j_m['start_time_sec'], j_m['start_time_nsec'],
                      j_m['end_time_sec'], j_m['end_time_nsec'],
@@ -58,15 +350,80 @@ class Log:
                      j_m['log_ver'],
                      j_m['metadata']['lib_ver'],
                      j_m['metadata']['h'],
-                     self.metadata['exe']]
+                     metadata['exe']]
         
-        for module in self.expected_modules:
-            if module in self.report.modules.keys():
+        for module in Log.expected_modules:
+            if module in modules:
                 j_d.append(True)
             else :
                 j_d.append(False)
-        
-        return pd.DataFrame([j_d])
+
+        return j_d
+
+    def get_metadata_row(self) -> List[Any]:
+        return Log._metadata_row(self.metadata, self.modules)
+
+    def get_metadata_df(self) -> pd.DataFrame:
+        return pd.DataFrame([self.get_metadata_row()])
+
+    def detach(self) -> 'Log':
+        """Decodes every loaded module, so no `DarshanReport` is needed anymore.
+
+        Only the decoded per-module tables, the name records and the job
+        metadata are kept, which makes the Log small and cheap to send
+        between processes.
+        """
+        self.load()
+        self.report = None
+        return self
+
+    def rollup(self) -> Dict[str, pd.DataFrame] :
+        """Sums this log's POSIX and STDIO counters up per job, file and rank.
+
+        Returns one summary table per level of `rollup_levels`, with a
+        row per module and key, and jobid, juid and module columns first.
+        """
+        if self._rollup is not None :
+            return self._rollup
+
+        frames: Dict[str, List[pd.DataFrame]] = {level: [] for level in rollup_levels}
+        for m in rollup_modules :
+            if m not in self.loaded_modules :
+                continue
+            coll = self._get_coll(m)
+            if len(coll.counters_df) == 0 :
+                continue
+
+            records: pd.DataFrame = record_summary(m, coll.counters_df, coll.fcounters_df)
+            for level in rollup_levels :
+                df: pd.DataFrame = summarize(records, level)
+                df.insert(0, 'module', m)
+                df.insert(0, 'juid', self.juid)
+                df.insert(0, 'jobid', self.jobid)
+                frames[level].append(df)
+
+        self._rollup = {level: pd.concat(f, ignore_index=True) if len(f) > 0 else pd.DataFrame()
+                        for level, f in frames.items()}
+        return self._rollup
+
+    def fingerprint(self) -> np.ndarray :
+        """Computes this log's I/O fingerprint from its POSIX, STDIO and DXT_POSIX data.
+
+        See `job_fingerprint`; modules that are not loaded count as
+        having no records.
+        """
+        if self._fingerprint is not None :
+            return self._fingerprint
+
+        tables: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+        for m in rollup_modules :
+            if m in self.loaded_modules and len(self._get_coll(m).counters_df) > 0 :
+                tables[m] = (self._get_coll(m).counters_df, self._get_coll(m).fcounters_df)
+        dxt_time: float = self.DXT_POSIX.segment_time() if "DXT_POSIX" in self.loaded_modules else 0.0
+
+        job: Dict[str, Any] = self.metadata['job']
+        self._fingerprint = job_fingerprint(tables, job['nprocs'], job['run_time'], dxt_time)
+        return self._fingerprint
 
     def get_module_as_df(self, module_name: str) -> Dict[str, pd.DataFrame] :
         if module_name not in self.expected_modules :
@@ -77,88 +434,240 @@ class Log:
             logging.warning("Tried to get module %s from a log that does not have it loaded." % module_name)
             return {'NULL': pd.DataFrame()}
         
-        output = pd.DataFrame()
-        match module_name:
-            case "POSIX" :
-                output = self.POSIX.get_df_with_ids()
-            case "LUSTRE":
-                output = self.LUSTRE.get_df_with_ids()
-            case "STDIO":
-                output = self.STDIO.get_df_with_ids()
-            case "DXT_POSIX":
-                output = self.DXT_POSIX.get_df_with_ids()
-            case _:
-                logging.error("Attempted to access module name %s in Log switch-case that does not exist." % module_name)
-                exit(1)
-        
-        return output
+        return self._get_coll(module_name).get_df_with_ids()
+
+    def get_module_as_arrow(self, module_name: str) -> Dict[str, List[pa.Table]] :
+        """Returns the tables of `module_name` as Arrow tables, each in one or more chunks.
+
+        The tables of a spilled module (see `spilled_coll`) are read
+        memory-mapped, a chunk per spilled file; the others are converted
+        from their DataFrames, in one chunk.
+        """
+        if module_name in self.loaded_modules and isinstance(self._get_coll(module_name), spilled_coll) :
+            return self._colls[module_name].arrow_chunks()
+        return {name: [pa.Table.from_pandas(df, preserve_index=False)]
+                for name, df in self.get_module_as_df(module_name).items()}
+
+    def nbytes(self) -> int :
+        """Estimates the memory held by the decoded module tables; see `estimate_nbytes`.
+
+        Spilled modules are on disk, and do not count.
+        """
+        return sum(estimate_nbytes(df) for coll in self._colls.values() if not isinstance(coll, spilled_coll)
+                   for df in coll.get_df_with_ids().values())
+
+    def remove_spilled(self) -> None :
+        """Deletes the files of the spilled modules, once they are written out."""
+        for coll in self._colls.values() :
+            if isinstance(coll, spilled_coll) :
+                coll.remove()
 
     @staticmethod
     def get_total_metadata_df(logs: List['Log']) -> pd.DataFrame:
-        output_df_collection: List[pd.DataFrame] = []
-        header: List[str] = ['uid', 'jobid', 
-                         'start_time_sec', 'start_time_nsec',
-                         'end_time_sec', 'end_time_nsec',
-                         'nprocs', 'run_time',
-                         'log_ver',
-                         'meta.lib_ver', 'meta.h', 'exe']
-        for module in Log.expected_modules :
-            header.append("has_%s" % module)
-
-        for log in logs:
-            output_df_collection.append(log.get_metadata_df())
-
-        output_df: pd.DataFrame = pd.concat(output_df_collection, ignore_index=True)
-        output_df.columns = header
-
-        return output_df
+        return Log.metadata_rows_to_df([log.get_metadata_row() for log in logs])
+
+    @staticmethod
+    def metadata_rows_to_df(rows: List[List[Any]]) -> pd.DataFrame:
+        """Builds the metadata table from rows made by `get_metadata_row`.
+
+        All rows go into a single DataFrame at once, rather than one
+        DataFrame per log being concatenated.
+        """
+        if len(rows) == 0 :
+            return pd.DataFrame(columns=Log.metadata_header)
+
+        columns: Dict[str, List[Any]] = dict(zip(Log.metadata_header, map(list, zip(*rows))))
+        return pd.DataFrame(columns)
+
+    @staticmethod
+    def Metadata_Row_From_File(path: str) -> List[Any]:
+        """Reads the metadata row of the log at `path`.
+
+        Only the job header and the module list are read; unlike
+        `From_File`, no Log is built.
+        """
+        with _darshan().DarshanReport(path, read_all=False) as report:
+            return Log._metadata_row(report.metadata, list(report.modules.keys()))
     
     @staticmethod
-    def From_File(path: str) -> 'Log':
-        with darshan.DarshanReport(path) as report:
-            output = Log(report)
+    def From_File(path: str, modules: Optional[List[str]] = None, compact: bool = False,
+                  cache: Optional[DecodeCache] = None, sampling: Optional[DxtSampling] = None,
+                  spill: Optional[DxtSpill] = None) -> 'Log':
+        """Reads the job metadata of the log at `path`.
+
+        Only the header is read here; the records of `modules` are read
+        from the file when first accessed (see `Log.load`), with DXT
+        segments sampled by `sampling`. With a `spill`, DXT modules are
+        decoded a chunk of records at a time, and spilled to disk (see
+        `spilled_coll`), so no log needs all its segments in memory.
+
+        With a `cache`, the log is looked up by its content hash: the
+        header and any module tables found there are used instead of
+        reading the file, and whatever does get decoded is saved to it.
+        """
+        with Timer() as t :
+            digest: Optional[str] = None
+            header: Optional[Dict[str, Any]] = None
+            if cache is not None :
+                digest = file_hash(path)
+                header = cache.get_header(digest, compact)
+
+            if header is not None :
+                output = Log.__new__(Log)
+                output._set_header(header['metadata'], path, header['modules'], modules, compact, sampling)
+                output._header = header
+                output.report = None
+            else :
+                with _darshan().DarshanReport(path, read_all=False) as report:
+                    output = Log(report, modules, compact, sampling)
+                # The report is closed; modules are read from the file again.
+                output.report = None
+        output._add_timing('header', t)
+        output.spill = spill
+
+        if cache is not None :
+            output.cache = cache
+            output.digest = digest
+            if header is None :
+                cache.put_header(digest, compact, output._header)
         
         return output
     
 class LogCollection:
-    # Eventually, may want to add aggregation statistics, and this is
-    #   the best place to do so because it has access to all the data.
+    # Aggregation statistics across logs: see `get_rollups`.
     # Perhaps eventually create classes for collected collections,
     #   so we don't have to turn it into dfs right away, but idk.
     logs: List[Log]
 
+    # Tables each module is aggregated into.
+    module_tables: Dict[str, List[str]] = {"DXT_POSIX": ['read_segments', 'write_segments'],
+                                           "POSIX": ['counters', 'fcounters'],
+                                           "STDIO": ['counters', 'fcounters'],
+                                           "LUSTRE": ['counters'],
+                                           "HEATMAP": ['bins'],
+                                           "MPI-IO": ['counters', 'fcounters'],
+                                           "DXT_MPIIO": ['read_segments', 'write_segments']}
+    # Tables only some runs have, e.g. the per-record `totals` of sampled
+    #   DXT segments; only built when one of the logs has them.
+    optional_tables: Dict[str, List[str]] = {"DXT_POSIX": ['totals'],
+                                             "DXT_MPIIO": ['totals']}
+
+    # Aggregated tables of each module, built on first use. Every table
+    #   is made of one chunk per log (or per spilled chunk of a log),
+    #   so building it copies nothing.
+    _tables: Dict[str, Dict[str, pa.Table]]
+
     def __init__(self, logs: List[Log]) :
         self.logs = logs
+        self._tables = {}
 
-    def get_module_as_df(self, module_name: str) -> Dict[str, pd.DataFrame]:
-        output: Dict[str, pd.DataFrame] = {}
-
+    def get_module_as_arrow(self, module_name: str) -> Dict[str, pa.Table]:
         if module_name not in Log.expected_modules :
             logging.error("Provided module name %s, which is not expected." % module_name)
             exit(1)
 
-        collected_dfs: Dict[str, List[pd.DataFrame]] = {}
-        keys: list[str] = []
-        match module_name:
-            case "DXT_POSIX":
-                keys = ['read_segments', 'write_segments']
-            case "POSIX":
-                keys = ['counters', 'fcounters']
-            case "STDIO":
-                keys = ['counters', 'fcounters']
-            case "LUSTRE":
-                keys = ['counters']
+        if module_name in self._tables :
+            return self._tables[module_name]
 
-        for key in keys:
-            collected_dfs[key] = []
+        keys: List[str] = self.module_tables.get(module_name, [])
+        optional: List[str] = self.optional_tables.get(module_name, [])
+        chunks: Dict[str, List[pa.Table]] = {key: [] for key in keys + optional}
         
         for l in self.logs :
             if module_name in l.loaded_modules :
-                dfs: Dict[str, pd.DataFrame] = l.get_module_as_df(module_name)
-                for key in keys :
-                    collected_dfs[key].append(dfs[key])
-        
-        for key in keys:
-            output[key] = pd.concat(collected_dfs[key], ignore_index=True)
+                tables: Dict[str, List[pa.Table]] = l.get_module_as_arrow(module_name)
+                for key in keys + [key for key in optional if key in tables] :
+                    chunks[key].extend(tables[key])
+
+        output: Dict[str, pa.Table] = {}
+        for key in keys + [key for key in optional if len(chunks[key]) > 0] :
+            if len(chunks[key]) == 0 :
+                # None of the logs have this module.
+                output[key] = pa.table({})
+            else :
+                # Logs can lack columns others have (filled with nulls), and
+                #   categoricals can have different index widths per log.
+                output[key] = pa.concat_tables(chunks[key], promote_options="permissive")
+
+        self._tables[module_name] = output
+        return output
+
+    def to_arrow(self, module_name: str, key: str) -> pa.Table:
+        """Returns the aggregated `key` table of `module_name`, without copying."""
+        return self.get_module_as_arrow(module_name)[key]
+
+    def to_pandas(self, module_name: str, key: str) -> pd.DataFrame:
+        """Returns the aggregated `key` table of `module_name` as a DataFrame.
+
+        The per-log chunks are combined here, in a single copy.
+        """
+        return self.to_arrow(module_name, key).to_pandas(split_blocks=True)
+
+    def get_module_as_df(self, module_name: str) -> Dict[str, pd.DataFrame]:
+        return {key: self.to_pandas(module_name, key) for key in self.get_module_as_arrow(module_name)}
+
+    def get_heatmap(self, submodule: str = "POSIX", bin_width: Optional[float] = None) -> pd.DataFrame:
+        """Sums the `submodule` heatmaps of all logs over time.
+
+        Every log's bins are first summed over its ranks, and then spread
+        onto one grid of `bin_width` seconds (by default, the widest bin
+        of any log), in seconds since the epoch; see `spread`. Returns
+        one row per bin, with its `start` and the bytes read and written.
+        """
+        starts: List[np.ndarray] = []
+        widths: List[np.ndarray] = []
+        read: List[np.ndarray] = []
+        write: List[np.ndarray] = []
+        for l in self.logs :
+            if "HEATMAP" not in l.loaded_modules or submodule not in l.HEATMAP.submodules :
+                continue
+            job: Dict[str, Any] = l.metadata['job']
+            width: float = l.HEATMAP.bin_widths[submodule]
+            r, w = l.HEATMAP.totals(submodule)
+            starts.append(job['start_time_sec'] + job['start_time_nsec'] * 1e-9 + np.arange(len(r)) * width)
+            widths.append(np.full(len(r), width))
+            read.append(r)
+            write.append(w)
+
+        if len(starts) == 0 :
+            return pd.DataFrame({'start': [], 'read_bytes': [], 'write_bytes': []})
+
+        start: np.ndarray = np.concatenate(starts)
+        end: np.ndarray = start + np.concatenate(widths)
+        if bin_width is None :
+            bin_width = float(max((w.max() for w in widths if len(w) > 0), default=1.0))
+        t0: float = float(start.min())
+        n_bins: int = max(1, int(np.ceil((end.max() - t0) / bin_width)))
+        return pd.DataFrame({'start': t0 + np.arange(n_bins) * bin_width,
+                             'read_bytes': spread(start, end, np.concatenate(read), t0, bin_width, n_bins),
+                             'write_bytes': spread(start, end, np.concatenate(write), t0, bin_width, n_bins)})
+
+    def get_segment_store(self, module_name: str = "DXT_POSIX") -> SegmentStore:
+        """Returns the DXT segments of all logs, indexed by time; see `SegmentStore`."""
+        return SegmentStore.From_Logs(self.logs, module_name)
+
+    def get_names(self) -> pd.DataFrame:
+        """Returns the `names` table of all logs: every record id once, with its path.
+
+        Ids are hashes of the paths, so the same id means the same path
+        in every log. Join it to a module table with `join_paths`.
+        """
+        frames: List[pd.DataFrame] = [l.get_names_df() for l in self.logs]
+        if len(frames) == 0 :
+            return names_table({})
+        return pd.concat(frames, ignore_index=True).drop_duplicates('id', ignore_index=True)
+
+    def get_rollups(self) -> Dict[str, pd.DataFrame]:
+        """Returns the `rollup_job`, `rollup_file` and `rollup_rank` tables of all logs.
+
+        See `Rollup`; each log is summed up on its own, so this only
+        puts together the small per-log summaries.
+        """
+        rollup: Rollup = Rollup()
+        for l in self.logs :
+            rollup.add(l.rollup())
+        return rollup.tables()
 
-        return output
\ No newline at end of file
+    def get_fingerprints(self) -> pd.DataFrame:
+        """Returns the `fingerprints` table: the I/O fingerprint of every log; see `Log.fingerprint`."""
+        return fingerprint_table([(l.jobid, l.juid) for l in self.logs], [l.fingerprint() for l in self.logs])
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+##############################
+# processed-log manifest     #
+##############################
+
+def file_hash(path: str, blocksize: int = 1 << 20) -> str :
+    """Returns the sha256 hex digest of the file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f :
+        for block in iter(lambda: f.read(blocksize), b'') :
+            h.update(block)
+    return h.hexdigest()
+
+class ManifestPlan :
+    """What an incremental run has to do to bring its outputs up to date."""
+    # Logs to (re-)read, in input order.
+    to_read: List[str]
+
+    # (jobid, juid) keys whose rows have to be removed from the outputs
+    #   before the logs in `to_read` are appended.
+    retract: Set[Tuple[int, int]]
+
+    # Paths of logs that no longer exist and have been dropped.
+    removed: List[str]
+
+    # Content hashes already computed for the logs in `to_read`.
+    hashes: Dict[str, str]
+
+    def __init__(self) :
+        self.to_read = []
+        self.retract = set()
+        self.removed = []
+        self.hashes = {}
+
+class Manifest :
+    """Records which logs have been ingested into an output directory.
+
+    Logs are keyed by path, and identified by their size, mtime and
+    content hash. The manifest also holds the writer state (see
+    `OutputWriter.state`) so a later run can append to the outputs.
+
+    Batches of logs are written between `begin` and `commit`. If a run
+    dies in between, `uncommitted` keeps the writer state from before
+    the batch, so the next run can roll its rows back (see `recover`).
+    """
+    file_name: str = "manifest.json"
+    version: int = 1
+
+    output_loc: str
+    output_format: str
+    # Modules written to the output; None for all of them.
+    modules: Optional[List[str]]
+    # Whether the outputs use the compact schema.
+    compact: bool
+    # DXT sampling of the outputs, as a `DxtSampling.spec`; None if all
+    #   segments are kept.
+    sampling: Optional[str]
+
+    # path -> {size, mtime_ns, hash, jobid, juid}
+    logs: Dict[str, Dict[str, Any]]
+    tables: Dict[str, int]
+    uncommitted: Optional[Dict[str, int]]
+
+    def __init__(self, output_loc: str, output_format: str = 'csv',
+                 modules: Optional[List[str]] = None, compact: bool = False,
+                 sampling: Optional[str] = None) :
+        self.output_loc = str(output_loc)
+        self.output_format = output_format
+        self.modules = modules
+        self.compact = compact
+        self.sampling = sampling
+        self.logs = {}
+        self.tables = {}
+        self.uncommitted = None
+
+    @property
+    def path(self) -> pathlib.Path :
+        return pathlib.Path(self.output_loc, self.file_name)
+
+    @staticmethod
+    def Load(output_loc: str, output_format: str = 'csv',
+             modules: Optional[List[str]] = None, compact: bool = False,
+             sampling: Optional[str] = None) -> 'Manifest' :
+        """Loads the manifest from `output_loc`, or starts an empty one."""
+        manifest = Manifest(output_loc, output_format, modules, compact, sampling)
+        if not manifest.path.exists() :
+            return manifest
+
+        with open(manifest.path) as f :
+            saved: Dict[str, Any] = json.load(f)
+
+        if saved.get('version') != Manifest.version :
+            raise ValueError("Manifest %s has unsupported version %s." % (manifest.path, saved.get('version')))
+        if saved['output_format'] != output_format :
+            raise ValueError("Output in %s was written as %s, not %s." % (output_loc, saved['output_format'], output_format))
+        if saved.get('modules') != modules :
+            raise ValueError("Output in %s was written for modules %s, not %s." % (output_loc, saved.get('modules'), modules))
+        if saved.get('compact', False) != compact :
+            raise ValueError("Output in %s was written with compact=%s, not %s." % (output_loc, saved.get('compact', False), compact))
+        if saved.get('sampling') != sampling :
+            raise ValueError("Output in %s was written with DXT sampling %s, not %s." % (output_loc, saved.get('sampling'), sampling))
+
+        manifest.logs = saved['logs']
+        manifest.tables = saved['tables']
+        manifest.uncommitted = saved.get('uncommitted')
+        return manifest
+
+    @staticmethod
+    def Open(output_loc: str) -> 'Manifest' :
+        """Loads the manifest of an existing output, whatever its settings."""
+        path: pathlib.Path = pathlib.Path(output_loc, Manifest.file_name)
+        if not path.exists() :
+            raise ValueError("No %s found in %s." % (Manifest.file_name, output_loc))
+
+        with open(path) as f :
+            saved: Dict[str, Any] = json.load(f)
+        return Manifest.Load(output_loc, saved['output_format'], saved.get('modules'), saved.get('compact', False),
+                             saved.get('sampling'))
+
+    def save(self) -> None :
+        # Write to a temporary file first, so an interrupted run never
+        #   leaves a half-written manifest behind.
+        tmp = self.path.with_suffix(".json.tmp")
+        os.makedirs(self.output_loc, exist_ok=True)
+        with open(tmp, 'w') as f :
+            json.dump({'version': self.version,
+                       'output_format': self.output_format,
+                       'modules': self.modules,
+                       'compact': self.compact,
+                       'sampling': self.sampling,
+                       'logs': self.logs,
+                       # tables can be written concurrently, in any order.
+                       'tables': dict(sorted(self.tables.items())),
+                       'uncommitted': self.uncommitted}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def begin(self, tables: Dict[str, int]) -> None :
+        """Marks the start of a batch, with the writer state from before it."""
+        self.uncommitted = dict(tables)
+        self.save()
+
+    def commit(self, tables: Dict[str, int]) -> None :
+        """Marks the batch done, with the writer state after it."""
+        self.tables = dict(tables)
+        self.uncommitted = None
+        self.save()
+
+    def recover(self, writer: Any) -> bool :
+        """Rolls back the rows of a batch that was begun but never committed.
+
+        Returns whether there was one. Logs are only recorded once their
+        batch is committed, so its logs are read again by the next run.
+        """
+        if self.uncommitted is None :
+            return False
+        writer.rollback(self.uncommitted)
+        self.commit(self.uncommitted)
+        return True
+
+    def plan(self, files: List[str]) -> ManifestPlan :
+        """Compares `files` against the manifest.
+
+        New and changed logs are read. Changed and removed logs have
+        their old rows retracted; since rows are only identified by
+        (jobid, juid), unchanged logs that share one of those keys are
+        read again as well.
+        """
+        plan = ManifestPlan()
+        unchanged: List[str] = []
+        present: Set[str] = set()
+
+        for f in files :
+            key: str = os.path.abspath(f)
+            present.add(key)
+            entry = self.logs.get(key)
+            st = os.stat(f)
+
+            if entry is not None and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns :
+                unchanged.append(f)
+                continue
+
+            digest: str = file_hash(f)
+            if entry is not None and entry['hash'] == digest :
+                # touched, but not changed.
+                entry['mtime_ns'] = st.st_mtime_ns
+                unchanged.append(f)
+                continue
+
+            if entry is not None :
+                plan.retract.add((entry['jobid'], entry['juid']))
+                del self.logs[key]
+            plan.to_read.append(f)
+            plan.hashes[f] = digest
+
+        for key in list(self.logs.keys()) :
+            if key not in present :
+                entry = self.logs.pop(key)
+                plan.retract.add((entry['jobid'], entry['juid']))
+                plan.removed.append(key)
+
+        if len(plan.retract) > 0 :
+            for f in unchanged :
+                entry = self.logs[os.path.abspath(f)]
+                if (entry['jobid'], entry['juid']) in plan.retract :
+                    del self.logs[os.path.abspath(f)]
+                    plan.to_read.append(f)
+                    plan.hashes[f] = entry['hash']
+
+            # keep the input order.
+            order: Dict[str, int] = {f: i for i, f in enumerate(files)}
+            plan.to_read.sort(key=lambda f: order[f])
+
+        return plan
+
+    def record(self, path: str, jobid: int, juid: int, digest: Optional[str] = None) -> None :
+        st = os.stat(path)
+        if digest is None :
+            digest = file_hash(path)
+
+        self.logs[os.path.abspath(path)] = {'size': st.st_size,
+                                            'mtime_ns': st.st_mtime_ns,
+                                            'hash': digest,
+                                            'jobid': jobid,
+                                            'juid': juid}
@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, Set
+import numpy as np
+import pandas as pd
+
+##############################
+# record names               #
+##############################
+
+def names_table(names: Dict[int, str], compact: bool = False) -> pd.DataFrame :
+    """Builds the `names` table of one log from its name records.
+
+    Holds one row per record id, with the `path` it is the hash of. Ids
+    have the same type as in the module tables: uint64 with `compact`,
+    str otherwise.
+    """
+    ids: np.ndarray = np.fromiter(names.keys(), dtype=np.uint64, count=len(names))
+    return pd.DataFrame({'id': ids if compact else ids.astype(str).astype(object),
+                         'path': np.array(list(names.values()), dtype=object)})
+
+def unseen_names(df: pd.DataFrame, seen: Set[int]) -> pd.DataFrame :
+    """Drops the rows of `df` whose id is in `seen`, or repeats an earlier row.
+
+    The ids that are left are added to `seen`.
+    """
+    df = df.drop_duplicates('id')
+    ids: np.ndarray = df['id'].astype(np.uint64).to_numpy()
+    new: np.ndarray = np.fromiter((int(i) not in seen for i in ids), dtype=bool, count=len(ids))
+    seen.update(int(i) for i in ids[new])
+    return df[new]
+
+def join_paths(df: pd.DataFrame, names: pd.DataFrame, column: str = 'path') -> pd.DataFrame :
+    """Adds the path of every row's record id to module table `df`.
+
+    `names` is a `names` table, e.g. from `LogCollection.get_names` or
+    read back from an output; ids are matched by value, so str ids join
+    with uint64 ones. Rows whose id has no name get a missing path.
+    """
+    lookup: pd.Series = pd.Series(names['path'].to_numpy(), index=names['id'].astype(np.uint64).to_numpy())
+    lookup = lookup[~lookup.index.duplicated()]
+    df = df.copy()
+    df[column] = lookup.reindex(df['id'].astype(np.uint64).to_numpy()).to_numpy()
+    return df
+
+def id_set(ids: Iterable) -> Set[int] :
+    """Returns `ids` (str or integer) as a set of ints, e.g. to seed `unseen_names`."""
+    return set(pd.Series(list(ids), dtype=object).astype(np.uint64).tolist())
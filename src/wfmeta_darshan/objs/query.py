@@ -0,0 +1,243 @@
+import csv
+import pathlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+from .manifest import Manifest
+from .writers import DatasetWriter, make_writer
+
+##############################
+# querying outputs           #
+##############################
+
+# A filter value: one value, or any of several.
+Match = Union[Any, Sequence[Any]]
+
+class OutputReader :
+    """Reads the tables of an aggregated output back, filtered while scanning.
+
+    Every table is opened as a pyarrow dataset, and `read` hands its
+    filters and columns to the scan: only the requested columns are
+    decoded, and only the rows that match are kept. With the parquet
+    and arrow formats, filters on the jobid skip every other job's
+    partition directory unopened, and parquet row groups whose
+    statistics rule out the filters on rank, file id or uid are
+    skipped too. Csv files have neither, so they are still read from
+    start to end, but a batch at a time, without holding more than the
+    matching rows.
+    """
+    output_loc: str
+    output_format: str
+
+    def __init__(self, output_loc: str, output_format: Optional[str] = None) :
+        """Opens the output at `output_loc`, in the format of its manifest unless given."""
+        self.output_loc = str(output_loc)
+        if output_format is None :
+            output_format = Manifest.Open(output_loc).output_format
+        # Checks the format.
+        make_writer(output_loc, output_format)
+        self.output_format = output_format
+        self._datasets: Dict[str, Optional[ds.Dataset]] = {}
+
+    def tables(self) -> List[str] :
+        """Names the tables of the output."""
+        return make_writer(self.output_loc, self.output_format).tables(self.output_loc)
+
+    @staticmethod
+    def _key_columns(name: str) -> Tuple[str, str] :
+        # Columns holding the job keys; see `OutputWriter.retract`.
+        return ('jobid', 'uid') if name == "metadata" else ('jobid', 'juid')
+
+    def dataset(self, name: str) -> Optional[ds.Dataset] :
+        """Opens table `name` as a dataset; None if it is empty."""
+        if name in self._datasets :
+            return self._datasets[name]
+
+        dataset: Optional[ds.Dataset] = None
+        if self.output_format == 'csv' :
+            path: pathlib.Path = pathlib.Path(self.output_loc, name + ".csv")
+            if not path.exists() :
+                raise ValueError("Output in %s has no table %s." % (self.output_loc, name))
+            if path.stat().st_size > 1 :
+                # Record ids are unsigned 64-bit hashes, which would not
+                #   survive being guessed as int64 or double.
+                with open(path, newline='') as f :
+                    header: List[str] = next(csv.reader(f))
+                types: Dict[str, pa.DataType] = {c: pa.string() for c in ['id', 'pthread_id'] if c in header}
+                dataset = ds.dataset(str(path), format=ds.CsvFileFormat(convert_options=pacsv.ConvertOptions(column_types=types)))
+        else :
+            path = pathlib.Path(self.output_loc, name)
+            if not path.is_dir() :
+                raise ValueError("Output in %s has no table %s." % (self.output_loc, name))
+            fmt: str = DatasetWriter.formats[self.output_format]
+            dataset = ds.dataset(str(path), format=fmt, partitioning="hive")
+            fragments: List[ds.Fragment] = list(dataset.get_fragments())
+            if len(fragments) == 0 :
+                dataset = None
+            else :
+                # Logs can lack columns others have, and dictionaries can
+                #   have different index types per file; the first file's
+                #   schema is not enough.
+                schema: pa.Schema = pa.unify_schemas([f.physical_schema for f in fragments],
+                                                     promote_options="permissive")
+                for field in dataset.schema :
+                    if field.name not in schema.names :
+                        schema = schema.append(field)
+                dataset = ds.dataset(str(path), format=fmt, partitioning="hive", schema=schema)
+
+        self._datasets[name] = dataset
+        return dataset
+
+    @staticmethod
+    def _match(dataset: ds.Dataset, column: str, values: Match) -> ds.Expression :
+        if column not in dataset.schema.names :
+            raise ValueError("Table has no %s column to filter on." % column)
+        if isinstance(values, (str, bytes)) or not isinstance(values, (Sequence, np.ndarray, pd.Series, set)) :
+            values = [values]
+        field: ds.Expression = ds.field(column)
+        dtype: pa.DataType = dataset.schema.field(column).type
+        if pa.types.is_dictionary(dtype) :
+            dtype = dtype.value_type
+            field = field.cast(dtype)
+        return field.isin(pa.array([str(v) if pa.types.is_string(dtype) else v for v in values]).cast(dtype))
+
+    def filter(self, name: str, jobid: Optional[Match] = None, uid: Optional[Match] = None,
+               rank: Optional[Match] = None, file_id: Optional[Match] = None) -> Optional[ds.Expression] :
+        """Builds the scan filter of table `name`; see `read`."""
+        dataset: Optional[ds.Dataset] = self.dataset(name)
+        if dataset is None :
+            return None
+
+        jobid_col, uid_col = OutputReader._key_columns(name)
+        expression: Optional[ds.Expression] = None
+        for column, values in [(jobid_col, jobid), (uid_col, uid), ('rank', rank), ('id', file_id)] :
+            if values is None :
+                continue
+            match: ds.Expression = OutputReader._match(dataset, column, values)
+            expression = match if expression is None else expression & match
+        return expression
+
+    def jobs(self, jobid: Optional[Match] = None, uid: Optional[Match] = None,
+             start: Optional[float] = None, end: Optional[float] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame :
+        """Returns the metadata of the matching jobs, with their `start` and `end` times.
+
+        Jobs match if they ran at any point in [`start`, `end`), in
+        seconds since the epoch (open ended where None), besides the
+        `jobid` and `uid` filters. Returns the jobid and uid, `columns`
+        of the metadata table, and `start` and `end`.
+        """
+        times: List[str] = ['start_time_sec', 'start_time_nsec', 'end_time_sec', 'end_time_nsec']
+        wanted: List[str] = ['jobid', 'uid'] + [c for c in (columns or []) if c not in ('jobid', 'uid')]
+        expression: Optional[ds.Expression] = self.filter("metadata", jobid, uid)
+        if start is not None :
+            match: ds.Expression = ds.field('end_time_sec') >= int(np.floor(start))
+            expression = match if expression is None else expression & match
+        if end is not None :
+            match = ds.field('start_time_sec') < int(np.ceil(end))
+            expression = match if expression is None else expression & match
+
+        df: pd.DataFrame = self._scan("metadata", wanted + [c for c in times if c not in wanted], expression)
+        df['start'] = df['start_time_sec'] + df['start_time_nsec'] * 1e-9
+        df['end'] = df['end_time_sec'] + df['end_time_nsec'] * 1e-9
+        # The filters above go by whole seconds.
+        keep: pd.Series = pd.Series(True, index=df.index)
+        if start is not None :
+            keep &= df['end'] >= start
+        if end is not None :
+            keep &= df['start'] < end
+        return df.loc[keep, wanted + ['start', 'end']].reset_index(drop=True)
+
+    def _scan(self, name: str, columns: Optional[List[str]], expression: Optional[ds.Expression]) -> pd.DataFrame :
+        dataset: Optional[ds.Dataset] = self.dataset(name)
+        if dataset is None :
+            return pd.DataFrame(columns=columns or [])
+        if columns is None :
+            # Leaves out the row numbers of csv files.
+            columns = [c for c in dataset.schema.names if c != ""]
+        missing: List[str] = [c for c in columns if c not in dataset.schema.names]
+        if len(missing) > 0 :
+            raise ValueError("Table %s has no column %s." % (name, ", ".join(missing)))
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    def read(self, name: str, columns: Optional[List[str]] = None,
+             jobid: Optional[Match] = None, uid: Optional[Match] = None,
+             rank: Optional[Match] = None, file_id: Optional[Match] = None,
+             start: Optional[float] = None, end: Optional[float] = None,
+             metadata: Optional[List[str]] = None) -> pd.DataFrame :
+        """Reads the matching rows of `columns` (by default, all) of table `name`.
+
+        Each filter takes a value or a list of values: `jobid`, `uid`
+        (the juid of module tables), `rank` and `file_id` (the record
+        id). With `start` or `end`, in seconds since the epoch, only the
+        rows of jobs that ran at some point in [`start`, `end`) are
+        kept, and of DXT segments, only those overlapping it.
+
+        `metadata` names columns of the metadata table to join to the
+        rows, by job. Only those columns of the jobs in the result are
+        read.
+        """
+        jobid_col, uid_col = OutputReader._key_columns(name)
+        jobs: Optional[pd.DataFrame] = None
+        if start is not None or end is not None :
+            jobs = self.jobs(jobid, uid, start, end)
+            jobid, uid = list(jobs['jobid']), list(jobs['uid'])
+
+        dataset: Optional[ds.Dataset] = self.dataset(name)
+        joined: List[str] = [c for c in (metadata or []) if name != "metadata" and c not in (columns or [])]
+        if dataset is None :
+            return pd.DataFrame(columns=(columns or []) + joined)
+        if columns is None :
+            columns = [c for c in dataset.schema.names if c != ""]
+        wanted: List[str] = columns
+
+        # Also needed: the job keys to match rows to their jobs or their
+        #   metadata, and the times to match segments to the window.
+        segments: bool = jobs is not None and {'start_time', 'end_time'} <= set(dataset.schema.names) and \
+                         name != "metadata"
+        extra: List[str] = []
+        if jobs is not None or metadata is not None :
+            extra += [jobid_col, uid_col]
+        if segments :
+            extra += ['start_time', 'end_time']
+        columns = wanted + [c for c in extra if c not in wanted]
+
+        df: pd.DataFrame = self._scan(name, columns, self.filter(name, jobid, uid, rank, file_id))
+        if jobs is not None and len(df) > 0 :
+            # jobid and uid were only filtered on one at a time.
+            job_keys: pd.DataFrame = jobs[['jobid', 'uid', 'start']].rename(columns={'jobid': jobid_col, 'uid': uid_col,
+                                                                                     'start': '_job_start'})
+            df = df.merge(job_keys, on=[jobid_col, uid_col], how='inner')
+            if segments :
+                # DXT times count from the start of the job.
+                job_start: pd.Series = df['_job_start']
+                keep: pd.Series = pd.Series(True, index=df.index)
+                if start is not None :
+                    keep &= (job_start + df['end_time'] > start) | (job_start + df['start_time'] >= start)
+                if end is not None :
+                    keep &= job_start + df['start_time'] < end
+                df = df[keep]
+
+        if len(joined) > 0 :
+            df = self.join_metadata(df, joined, jobid_col, uid_col)
+        return df[wanted + joined].reset_index(drop=True)
+
+    def join_metadata(self, df: pd.DataFrame, columns: List[str],
+                      jobid_col: str = 'jobid', uid_col: str = 'juid') -> pd.DataFrame :
+        """Adds `columns` of the metadata table to the rows of `df`, by job.
+
+        Only the metadata of the jobs in `df` is read.
+        """
+        for c in (jobid_col, uid_col) :
+            if c not in df.columns :
+                raise ValueError("Rows need a %s column to join the metadata on." % c)
+        wanted: List[str] = [c for c in columns if c not in ('jobid', 'uid')]
+        if len(df) == 0 :
+            return df.assign(**{c: pd.Series(dtype=object) for c in wanted})
+        meta: pd.DataFrame = self._scan("metadata", ['jobid', 'uid'] + wanted,
+                                        self.filter("metadata", jobid=pd.unique(df[jobid_col]).tolist()))
+        meta = meta.rename(columns={'jobid': jobid_col, 'uid': uid_col})
+        return df.merge(meta.drop_duplicates([jobid_col, uid_col]), on=[jobid_col, uid_col], how='left')
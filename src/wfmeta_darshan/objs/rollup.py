@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+##############################
+# rollup statistics          #
+##############################
+
+# Modules rolled up, and the counters each summary column is summed
+#   from; `%s` is the module's counter prefix.
+rollup_modules: List[str] = ["POSIX", "STDIO"]
+rollup_columns: Dict[str, str] = {'bytes_read': '%s_BYTES_READ',
+                                  'bytes_written': '%s_BYTES_WRITTEN',
+                                  'reads': '%s_READS',
+                                  'writes': '%s_WRITES',
+                                  'opens': '%s_OPENS',
+                                  'read_time': '%s_F_READ_TIME',
+                                  'write_time': '%s_F_WRITE_TIME',
+                                  'meta_time': '%s_F_META_TIME'}
+
+# Rollup levels, and the columns (besides jobid, juid and module) their
+#   rows are keyed by.
+rollup_levels: Dict[str, List[str]] = {'job': [], 'file': ['id'], 'rank': ['rank']}
+
+def record_summary(module_name: str, counters_df: pd.DataFrame, fcounters_df: pd.DataFrame) -> pd.DataFrame :
+    """Picks the summary columns out of one log's module tables.
+
+    Returns one row per record (file id and rank), with the `rollup_columns`.
+    """
+    # Both tables come from the same records, in the same order.
+    columns: Dict[str, Any] = {'rank': counters_df['rank'].to_numpy(), 'id': counters_df['id'].to_numpy()}
+    for name, counter in rollup_columns.items() :
+        counter = counter % module_name
+        source: pd.DataFrame = fcounters_df if counter in fcounters_df.columns else counters_df
+        values: np.ndarray = source[counter].to_numpy()
+        # Darshan marks counters it could not record with -1.
+        columns[name] = np.where(values < 0, 0, values)
+    return pd.DataFrame(columns)
+
+def summarize(records: pd.DataFrame, level: str) -> pd.DataFrame :
+    """Sums `records` (see `record_summary`) up to one `rollup_levels` level.
+
+    Besides the summed columns, every row counts the `records` it sums,
+    and, per job and rank, the distinct `files` those touch. Records of
+    files shared by all ranks (rank -1) are rolled up under rank -1.
+    """
+    keys: List[str] = rollup_levels[level]
+    values: List[str] = list(rollup_columns)
+    if len(keys) == 0 :
+        return pd.DataFrame({'records': [len(records)], 'files': [records['id'].nunique()],
+                             **{c: [records[c].sum()] for c in values}})
+
+    grouped = records.groupby(keys, observed=True, sort=True)
+    summary = grouped[values].sum()
+    if level != 'file' :
+        summary.insert(0, 'files', grouped['id'].nunique())
+    summary.insert(0, 'records', grouped.size())
+    return summary.reset_index()
+
+class Rollup :
+    """Rolls the POSIX and STDIO counters of logs up per job, file and rank.
+
+    Logs are added one at a time (see `add`); each is summed up on its
+    own, so only its small summary frames are kept, and `tables` puts
+    those together. A log is one job, so the `job` table has one row per
+    log and module; the rows of a job that left several logs can be
+    summed by jobid.
+    """
+    _frames: Dict[str, List[pd.DataFrame]]
+
+    def __init__(self) :
+        self._frames = {level: [] for level in rollup_levels}
+
+    def add(self, summaries: Dict[str, pd.DataFrame]) -> None :
+        """Adds the summaries of one log, as made by `Log.rollup`."""
+        for level, df in summaries.items() :
+            if len(df) > 0 :
+                self._frames[level].append(df)
+
+    def tables(self) -> Dict[str, pd.DataFrame] :
+        """Returns the `rollup_<level>` tables of every log added."""
+        return {"rollup_" + level: pd.concat(frames, ignore_index=True) if len(frames) > 0 else pd.DataFrame()
+                for level, frames in self._frames.items()}
@@ -0,0 +1,113 @@
+import zlib
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from .constants import sample_methods
+
+##############################
+# sampled DXT segments       #
+##############################
+
+class DxtSampling :
+    """How many DXT segments to keep per record, and how to pick them.
+
+    A record holds the segments of one file on one rank. Records with
+    more than `size` segments of a kind (reads or writes) keep only
+    `size` of them, each with a `weight`: the number of segments it
+    stands for. Summing a column times the weights estimates its total
+    over all the segments, without bias.
+
+    With the `reservoir` method, the kept segments are a uniform random
+    sample, all weighing n / `size`. With `time`, the record's segments
+    are split, in start time order, into `size` runs of (nearly) equal
+    length, and one segment is picked at random from each, weighing the
+    length of its run; the sample then covers the whole run of the job.
+
+    Samples are drawn with generators seeded by `seed` and the log's
+    job keys, one for reads and one for writes, so the same log is
+    always sampled the same way, even when its records are decoded a
+    chunk at a time.
+    """
+    method: str
+    size: int
+    seed: int
+
+    def __init__(self, size: int, method: str = 'reservoir', seed: int = 0) :
+        if method not in sample_methods :
+            raise ValueError("Unknown sampling method %s; expected one of %s." % (method, ",".join(sample_methods)))
+        if size <= 0 :
+            raise ValueError("Sample size must be positive, not %s." % size)
+        self.method = method
+        self.size = size
+        self.seed = seed
+
+    @property
+    def spec(self) -> str :
+        """The sampling as `method:size[:seed]`, like `--dxt-sample`; names it in manifests and caches."""
+        spec: str = "%s:%i" % (self.method, self.size)
+        return spec if self.seed == 0 else "%s:%i" % (spec, self.seed)
+
+    def __eq__(self, other: Any) -> bool :
+        return isinstance(other, DxtSampling) and self.spec == other.spec
+
+    def __repr__(self) -> str :
+        return "DxtSampling(%r)" % self.spec
+
+    def rngs(self, juid: Any, jobid: Any) -> Tuple[np.random.Generator, np.random.Generator] :
+        """Returns the generators of the read and of the write segments of a log."""
+        key: int = zlib.crc32(("%s/%s" % (juid, jobid)).encode())
+        return np.random.default_rng([self.seed, key]), np.random.default_rng([self.seed, key, 1])
+
+    def pick(self, segments: List[Dict[str, Any]], rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray] :
+        """Returns the positions of the segments to keep, in order, and their weights."""
+        n: int = len(segments)
+        if n <= self.size :
+            return np.arange(n), np.ones(n)
+
+        if self.method == 'reservoir' :
+            kept: np.ndarray = np.sort(rng.choice(n, self.size, replace=False))
+            return kept, np.full(self.size, n / self.size)
+
+        starts: np.ndarray = np.fromiter((seg['start_time'] for seg in segments), dtype=np.float64, count=n)
+        order: np.ndarray = np.argsort(starts, kind='stable')
+        bounds: np.ndarray = np.linspace(0, n, self.size + 1).astype(np.int64)
+        lengths: np.ndarray = np.diff(bounds)
+        kept = order[bounds[:-1] + (rng.random(self.size) * lengths).astype(np.int64)]
+        # Back in record order, like the reservoir sample.
+        back: np.ndarray = np.argsort(kept)
+        return kept[back], lengths[back].astype(np.float64)
+
+def segment_totals(records: List[Any], compact: bool = False) -> pd.DataFrame :
+    """Sums up all DXT segments of each record, sampled or not.
+
+    Returns one row per record with its rank and id (and hostname, with
+    `compact`), and the number of read and write segments, their bytes
+    and their time (the sum of their durations), in seconds. Ids and
+    ranks are typed as in the segment tables.
+    """
+    columns: Dict[str, Any] = {}
+    ranks: np.ndarray = np.fromiter((record['rank'] for record in records), dtype=np.int64, count=len(records))
+    ids: np.ndarray = np.fromiter((record['id'] for record in records), dtype=np.uint64, count=len(records))
+    if compact :
+        columns['rank'] = pd.Categorical(ranks)
+        columns['id'] = ids
+        columns['hostname'] = pd.Categorical(np.array([record['hostname'] for record in records], dtype=object))
+    else :
+        columns['rank'] = ranks
+        columns['id'] = pd.Series(ids.astype(str).astype(object)).astype(str)
+
+    for op in ['read', 'write'] :
+        count: np.ndarray = np.zeros(len(records), dtype=np.int64)
+        nbytes: np.ndarray = np.zeros(len(records), dtype=np.int64)
+        time: np.ndarray = np.zeros(len(records))
+        for i, record in enumerate(records) :
+            segments: List[Dict[str, Any]] = record[op + "_segments"]
+            count[i] = len(segments)
+            nbytes[i] = np.fromiter((seg['length'] for seg in segments), dtype=np.int64, count=len(segments)).sum()
+            time[i] = np.fromiter((seg['end_time'] - seg['start_time'] for seg in segments), dtype=np.float64,
+                                  count=len(segments)).sum()
+        columns[op + "_segments"] = count
+        columns[op + "_bytes"] = nbytes
+        columns[op + "_time"] = time
+
+    return pd.DataFrame(columns)
@@ -0,0 +1,276 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+##############################
+# time-indexed DXT segments  #
+##############################
+
+class SegmentStore :
+    """DXT segments of many logs, sorted by start time for window queries.
+
+    Segments are kept as flat numpy columns, in order of their absolute
+    start time: the start time of the job (from its log's metadata)
+    plus DXT's start time relative to it, in seconds since the epoch.
+    `max_end` holds the running maximum of the end times in that order,
+    so the segments overlapping a time window are found with two binary
+    searches, without scanning the others. On top of that, `by_file`
+    lists the segments of each (log, file) pair together, still in start
+    order, so queries about one job or file only look at its segments.
+
+    Per segment, this costs 53 bytes (plus 8 for `by_file`), whatever
+    the number of logs and files. Sampled segments (see `DxtSampling`)
+    also keep their `weight`, which timelines count them by.
+    """
+    op_names: List[str] = ["read", "write"]
+
+    start: np.ndarray
+    end: np.ndarray
+    max_end: np.ndarray
+    offset: np.ndarray
+    length: np.ndarray
+    # 0 for reads, 1 for writes (see `op_names`).
+    op: np.ndarray
+    rank: np.ndarray
+    # Index into `jobids`, one per log the segment came from.
+    log: np.ndarray
+    # Index into `file_ids`.
+    file: np.ndarray
+    # Number of segments each one stands for; None if none were sampled.
+    weight: Optional[np.ndarray]
+
+    jobids: np.ndarray
+    file_ids: np.ndarray
+
+    # Segment positions grouped by (log, file) key, `log * len(file_ids)
+    #   + file`: the segments of `keys[k]` are `by_file[key_offsets[k]:
+    #   key_offsets[k + 1]]`.
+    by_file: np.ndarray
+    keys: np.ndarray
+    key_offsets: np.ndarray
+
+    def __init__(self, columns: Dict[str, np.ndarray], jobids: np.ndarray, file_ids: np.ndarray) :
+        """Indexes `columns`, as made by `From_Logs`.
+
+        `columns` holds the start, end, offset, length, op, rank, log and
+        file of every segment, in any order, and optionally their weight.
+        """
+        self.jobids = jobids
+        self.file_ids = file_ids
+        self.weight = None
+
+        order: np.ndarray = np.argsort(columns['start'], kind='stable')
+        for name in ['start', 'end', 'offset', 'length', 'op', 'rank', 'log', 'file', 'weight'] :
+            if name not in columns :
+                continue
+            # One column at a time, to keep only one extra copy around.
+            setattr(self, name, columns.pop(name)[order])
+        del order
+
+        # A segment that claims to end before it starts is taken to be
+        #   instantaneous.
+        np.maximum(self.end, self.start, out=self.end)
+        self.max_end = np.maximum.accumulate(self.end) if len(self.end) > 0 else self.end.copy()
+
+        key: np.ndarray = self.log.astype(np.int64) * max(len(file_ids), 1) + self.file
+        self.by_file = np.argsort(key, kind='stable')
+        sorted_keys: np.ndarray = key[self.by_file]
+        bounds: np.ndarray = np.flatnonzero(np.diff(sorted_keys)) + 1
+        self.keys = sorted_keys[np.concatenate(([0], bounds))] if len(key) > 0 else sorted_keys
+        self.key_offsets = np.concatenate(([0], bounds, [len(key)])) if len(key) > 0 else np.zeros(1, dtype=np.int64)
+
+    @staticmethod
+    def From_Logs(logs: List[Any], module_name: str = "DXT_POSIX") -> 'SegmentStore' :
+        """Builds the store from the DXT segments of `logs`."""
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in ['start', 'end', 'offset', 'length',
+                                                                     'op', 'rank', 'log', 'ids', 'weight']}
+        sampled: bool = False
+        jobids: List[Any] = []
+        for i, log in enumerate(logs) :
+            jobids.append(log.jobid)
+            if module_name not in log.loaded_modules :
+                continue
+
+            job: Dict[str, Any] = log.metadata['job']
+            job_start: float = job['start_time_sec'] + job['start_time_nsec'] * 1e-9
+            tables: Dict[str, pd.DataFrame] = log.get_module_as_df(module_name)
+            for op, name in enumerate(['read_segments', 'write_segments']) :
+                df: pd.DataFrame = tables[name]
+                if len(df) == 0 :
+                    continue
+                parts['start'].append(df['start_time'].to_numpy(dtype=np.float64) + job_start)
+                parts['end'].append(df['end_time'].to_numpy(dtype=np.float64) + job_start)
+                parts['offset'].append(df['offset'].to_numpy(dtype=np.int64))
+                parts['length'].append(df['length'].to_numpy(dtype=np.int64))
+                parts['op'].append(np.full(len(df), op, dtype=np.int8))
+                parts['rank'].append(np.asarray(df['rank'], dtype=np.int32))
+                parts['log'].append(np.full(len(df), i, dtype=np.int32))
+                # ids are str, or uint64 in the compact schema.
+                parts['ids'].append(df['id'].astype(np.uint64).to_numpy())
+                if 'weight' in df.columns :
+                    sampled = True
+                    parts['weight'].append(df['weight'].to_numpy(dtype=np.float64))
+                else :
+                    parts['weight'].append(np.ones(len(df)))
+
+        dtypes: Dict[str, Any] = {'start': np.float64, 'end': np.float64, 'offset': np.int64, 'length': np.int64,
+                                  'op': np.int8, 'rank': np.int32, 'log': np.int32, 'ids': np.uint64,
+                                  'weight': np.float64}
+        columns: Dict[str, np.ndarray] = {name: np.concatenate(p) if len(p) > 0 else np.empty(0, dtype=dtypes[name])
+                                          for name, p in parts.items()}
+        if not sampled :
+            del columns['weight']
+        file_ids, files = np.unique(columns.pop('ids'), return_inverse=True)
+        columns['file'] = files.astype(np.int32)
+        return SegmentStore(columns, np.array(jobids), file_ids)
+
+    def __len__(self) -> int :
+        return len(self.start)
+
+    ##############################
+    # selection                  #
+    ##############################
+
+    def _logs_of(self, jobid: Any) -> np.ndarray :
+        return np.flatnonzero(self.jobids == jobid)
+
+    def _key_range(self, lo_key: int, hi_key: int) -> np.ndarray :
+        # Positions of the segments whose key is in [lo_key, hi_key).
+        a, b = np.searchsorted(self.keys, [lo_key, hi_key])
+        return self.by_file[self.key_offsets[a]:self.key_offsets[b]]
+
+    def select(self, t0: Optional[float] = None, t1: Optional[float] = None,
+               jobid: Optional[Any] = None, file_id: Optional[int] = None,
+               op: Optional[str] = None) -> np.ndarray :
+        """Returns the positions of the matching segments, in start order.
+
+        Segments match if they overlap the window [`t0`, `t1`) (open
+        ended where None), belong to a log of `jobid` and to the file
+        `file_id`, and are reads or writes as `op` says.
+        """
+        t0 = -np.inf if t0 is None else t0
+        t1 = np.inf if t1 is None else t1
+
+        if jobid is None and file_id is None :
+            # No segment before the first one with a running maximum end
+            #   of t0 or later reaches into the window.
+            lo: int = int(np.searchsorted(self.max_end, t0, side='left'))
+            hi: int = int(np.searchsorted(self.start, t1, side='left'))
+            positions: np.ndarray = np.arange(lo, max(lo, hi))
+        else :
+            logs: np.ndarray = self._logs_of(jobid) if jobid is not None else np.arange(len(self.jobids))
+            n_files: int = max(len(self.file_ids), 1)
+            groups: List[np.ndarray] = []
+            if file_id is not None :
+                f: int = int(np.searchsorted(self.file_ids, np.uint64(file_id)))
+                if f < len(self.file_ids) and self.file_ids[f] == np.uint64(file_id) :
+                    groups = [self._key_range(l * n_files + f, l * n_files + f + 1) for l in logs]
+            else :
+                groups = [self._key_range(l * n_files, (l + 1) * n_files) for l in logs]
+            # Positions follow start order.
+            positions = np.sort(np.concatenate(groups)) if len(groups) > 0 else np.empty(0, dtype=np.int64)
+            positions = positions[self.start[positions] < t1]
+
+        # Instantaneous segments at t0 are in the window too.
+        mask: np.ndarray = (self.end[positions] > t0) | (self.start[positions] >= t0)
+        if op is not None :
+            mask &= self.op[positions] == self.op_names.index(op)
+        return positions[mask]
+
+    def window(self, t0: Optional[float] = None, t1: Optional[float] = None,
+               jobid: Optional[Any] = None, file_id: Optional[int] = None,
+               op: Optional[str] = None) -> pd.DataFrame :
+        """Returns the segments overlapping [`t0`, `t1`) as a DataFrame; see `select`."""
+        p: np.ndarray = self.select(t0, t1, jobid, file_id, op)
+        df: pd.DataFrame = pd.DataFrame({'jobid': self.jobids[self.log[p]],
+                                         'id': self.file_ids[self.file[p]],
+                                         'rank': self.rank[p],
+                                         'op': pd.Categorical.from_codes(self.op[p], categories=self.op_names),
+                                         'offset': self.offset[p],
+                                         'length': self.length[p],
+                                         'start': self.start[p],
+                                         'end': self.end[p]})
+        if self.weight is not None :
+            df['weight'] = self.weight[p]
+        return df
+
+    ##############################
+    # timelines                  #
+    ##############################
+
+    def timeline(self, bin_width: float, t0: Optional[float] = None, t1: Optional[float] = None,
+                 jobid: Optional[Any] = None, file_id: Optional[int] = None) -> pd.DataFrame :
+        """Bins the selected segments' I/O over time, `bin_width` seconds per bin.
+
+        Bins start at `t0` (by default, the first selected start) and go
+        up to `t1` (by default, the last selected end). Each segment's
+        bytes are spread evenly over its duration, while each operation
+        counts in the bin it starts in. Returns one row per bin with the
+        bytes, operations, bandwidth (bytes/s) and IOPS of reads and of
+        writes. Sampled segments count `weight` times, which makes these
+        estimates.
+        """
+        if bin_width <= 0 :
+            raise ValueError("Bin width must be positive, not %s." % bin_width)
+
+        p: np.ndarray = self.select(t0, t1, jobid, file_id)
+        if t0 is None :
+            t0 = float(self.start[p].min()) if len(p) > 0 else 0.0
+        if t1 is None :
+            t1 = float(self.end[p].max()) if len(p) > 0 else t0
+        n_bins: int = max(1, int(np.ceil((t1 - t0) / bin_width)))
+
+        output: Dict[str, np.ndarray] = {'start': t0 + np.arange(n_bins) * bin_width}
+        for code, name in enumerate(self.op_names) :
+            q: np.ndarray = p[self.op[p] == code]
+            length: np.ndarray = self.length[q] if self.weight is None else self.length[q] * self.weight[q]
+            output[name + "_bytes"] = spread(self.start[q], self.end[q], length,
+                                             t0, bin_width, n_bins)
+            starts: np.ndarray = np.floor((self.start[q] - t0) / bin_width).astype(np.int64)
+            inside: np.ndarray = (starts >= 0) & (starts < n_bins)
+            output[name + "_ops"] = np.bincount(starts[inside], minlength=n_bins,
+                                                weights=None if self.weight is None else self.weight[q][inside])
+
+        for name in self.op_names :
+            output[name + "_bandwidth"] = output[name + "_bytes"] / bin_width
+            output[name + "_iops"] = output[name + "_ops"] / bin_width
+        return pd.DataFrame(output)
+
+def spread(start: np.ndarray, end: np.ndarray, length: np.ndarray,
+           t0: float, bin_width: float, n_bins: int) -> np.ndarray :
+    """Spreads `length` bytes evenly over each [`start`, `end`) into time bins.
+
+    Bins are [t0 + i * bin_width, t0 + (i + 1) * bin_width), for i up to
+    `n_bins`; the parts of intervals outside them are dropped. Empty
+    intervals count in the bin they are in. Fully vectorized, so it takes
+    no Python loop per interval or per bin.
+    """
+    # Works in fractional bin units: an interval covers part of its
+    #   first and last bins, and all of the ones in between.
+    a: np.ndarray = np.clip((start - t0) / bin_width, 0, n_bins)
+    b: np.ndarray = np.clip((end - t0) / bin_width, 0, n_bins)
+    duration: np.ndarray = (end - start) / bin_width
+    length = length.astype(np.float64)
+
+    output: np.ndarray = np.zeros(n_bins + 1)
+    point: np.ndarray = duration <= 0
+    inside: np.ndarray = point & (start >= t0) & (a < n_bins)
+    output += np.bincount(np.floor(a[inside]).astype(np.int64), weights=length[inside], minlength=n_bins + 1)
+
+    a, b, length, duration = a[~point], b[~point], length[~point], duration[~point]
+    rate: np.ndarray = length / duration
+    first: np.ndarray = np.floor(a).astype(np.int64)
+    last: np.ndarray = np.minimum(np.floor(b).astype(np.int64), n_bins)
+
+    same: np.ndarray = first == last
+    output += np.bincount(first[same], weights=rate[same] * (b[same] - a[same]), minlength=n_bins + 1)
+
+    a, b, rate, first, last = a[~same], b[~same], rate[~same], first[~same], last[~same]
+    output += np.bincount(first, weights=rate * (first + 1 - a), minlength=n_bins + 1)
+    output += np.bincount(last, weights=rate * (b - last), minlength=n_bins + 1)
+    # Whole bins in between, as a running sum of rate changes.
+    steps: np.ndarray = np.bincount(first + 1, weights=rate, minlength=n_bins + 2)[:n_bins + 1]
+    steps -= np.bincount(last, weights=rate, minlength=n_bins + 1)
+    output += np.cumsum(steps)
+
+    return output[:n_bins]
@@ -0,0 +1,509 @@
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from .constants import output_formats
+
+##############################
+# output writers             #
+##############################
+
+class OutputWriter :
+    """Appends aggregated tables to an output directory.
+
+    Tables are written in pieces: every call to `write` appends the
+    rows of one batch of logs to the named table, so nothing has to
+    hold the whole aggregated table in memory at once.
+
+    Batches of a table can have different columns, e.g. DXT segments
+    only have a pthread_id where the log recorded one, and LUSTRE
+    tables have one column per OST of the widest stripe. A table's
+    columns are the union of those of its batches, in the order they
+    were first seen (see `align`); every batch is written with all of
+    them, its missing ones left empty.
+    """
+    output_loc: str
+
+    # Columns of each table written to so far; see `align`.
+    columns: Dict[str, List[str]]
+
+    def __init__(self, output_loc: str) :
+        self.output_loc = str(output_loc)
+        self.columns = {}
+
+    def write(self, name: str, df: pd.DataFrame) -> None :
+        raise NotImplementedError
+
+    def stored_columns(self, name: str) -> Optional[List[str]] :
+        """Reads the columns of table `name` from what was written; None if it was not."""
+        raise NotImplementedError
+
+    def align(self, name: str, columns: List[str]) -> Tuple[List[str], List[str]] :
+        """Adds a batch with `columns` to table `name`.
+
+        Returns the columns the batch is to be written with, and those
+        of them that are new to the table, which earlier batches lack.
+        """
+        known: Optional[List[str]] = self.columns.get(name)
+        if known is None :
+            known = self.stored_columns(name)
+        if known is None :
+            self.columns[name] = list(columns)
+            return self.columns[name], []
+        added: List[str] = [c for c in columns if c not in known]
+        self.columns[name] = known + added
+        return self.columns[name], added
+
+    def write_arrow(self, name: str, table: pa.Table) -> None :
+        """Like `write`, for a table that is already in Arrow form."""
+        self.write(name, table.to_pandas(split_blocks=True))
+
+    def state(self) -> Dict[str, int] :
+        """Returns what a later writer needs to keep appending to the tables."""
+        raise NotImplementedError
+
+    def resume(self, state: Dict[str, int]) -> None :
+        """Continues appending to the tables described by `state`."""
+        raise NotImplementedError
+
+    def retract(self, name: str, keys: Set[Tuple[int, int]],
+                columns: Tuple[str, str] = ('jobid', 'juid')) -> None :
+        """Removes the rows of table `name` whose `columns` match one of `keys`."""
+        raise NotImplementedError
+
+    def rollback(self, state: Dict[str, int]) -> None :
+        """Drops whatever was appended to the tables since `state` was taken.
+
+        Works from the files alone, so it also undoes the writes of an
+        earlier writer that died; tables missing from `state` are
+        removed. Appending continues from `state`.
+        """
+        raise NotImplementedError
+
+    def tables(self, source_loc: str) -> List[str] :
+        """Names the tables found in the output at `source_loc`."""
+        raise NotImplementedError
+
+    def read(self, name: str, columns: List[str], source_loc: Optional[str] = None) -> pd.DataFrame :
+        """Reads `columns` of table `name` back, from this output or the one at `source_loc`."""
+        raise NotImplementedError
+
+    def copy_from(self, name: str, source_loc: str) -> None :
+        """Appends table `name` of the output at `source_loc` to this one's.
+
+        The source has to be written in the same format; its rows are
+        copied as they are, without going through the logs again.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None :
+        pass
+
+class CSVWriter(OutputWriter) :
+    # Number of rows written so far to each table. Used to keep the
+    #   index column running across batches, so a batched run writes
+    #   exactly the same files as a single-batch run.
+    rows: Dict[str, int]
+
+    # Tables that have only ever been handed empty DataFrames; these
+    #   are written as empty files when the writer is closed.
+    empty: Set[str]
+
+    def __init__(self, output_loc: str) :
+        super().__init__(output_loc)
+        self.rows = {}
+        self.empty = set()
+
+    def path(self, name: str) -> pathlib.Path :
+        return pathlib.Path(self.output_loc, name + ".csv")
+
+    def write(self, name: str, df: pd.DataFrame) -> None :
+        if len(df.columns) == 0 :
+            self.empty.add(name)
+            return
+
+        columns, added = self.align(name, list(df.columns))
+        if len(added) > 0 and name in self.rows :
+            self._widen(name, columns)
+        if list(df.columns) != columns :
+            df = df.reindex(columns=columns)
+
+        start: int = self.rows.get(name, 0)
+        df.index = pd.RangeIndex(start, start + len(df))
+
+        if name in self.rows :
+            df.to_csv(self.path(name), mode='a', header=False)
+        else :
+            df.to_csv(self.path(name))
+
+        self.rows[name] = start + len(df)
+
+    def stored_columns(self, name: str) -> Optional[List[str]] :
+        if name not in self.rows :
+            return None
+        return list(pd.read_csv(self.path(name), index_col=0, nrows=0).columns)
+
+    def _widen(self, name: str, columns: List[str]) -> None :
+        # Rewrites the rows written so far with the new header, the
+        #   added columns left empty; as text, as in `retract`.
+        tmp: pathlib.Path = self.path(name).with_suffix(".csv.tmp")
+        first: bool = True
+        for chunk in pd.read_csv(self.path(name), index_col=0, dtype=str,
+                                 keep_default_na=False, chunksize=100000) :
+            chunk.reindex(columns=columns, fill_value="").to_csv(tmp, mode='w' if first else 'a', header=first)
+            first = False
+        os.replace(tmp, self.path(name))
+
+    def state(self) -> Dict[str, int] :
+        return dict(self.rows)
+
+    def resume(self, state: Dict[str, int]) -> None :
+        self.rows = {name: n for name, n in state.items() if self.path(name).exists()}
+        self.columns = {}
+
+    def retract(self, name: str, keys: Set[Tuple[int, int]],
+                columns: Tuple[str, str] = ('jobid', 'juid')) -> None :
+        if name not in self.rows :
+            return
+
+        # Read everything back as text so the kept rows are written out
+        #   exactly as they were.
+        str_keys: Set[Tuple[str, str]] = set((str(a), str(b)) for a, b in keys)
+        tmp: pathlib.Path = self.path(name).with_suffix(".csv.tmp")
+        kept: int = 0
+        for chunk in pd.read_csv(self.path(name), index_col=0, dtype=str,
+                                 keep_default_na=False, chunksize=100000) :
+            drop = pd.Series(list(zip(chunk[columns[0]], chunk[columns[1]])),
+                             index=chunk.index).isin(str_keys)
+            chunk = chunk[~drop]
+            chunk.index = pd.RangeIndex(kept, kept + len(chunk))
+            chunk.to_csv(tmp, mode='a' if kept > 0 else 'w', header=kept == 0)
+            kept += len(chunk)
+
+        os.replace(tmp, self.path(name))
+        self.rows[name] = kept
+
+    def rollback(self, state: Dict[str, int]) -> None :
+        for name in self.tables(self.output_loc) :
+            if name not in state :
+                os.remove(self.path(name))
+                continue
+
+            # Copy the rows up to the state over, as text, as in `retract`.
+            tmp: pathlib.Path = self.path(name).with_suffix(".csv.tmp")
+            kept: int = 0
+            for chunk in pd.read_csv(self.path(name), index_col=0, dtype=str,
+                                     keep_default_na=False, chunksize=100000) :
+                chunk = chunk.iloc[:max(0, state[name] - kept)]
+                chunk.to_csv(tmp, mode='a' if kept > 0 else 'w', header=kept == 0)
+                kept += len(chunk)
+                if kept >= state[name] :
+                    break
+            os.replace(tmp, self.path(name))
+        self.resume(state)
+
+    def tables(self, source_loc: str) -> List[str] :
+        return sorted(p.stem for p in pathlib.Path(source_loc).glob("*.csv"))
+
+    def read(self, name: str, columns: List[str], source_loc: Optional[str] = None) -> pd.DataFrame :
+        path: pathlib.Path = pathlib.Path(source_loc or self.output_loc, name + ".csv")
+        if not path.exists() or path.stat().st_size <= 1 :
+            return pd.DataFrame(columns=columns)
+        return pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False)[columns]
+
+    def copy_from(self, name: str, source_loc: str) -> None :
+        # Read everything as text, as in `retract`; `write` lines the
+        #   columns up with those of the rows already there.
+        for chunk in pd.read_csv(pathlib.Path(source_loc, name + ".csv"), index_col=0, dtype=str,
+                                 keep_default_na=False, chunksize=100000) :
+            self.write(name, chunk)
+
+    def close(self) -> None :
+        for name in self.empty - self.rows.keys() :
+            pd.DataFrame().to_csv(self.path(name))
+        self.empty = set()
+
+class DatasetWriter(OutputWriter) :
+    """Writes every table as a pyarrow dataset partitioned by jobid.
+
+    Each table becomes a directory (e.g. `POSIX_counters/`) holding one
+    `jobid=<jobid>/` directory per job, so readers can skip whole jobs
+    and, thanks to the columnar formats, only read the columns they
+    need. String columns are dictionary-encoded and files are
+    compressed.
+    """
+    formats: Dict[str, str] = {'parquet': 'parquet', 'arrow': 'ipc'}
+    extensions: Dict[str, str] = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+    file_format: str
+    compression: str
+    partition_col: str = 'jobid'
+
+    # Number of pieces written so far to each table, to give every
+    #   batch its own file names.
+    parts: Dict[str, int]
+    empty: Set[str]
+
+    def __init__(self, output_loc: str, file_format: str = 'parquet', compression: str = 'zstd') :
+        super().__init__(output_loc)
+        if file_format not in self.formats :
+            raise ValueError("Unknown dataset format %s." % file_format)
+
+        self.file_format = file_format
+        self.compression = compression
+        self.parts = {}
+        self.empty = set()
+
+    def path(self, name: str) -> pathlib.Path :
+        return pathlib.Path(self.output_loc, name)
+
+    def _file_options(self) -> ds.FileWriteOptions :
+        if self.file_format == 'parquet' :
+            return ds.ParquetFileFormat().make_write_options(compression=self.compression,
+                                                             use_dictionary=True)
+        return ds.IpcFileFormat().make_write_options(compression=self.compression)
+
+    @staticmethod
+    def _dictionary_encode(table: pa.Table) -> pa.Table :
+        for i, field in enumerate(table.schema) :
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type) :
+                table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+
+        return table.unify_dictionaries()
+
+    def write(self, name: str, df: pd.DataFrame) -> None :
+        self.write_arrow(name, pa.Table.from_pandas(df, preserve_index=False))
+
+    def write_arrow(self, name: str, table: pa.Table) -> None :
+        if table.num_columns == 0 :
+            self.empty.add(name)
+            return
+
+        if name not in self.parts :
+            # Replace whatever a previous run left behind, the same way
+            #   the csv files get overwritten.
+            shutil.rmtree(self.path(name), ignore_errors=True)
+            self.parts[name] = 0
+
+        columns, _ = self.align(name, table.column_names)
+        if table.column_names != columns :
+            # Columns the batch lacks are written as nulls, which readers
+            #   unify with the type of the other batches.
+            table = pa.table([table.column(c) if c in table.column_names else pa.nulls(table.num_rows)
+                              for c in columns], names=columns)
+        table = self._dictionary_encode(table)
+
+        partitioning = None
+        if self.partition_col in table.column_names :
+            # Partition values are written as plain values, so decode a
+            #   categorical (compact) partition column first.
+            i: int = table.schema.get_field_index(self.partition_col)
+            if pa.types.is_dictionary(table.schema.field(i).type) :
+                table = table.set_column(i, self.partition_col,
+                                         table.column(i).cast(table.schema.field(i).type.value_type))
+            partitioning = ds.partitioning(pa.schema([table.schema.field(self.partition_col)]),
+                                           flavor='hive')
+
+        ds.write_dataset(table, self.path(name),
+                         format=self.formats[self.file_format],
+                         partitioning=partitioning,
+                         basename_template="part-%i-{i}.%s" % (self.parts[name], self.extensions[self.file_format]),
+                         existing_data_behavior='overwrite_or_ignore',
+                         file_options=self._file_options())
+        self.parts[name] += 1
+
+    def state(self) -> Dict[str, int] :
+        return dict(self.parts)
+
+    def resume(self, state: Dict[str, int]) -> None :
+        self.parts = {name: n for name, n in state.items() if self.path(name).exists()}
+        self.columns = {}
+
+    def _schema(self, path: pathlib.Path) -> Optional[pa.Schema] :
+        # The union of the schemas of every file, as no single file's
+        #   has to hold every column.
+        files: List[pathlib.Path] = sorted(f for f in path.rglob("*") if f.is_file())
+        if len(files) == 0 :
+            return None
+        fmt: str = self.formats[self.file_format]
+        return pa.unify_schemas([ds.dataset(str(f), format=fmt).schema for f in files],
+                                promote_options="permissive")
+
+    def stored_columns(self, name: str) -> Optional[List[str]] :
+        if name not in self.parts :
+            return None
+        schema: Optional[pa.Schema] = self._schema(self.path(name))
+        if schema is None :
+            return None
+        # The partition column is only in the directory names.
+        return schema.names + ([self.partition_col] if self.partition_col not in schema.names else [])
+
+    def retract(self, name: str, keys: Set[Tuple[int, int]],
+                columns: Tuple[str, str] = ('jobid', 'juid')) -> None :
+        if name not in self.parts :
+            return
+
+        # Only the partitions of the retracted jobs have to be rewritten.
+        by_job: Dict[int, Set[int]] = {}
+        for jobid, juid in keys :
+            by_job.setdefault(jobid, set()).add(juid)
+
+        fmt: str = self.formats[self.file_format]
+        for jobid, juids in by_job.items() :
+            partition: pathlib.Path = pathlib.Path(self.path(name), "%s=%s" % (self.partition_col, jobid))
+            if not partition.is_dir() :
+                continue
+
+            old_files: List[str] = [str(p) for p in partition.iterdir() if p.is_file()]
+            table: pa.Table = ds.dataset(old_files, format=fmt).to_table()
+            table = table.filter(pc.invert(pc.is_in(table[columns[1]], pa.array(list(juids), table.schema.field(columns[1]).type))))
+
+            if table.num_rows > 0 :
+                ds.write_dataset(table, partition, format=fmt,
+                                 basename_template="part-%i-{i}.%s" % (self.parts[name], self.extensions[self.file_format]),
+                                 existing_data_behavior='overwrite_or_ignore',
+                                 file_options=self._file_options())
+                self.parts[name] += 1
+
+            for f in old_files :
+                os.remove(f)
+            if table.num_rows == 0 :
+                os.rmdir(partition)
+
+    def rollback(self, state: Dict[str, int]) -> None :
+        for name in self.tables(self.output_loc) :
+            if name not in state :
+                shutil.rmtree(self.path(name))
+                continue
+
+            # Every write goes to files named after a part number that
+            #   only grows, so later parts are exactly what came after.
+            for f in [p for p in self.path(name).rglob("part-*") if p.is_file()] :
+                if int(f.name.split("-")[1]) >= state[name] :
+                    os.remove(f)
+        self.resume(state)
+
+    def tables(self, source_loc: str) -> List[str] :
+        # Hidden directories are not tables, e.g. what a `SpillWriter` left behind.
+        return sorted(p.name for p in pathlib.Path(source_loc).iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def read(self, name: str, columns: List[str], source_loc: Optional[str] = None) -> pd.DataFrame :
+        path: pathlib.Path = pathlib.Path(source_loc or self.output_loc, name)
+        if not path.is_dir() or not any(p.is_file() for p in path.rglob("*")) :
+            return pd.DataFrame(columns=columns)
+        # File by file: their dictionaries can have different index types,
+        #   and files written before a column was added lack it.
+        fmt: str = self.formats[self.file_format]
+        tables: List[pa.Table] = []
+        for f in sorted(path.rglob("*")) :
+            if f.is_file() :
+                dataset: ds.Dataset = ds.dataset(str(f), format=fmt)
+                tables.append(dataset.to_table(columns=[c for c in columns if c in dataset.schema.names]))
+        return pa.concat_tables(tables, promote_options="permissive").to_pandas().reindex(columns=columns)
+
+    def copy_from(self, name: str, source_loc: str) -> None :
+        source: pathlib.Path = pathlib.Path(source_loc, name)
+        if not any(p.is_file() for p in source.rglob("*")) :
+            self.empty.add(name)
+            return
+
+        # The partition column is only in the directory names.
+        partitioning = None
+        if any(p.is_dir() and p.name.startswith(self.partition_col + "=") for p in source.iterdir()) :
+            partitioning = ds.partitioning(pa.schema([(self.partition_col, pa.int64())]), flavor='hive')
+        schema: pa.Schema = self._schema(source)
+        if partitioning is not None and self.partition_col not in schema.names :
+            schema = schema.append(pa.field(self.partition_col, pa.int64()))
+        dataset: ds.Dataset = ds.dataset(source, format=self.formats[self.file_format], partitioning=partitioning,
+                                         schema=schema)
+        self.align(name, schema.names)
+
+        if name not in self.parts :
+            shutil.rmtree(self.path(name), ignore_errors=True)
+            self.parts[name] = 0
+
+        # Streamed from file to file, never loaded as a whole.
+        ds.write_dataset(dataset, self.path(name),
+                         format=self.formats[self.file_format],
+                         partitioning=partitioning,
+                         basename_template="part-%i-{i}.%s" % (self.parts[name], self.extensions[self.file_format]),
+                         existing_data_behavior='overwrite_or_ignore',
+                         file_options=self._file_options())
+        self.parts[name] += 1
+
+    def close(self) -> None :
+        for name in self.empty - self.parts.keys() :
+            shutil.rmtree(self.path(name), ignore_errors=True)
+            os.makedirs(self.path(name))
+        self.empty = set()
+
+class SpillWriter(OutputWriter) :
+    """Holds written tables in temporary Arrow IPC files until `drain`.
+
+    Used to move buffered tables out of memory: every `write` goes to a
+    file of its own in a hidden directory under `output_loc` (on the
+    same disk as the output, rather than in a tmpfs /tmp), and `drain`
+    appends them all to the real writer, in the order they were
+    written, reading each one memory-mapped.
+    """
+    spill_dir: pathlib.Path
+
+    # (table name, spilled file or None for an empty table) in the
+    #   order they were written.
+    spilled: List[Tuple[str, Optional[pathlib.Path]]]
+    nbytes: int
+
+    def __init__(self, output_loc: str) :
+        super().__init__(output_loc)
+        os.makedirs(self.output_loc, exist_ok=True)
+        self.spill_dir = pathlib.Path(tempfile.mkdtemp(prefix=".spill-", dir=self.output_loc))
+        self.spilled = []
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def write(self, name: str, df: pd.DataFrame) -> None :
+        self.write_arrow(name, pa.Table.from_pandas(df, preserve_index=False))
+
+    def write_arrow(self, name: str, table: pa.Table) -> None :
+        if table.num_columns == 0 :
+            with self._lock :
+                self.spilled.append((name, None))
+            return
+
+        with self._lock :
+            path: pathlib.Path = pathlib.Path(self.spill_dir, "%s.%i.arrow" % (name, len(self.spilled)))
+            self.spilled.append((name, path))
+        with pa.OSFile(str(path), 'wb') as sink :
+            with pa.ipc.new_file(sink, table.schema) as f :
+                f.write_table(table)
+        with self._lock :
+            self.nbytes += path.stat().st_size
+
+    def drain(self, writer: OutputWriter) -> None :
+        """Appends every spilled table to `writer`, and deletes its file."""
+        for name, path in self.spilled :
+            if path is None :
+                writer.write_arrow(name, pa.table({}))
+                continue
+            with pa.memory_map(str(path)) as source :
+                writer.write_arrow(name, pa.ipc.open_file(source).read_all())
+            os.remove(path)
+        self.spilled = []
+
+    def close(self) -> None :
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+def make_writer(output_loc: str, output_format: str = 'csv') -> OutputWriter :
+    """Returns the `OutputWriter` for one of the `output_formats`."""
+    if output_format == 'csv' :
+        return CSVWriter(output_loc)
+    if output_format in DatasetWriter.formats :
+        return DatasetWriter(output_loc, output_format)
+
+    raise ValueError("Unknown output format %s; expected one of %s." % (output_format, ", ".join(output_formats)))
@@ -0,0 +1,717 @@
+import cProfile
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from functools import partial
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+
+from .objs.log import Log, LogCollection
+
+from .objs.colls import DxtSpill
+from .objs.writers import OutputWriter, SpillWriter, make_writer, output_formats
+from .objs.manifest import Manifest, ManifestPlan
+from .objs.cache import DecodeCache
+from .objs.sampling import DxtSampling
+from .objs.discovery import LogDiscovery, LogWatcher, discover_log_files
+from .objs.instrument import RunReport, Timer, WatchMetrics
+from .objs.names import unseen_names, id_set
+
+#####################################################
+# Main functions                                    #
+#####################################################
+
+def _read_log_file(path: str, modules: Optional[List[str]] = None, compact: bool = False,
+                   cache: Optional[DecodeCache] = None, sampling: Optional[DxtSampling] = None,
+                   spill: Optional[DxtSpill] = None) -> Log:
+    # Runs inside the worker processes: the `DarshanReport` can't leave
+    #   the worker, so only the decoded tables are sent back, along with
+    #   the (small) rollups and fingerprint, computed here in parallel.
+    #   Spilled DXT modules only send the paths of their files.
+    log: Log = Log.From_File(path, modules, compact, cache, sampling, spill).detach()
+    log.rollup()
+    log.fingerprint()
+    return log
+
+def read_log_files(files: List[str], debug: bool = False, jobs: int = 1,
+                   pool: Optional[Executor] = None,
+                   modules: Optional[List[str]] = None,
+                   compact: bool = False,
+                   cache: Optional[DecodeCache] = None,
+                   sampling: Optional[DxtSampling] = None) -> List[Log]:
+    """Reads the provided `.darshan` log files into Log objects.
+
+    With `jobs` greater than 1, the logs are decoded by a pool of that
+    many worker processes. Workers return detached Logs (see
+    `Log.detach`), in the same order as `files`, so the result does not
+    depend on the number of jobs. An already running `pool` can be
+    passed in to be reused across calls.
+
+    Only the modules in `modules` are decoded; by default, all of them.
+    With `compact`, the module tables use the compact schema (see
+    `aggregate_darshan`). Logs found in `cache` are not decoded again.
+    With a `sampling`, DXT segments are sampled (see `DxtSampling`).
+    Once every log is read, the `cache` is evicted down to its size cap.
+    """
+    logs: List[Log] = _read_log_files(files, debug, jobs, pool, modules, compact, cache, sampling)
+    if cache is not None :
+        cache.evict()
+    return logs
+
+def _read_log_files(files: List[str], debug: bool, jobs: int, pool: Optional[Executor],
+                    modules: Optional[List[str]], compact: bool,
+                    cache: Optional[DecodeCache], sampling: Optional[DxtSampling]) -> List[Log] :
+    logs: List[Log] = []
+    if pool is None and (jobs <= 1 or len(files) <= 1) :
+        for f in files :
+            if debug:
+                print("\tReading %s" % f)
+            logs.append(Log.From_File(f, modules, compact, cache, sampling).load())
+    elif pool is None :
+        with ProcessPoolExecutor(max_workers=jobs) as pool :
+            return _read_log_files(files, debug, jobs, pool, modules, compact, cache, sampling)
+    else :
+        if debug:
+            print("\tReading %i files with %i worker processes." % (len(files), jobs))
+
+        for f, log in zip(files, _start_reading(files, False, jobs, pool, modules, compact, cache, sampling)) :
+            if debug:
+                print("\tRead %s" % f)
+            logs.append(log)
+    
+    if debug:
+        print("Done reading files.")
+    return logs
+
+def _start_reading(files: List[str], debug: bool, jobs: int, pool: Optional[Executor],
+                   modules: Optional[List[str]], compact: bool,
+                   cache: Optional[DecodeCache], sampling: Optional[DxtSampling] = None,
+                   spill: Optional[DxtSpill] = None) -> Iterable[Log] :
+    # Hands `files` to the worker pool without waiting for them; the
+    #   Logs come out of the returned iterator, in order, as they are
+    #   done. Without a pool, they are read right here. With a `spill`,
+    #   only `jobs` logs are decoded ahead of the one being consumed, so
+    #   finished logs do not pile up in memory; without a pool, they are
+    #   read one at a time as the iterator is consumed.
+    if pool is None and spill is not None :
+        return (Log.From_File(f, modules, compact, cache, sampling, spill).load() for f in files)
+    if pool is None :
+        return _read_log_files(files, debug, jobs, None, modules, compact, cache, sampling)
+
+    if debug:
+        print("\tQueueing %i files for %i worker processes." % (len(files), jobs))
+    read = partial(_read_log_file, modules=modules, compact=compact, cache=cache, sampling=sampling, spill=spill)
+    if spill is not None :
+        return _bounded_map(pool, read, files, jobs)
+    chunksize: int = max(1, len(files) // (jobs * 4))
+    return pool.map(read, files, chunksize=chunksize)
+
+def _bounded_map(pool: Executor, fn: Callable[[str], Log], files: List[str], window: int) -> Iterator[Log] :
+    # Like `pool.map`, but with at most `window` files submitted and not
+    #   consumed yet. The first ones are submitted right away.
+    it: Iterator[str] = iter(files)
+    pending: Deque[Future] = deque(pool.submit(fn, f) for f in itertools.islice(it, window))
+
+    def results() -> Iterator[Log] :
+        while len(pending) > 0 :
+            log: Log = pending.popleft().result()
+            pending.extend(pool.submit(fn, f) for f in itertools.islice(it, 1))
+            yield log
+    return results()
+
+def _batches(items: Iterable[str], batch_size: Optional[int]) -> Iterator[List[str]] :
+    if batch_size is None or batch_size <= 0 :
+        yield list(items)
+        return
+
+    it: Iterator[str] = iter(items)
+    while True :
+        batch: List[str] = list(itertools.islice(it, batch_size))
+        if len(batch) == 0 :
+            return
+        yield batch
+
+def write_logs(logs: List[Log], writer: OutputWriter, debug: bool = False,
+               modules: Optional[List[str]] = None,
+               pool: Optional[Executor] = None,
+               report: Optional[RunReport] = None,
+               seen_ids: Optional[Set[int]] = None) -> None :
+    """Writes the metadata and module data of `logs` through `writer`.
+
+    The rows are appended to whatever the writer already holds, so this
+    can be called once per batch of logs. Only the tables of `modules`
+    are written; by default, those of every expected module. With a
+    (thread) `pool`, the metadata and every module are written
+    concurrently. The per job, file and rank summaries of the POSIX and
+    STDIO counters (see `LogCollection.get_rollups`) are written to the
+    `rollup_job`, `rollup_file` and `rollup_rank` tables, the I/O
+    fingerprint of every log (see `Log.fingerprint`) to the
+    `fingerprints` table, and the path of every record id to the `names`
+    table, leaving out the ids in `seen_ids` (which the written ones are
+    added to). The time spent, and the rows and bytes written, are added
+    to `report`.
+    """
+    if report is None :
+        report = RunReport()
+    log_coll: LogCollection = LogCollection(logs)
+
+    if debug:
+        print("Collecting metadata into a dataframe...")
+
+    with report.phase("metadata") :
+        metadata_df: pd.DataFrame = Log.get_total_metadata_df(logs)
+    report.add_table("metadata", len(metadata_df), int(metadata_df.memory_usage(deep=True).sum()))
+
+    if debug:
+        print("Done collecting metadata!")
+        print("Saving metadata.")
+
+    def write_metadata() -> None :
+        with report.phase("write") :
+            writer.write("metadata", metadata_df)
+
+    # Summed up before any module table is built, as building those
+    #   adds the job key columns to the logs' frames.
+    with report.phase("rollup") :
+        summaries: Dict[str, pd.DataFrame] = log_coll.get_rollups()
+        summaries["fingerprints"] = log_coll.get_fingerprints()
+    if seen_ids is None :
+        seen_ids = set()
+    summaries["names"] = unseen_names(log_coll.get_names(), seen_ids)
+
+    def write_summaries() -> None :
+        for name, df in summaries.items() :
+            if len(df) == 0 :
+                continue
+            report.add_table(name, len(df), int(df.memory_usage(deep=True).sum()))
+            with report.phase("write") :
+                writer.write(name, df)
+
+    def write_module(module: str) -> None :
+        with report.phase("concat") :
+            module_tables: Dict[str, pa.Table] = log_coll.get_module_as_arrow(module)
+        for name, table in module_tables.items() :
+            if debug:
+                print("\tWriting aggregated %s data." % module)
+            report.add_table(module, table.num_rows, table.nbytes)
+            with report.phase("write") :
+                writer.write_arrow(module + "_" + name, table)
+
+    to_write: List[str] = [m for m in Log.expected_modules if modules is None or m in modules]
+    if pool is not None :
+        # Every table goes to a different file; a module's tables are
+        #   kept on one thread, as they share the module's arrow tables.
+        done: List[Future] = [pool.submit(write_metadata)]
+        done += [pool.submit(write_module, module) for module in to_write]
+        done.append(pool.submit(write_summaries))
+        for future in done :
+            future.result()
+        return
+
+    write_metadata()
+
+    if debug:
+        print("Done saving metadata.")
+        print("Writing aggregated module data.")
+
+    for module in to_write :
+        write_module(module)
+    write_summaries()
+
+def aggregate_darshan(directory:str, output_loc:str, debug:bool = False,
+                      jobs: Optional[int] = None, batch_size: Optional[int] = None,
+                      output_format: str = 'csv', incremental: bool = False,
+                      modules: Optional[List[str]] = None, compact: bool = False,
+                      cache_dir: Optional[str] = None, cache_size: Optional[int] = None,
+                      discovery: Optional[LogDiscovery] = None,
+                      write_jobs: int = 4, queue_depth: int = 2,
+                      profile: Optional[str] = None, memory_limit: Optional[int] = None,
+                      sampling: Optional[DxtSampling] = None) :
+    '''Runs the darshan log aggregation process.
+
+    Collects the list of all `.darshan` files present in the provided
+    directory (or, with a `discovery`, the logs it finds; see
+    `LogDiscovery`) and reads what data is available. Then streams their
+    metadata and module tables, batch by batch, to the `OutputWriter` of
+    `output_format` in `output_loc`. The run can be incremental, cover
+    one shard of the logs (through `discovery`, to be combined with
+    `merge_outputs`), reuse a decode cache, spill tables over a memory
+    limit and sample DXT segments, each as described below.
+
+    Logs are read by `jobs` worker processes; by default, one per CPU.
+
+    If `batch_size` is set, logs are read and written `batch_size` at a
+    time: each batch's rows are appended to the output files before the
+    next batch is read, so memory use depends on the batch size rather
+    than on the number of logs. The output is the same either way.
+    Batches are read as soon as they are discovered, so reading starts
+    before a large directory tree has been walked completely.
+
+    Discovering, decoding and writing overlap: while one batch is being
+    written, up to `queue_depth` further batches are queued for (or
+    being decoded by) the worker processes, and the tables of the batch
+    being written are written by `write_jobs` threads at once. Batches
+    are still written in order, so the output does not change.
+
+    With a `memory_limit` in bytes, the estimated size of the decoded
+    module tables waiting to be written (see `Log.nbytes`) is tracked as
+    the logs of a batch come in. Whenever it goes over the limit, the
+    tables are spilled to temporary Arrow files in the output directory
+    (see `SpillWriter`) and let go; once the whole batch is in, they are
+    streamed into the outputs ahead of the rest. The output is the same
+    either way. A single log can be too large as well, so the workers
+    decode DXT modules a chunk of records at a time, each chunk of about
+    `memory_limit` / `jobs` bytes, spilling every chunk's tables to disk
+    before reading the next (see `DxtSpill`); those tables are streamed
+    into the outputs from there. Only `jobs` decoded logs per queued
+    batch are waiting at a time. Logs of queued batches are not counted,
+    so pair it with a `batch_size` and a small `queue_depth`.
+
+    `output_format` is one of `output_formats`: `csv` writes one csv per
+    table, while `parquet` and `arrow` write one dataset directory per
+    table, partitioned by jobid.
+
+    Every run leaves a `Manifest` of the logs it ingested in the output
+    directory. With `incremental`, only logs that are new or changed
+    since that manifest was written are read and appended to the
+    existing outputs, and the rows of changed or removed logs are
+    retracted first.
+
+    `modules` restricts which modules are read and written, e.g.
+    `["POSIX", "STDIO"]`; the records of any other module are never
+    decoded. By default, every module is.
+
+    With `compact`, module tables keep record ids as uint64 rather than
+    strings, and store jobid, juid and rank (and, for DXT segments, the
+    hostname) as categoricals, which shrinks both memory use and the
+    Parquet/Arrow outputs. Csv output is the same either way, apart from
+    the added DXT hostname column.
+
+    With a `sampling`, DXT segment tables only keep a weighted sample of
+    each record's segments, with a `weight` column, and the exact
+    totals of every record go to the `DXT_POSIX_totals` (and
+    `DXT_MPIIO_totals`) tables; see `DxtSampling`.
+
+    With a `cache_dir`, decoded logs are kept there as Arrow IPC files
+    keyed by their content hash (see `DecodeCache`), and later runs over
+    the same logs read those instead of decoding them again. The cache
+    is capped at `cache_size` bytes, evicting the least recently used
+    logs; by default it is not capped.
+
+    Every run also leaves a `run_report.json` in the output directory
+    (see `RunReport`): the wall and CPU time spent discovering, decoding
+    (per module), building metadata, concatenating and writing, the rows
+    and bytes written per module, the slowest logs to decode and the
+    peak RSS. With a `profile` path, the run is also profiled with
+    cProfile, and the stats are dumped there; only the calling thread
+    is profiled, not the decode workers or writer threads.
+    '''
+    if profile is not None :
+        args: Dict[str, Any] = dict(locals(), profile=None)
+        profiler: cProfile.Profile = cProfile.Profile()
+        try :
+            return profiler.runcall(aggregate_darshan, **args)
+        finally :
+            profiler.dump_stats(profile)
+
+    if jobs is None :
+        jobs = os.cpu_count() or 1
+
+    report: RunReport = RunReport({'directory': directory, 'jobs': jobs, 'batch_size': batch_size,
+                                   'output_format': output_format, 'incremental': incremental,
+                                   'modules': modules, 'compact': compact, 'cache': cache_dir is not None,
+                                   'write_jobs': write_jobs, 'queue_depth': queue_depth,
+                                   'memory_limit': memory_limit,
+                                   'sampling': None if sampling is None else sampling.spec})
+
+    with report.phase("discovery") :
+        discovered: Iterator[str] = discover_log_files(directory, debug, discovery)
+    discovered = report.timed_iter("discovery", discovered)
+
+    if debug:
+        print("Beginning to collect log data...")
+
+    cache: Optional[DecodeCache] = None
+    if cache_dir is not None :
+        cache = DecodeCache(cache_dir, cache_size)
+
+    writer: OutputWriter = make_writer(output_loc, output_format)
+    if incremental :
+        manifest: Manifest = Manifest.Load(output_loc, output_format, modules, compact,
+                                           None if sampling is None else sampling.spec)
+        writer.resume(manifest.tables)
+        if manifest.recover(writer) and debug:
+            print("Rolled back the rows of a batch an earlier run did not finish.")
+    else :
+        manifest = Manifest(output_loc, output_format, modules, compact,
+                            None if sampling is None else sampling.spec)
+
+    to_read: Iterable[str] = discovered
+    hashes: Dict[str, str] = {}
+    # Ids already in the `names` table.
+    seen_ids: Set[int] = set()
+    if incremental :
+        seen_ids = id_set(writer.read("names", ['id'])['id']) if "names" in manifest.tables else set()
+        # Finding removed logs takes the whole tree.
+        files_full: List[str] = list(discovered)
+        with report.phase("plan") :
+            plan: ManifestPlan = manifest.plan(files_full)
+        to_read = plan.to_read
+        hashes = plan.hashes
+
+        if debug:
+            print("\t%i of %i logs are new or changed; %i logs were removed." % (len(plan.to_read), len(files_full), len(plan.removed)))
+
+        if len(plan.retract) > 0 :
+            if debug:
+                print("Retracting the rows of %i changed or removed jobs." % len(plan.retract))
+            for name in list(manifest.tables.keys()) :
+                if name == "names" :
+                    # Not tied to any job; a path stays right for its id.
+                    continue
+                writer.retract(name, plan.retract, ('jobid', 'uid') if name == "metadata" else ('jobid', 'juid'))
+
+    pool: Optional[Executor] = None
+    if jobs > 1 and not (incremental and len(plan.to_read) <= 1) :
+        pool = ProcessPoolExecutor(max_workers=jobs)
+
+    # The pipeline: while the writer thread writes one batch (each
+    #   table on its own thread of the table pool), the decode pool
+    #   works on the next `queue_depth` batches, and discovery walks on
+    #   to find the batches after those.
+    writer_thread: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+    table_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max(1, write_jobs))
+    decoding: Deque[Tuple[List[str], Iterable[Log]]] = deque()
+    writing: Optional[Future] = None
+
+    dxt_spill: Optional[DxtSpill] = None
+    if memory_limit is not None :
+        os.makedirs(output_loc, exist_ok=True)
+        dxt_spill = DxtSpill(tempfile.mkdtemp(prefix=".spill-", dir=output_loc), max(1, memory_limit // jobs))
+
+    def write_batch(batch: List[str], decoded: Iterable[Log]) -> None :
+        # Logs whose tables are still in memory, and their estimated size.
+        logs: List[Log] = []
+        held: int = 0
+        spill: Optional[SpillWriter] = None
+        # Job keys of the whole batch, for the manifest.
+        keys: List[Tuple[str, str]] = []
+
+        try :
+            # Times the writer spends waiting on the decode workers.
+            for f, log in zip(batch, report.timed_iter("decode_wait", decoded)) :
+                report.add_log(f, log.timings)
+                keys.append((log.jobid, log.juid))
+                logs.append(log)
+                if memory_limit is None :
+                    continue
+
+                # Summed up first, as sizing the tables adds the job key
+                #   columns to them; see `write_logs`.
+                log.rollup()
+                log.fingerprint()
+                held += log.nbytes()
+                if held > memory_limit :
+                    if debug:
+                        print("\tSpilling the tables of %i logs (about %i MiB) to disk." % (len(logs), held >> 20))
+                    if spill is None :
+                        spill = SpillWriter(output_loc)
+                    write_logs(logs, spill, debug, modules, table_pool, report, seen_ids)
+                    for l in logs :
+                        l.remove_spilled()
+                    logs = []
+                    held = 0
+
+            with report.phase("manifest") :
+                manifest.begin(writer.state())
+            if spill is not None :
+                with report.phase("spill_merge") :
+                    spill.drain(writer)
+                report.add_spill(spill.nbytes)
+            if spill is None or len(logs) > 0 :
+                write_logs(logs, writer, debug, modules, table_pool, report, seen_ids)
+                for l in logs :
+                    l.remove_spilled()
+        finally :
+            if spill is not None :
+                spill.close()
+
+        # Record the batch only once its rows are written, so an
+        #   interrupted run re-reads whatever did not make it out.
+        with report.phase("manifest") :
+            for f, (jobid, juid) in zip(batch, keys) :
+                manifest.record(f, jobid, juid, hashes.get(f))
+            manifest.commit(writer.state())
+        if cache is not None :
+            cache.evict()
+
+    def write_next(writing: Optional[Future]) -> Future :
+        # Batches are written in order, one at a time.
+        if writing is not None :
+            writing.result()
+        batch, decoded = decoding.popleft()
+        return writer_thread.submit(write_batch, batch, decoded)
+
+    try :
+        for batch in _batches(to_read, batch_size) :
+            if len(batch) == 0 :
+                break
+
+            decoding.append((batch, _start_reading(batch, debug, jobs, pool, modules, compact, cache, sampling,
+                                                   dxt_spill)))
+            if len(decoding) > queue_depth :
+                writing = write_next(writing)
+
+        while len(decoding) > 0 :
+            writing = write_next(writing)
+        if writing is not None :
+            writing.result()
+    finally :
+        writer_thread.shutdown(cancel_futures=True)
+        table_pool.shutdown()
+        if pool is not None :
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+        if dxt_spill is not None :
+            shutil.rmtree(dxt_spill.spill_dir, ignore_errors=True)
+
+    manifest.tables = writer.state()
+    manifest.save()
+    report.save(output_loc)
+
+    if debug:
+        print("Done writing aggregated data!")
+        print("Wrote the run report to %s." % os.path.join(output_loc, RunReport.file_name))
+
+def watch_darshan(directory: str, output_loc: str, debug: bool = False,
+                  jobs: Optional[int] = None, batch_size: int = 64,
+                  output_format: str = 'csv',
+                  modules: Optional[List[str]] = None, compact: bool = False,
+                  cache_dir: Optional[str] = None, cache_size: Optional[int] = None,
+                  discovery: Optional[LogDiscovery] = None,
+                  write_jobs: int = 4, interval: float = 2.0, settle: float = 1.0,
+                  polls: Optional[int] = None,
+                  stop: Optional[threading.Event] = None,
+                  sampling: Optional[DxtSampling] = None) -> WatchMetrics :
+    """Ingests the logs that appear under `directory` as they are completed.
+
+    Every `interval` seconds, `directory` is polled for complete logs
+    that are not in the output's `Manifest` yet (see `LogWatcher`, which
+    `settle` is passed to). They are decoded by `jobs` worker processes
+    and appended to the outputs in batches of at most `batch_size` logs,
+    the same way an `incremental` `aggregate_darshan` run would, so
+    both can be used on the same output. Logs that fail to decode are
+    skipped with a warning. DXT segments are sampled by `sampling`, as
+    in `aggregate_darshan`.
+
+    Each batch is committed to the manifest once all its rows are
+    written; if the watch dies halfway through one, the next run (watch
+    or incremental) rolls its rows back and reads its logs again. Logs
+    that change or disappear after they were written are left to an
+    incremental run.
+
+    After every poll and batch, a `WatchMetrics` with the backlog and
+    the time from each log's completion to its commit is saved to the
+    output directory. Watching goes on until `stop` is set or `polls`
+    polls have been made, after writing the logs found by then, or
+    until it is interrupted (e.g. with Ctrl-C). Returns the final
+    metrics.
+    """
+    if jobs is None :
+        jobs = os.cpu_count() or 1
+
+    watcher: LogWatcher = LogWatcher(directory, discovery, settle)
+    os.makedirs(output_loc, exist_ok=True)
+    writer: OutputWriter = make_writer(output_loc, output_format)
+    manifest: Manifest = Manifest.Load(output_loc, output_format, modules, compact,
+                                       None if sampling is None else sampling.spec)
+    writer.resume(manifest.tables)
+    if manifest.recover(writer) and debug:
+        print("Rolled back the rows of a batch an earlier run did not finish.")
+    # Ids already in the `names` table.
+    seen_ids: Set[int] = id_set(writer.read("names", ['id'])['id']) if "names" in manifest.tables else set()
+
+    cache: Optional[DecodeCache] = None
+    if cache_dir is not None :
+        cache = DecodeCache(cache_dir, cache_size)
+
+    metrics: WatchMetrics = WatchMetrics()
+    report: RunReport = RunReport({'directory': directory, 'jobs': jobs, 'batch_size': batch_size,
+                                   'output_format': output_format, 'modules': modules, 'compact': compact,
+                                   'cache': cache_dir is not None, 'write_jobs': write_jobs,
+                                   'interval': interval, 'settle': settle,
+                                   'sampling': None if sampling is None else sampling.spec})
+    read = partial(_read_log_file, modules=modules, compact=compact, cache=cache, sampling=sampling)
+    pool: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    table_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max(1, write_jobs))
+    queue: Deque[str] = deque()
+
+    def write_batch(batch: List[str]) -> None :
+        nonlocal pool
+        with Timer() as t :
+            futures: List[Optional[Future]] = [pool.submit(read, f) if pool is not None else None for f in batch]
+            logs: List[Log] = []
+            written: List[str] = []
+            broken: bool = False
+            for f, future in zip(batch, futures) :
+                try :
+                    log: Log = future.result() if future is not None else read(f)
+                except Exception as e :
+                    # One bad log must not stop the others.
+                    logging.warning("Could not read %s: %s" % (f, e))
+                    watcher.failed(f)
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    continue
+                report.add_log(f, log.timings)
+                logs.append(log)
+                written.append(f)
+
+            if len(logs) > 0 :
+                manifest.begin(writer.state())
+                write_logs(logs, writer, debug, modules, table_pool, report, seen_ids)
+                for f, log in zip(written, logs) :
+                    manifest.record(f, log.jobid, log.juid)
+                manifest.commit(writer.state())
+            if cache is not None :
+                cache.evict()
+
+        metrics.add_batch([manifest.logs[os.path.abspath(f)]['mtime_ns'] / 1e9 for f in written],
+                          len(batch) - len(written), t.wall)
+        if broken :
+            # A worker died (e.g. in pydarshan's C library); start over.
+            pool.shutdown(cancel_futures=True)
+            pool = ProcessPoolExecutor(max_workers=jobs)
+        if debug:
+            print("\tWrote %i logs in %.2f s; %i in the backlog." % (len(written), t.wall, len(queue) + len(watcher.pending)))
+
+    n_polls: int = 0
+    try :
+        while True :
+            queue.extend(watcher.poll(manifest.logs))
+            n_polls += 1
+            metrics.add_poll(len(watcher.pending), len(queue))
+            while len(queue) > 0 :
+                write_batch([queue.popleft() for _ in range(min(batch_size, len(queue)))])
+                metrics.queued = len(queue)
+                metrics.save(output_loc)
+            metrics.save(output_loc)
+
+            if (polls is not None and n_polls >= polls) or (stop is not None and stop.is_set()) :
+                break
+            if stop is not None :
+                stop.wait(interval)
+            else :
+                time.sleep(interval)
+    except KeyboardInterrupt :
+        if debug:
+            print("Interrupted; stopping.")
+    finally :
+        table_pool.shutdown()
+        if pool is not None :
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+        report.save(output_loc)
+
+    return metrics
+
+def inventory_log_files(files: List[str], debug: bool = False, jobs: int = 1) -> pd.DataFrame:
+    """Builds the metadata table of `files` without decoding any records.
+
+    Only each log's job header and module list are read (see
+    `Log.Metadata_Row_From_File`), by `jobs` worker processes. The table
+    has the columns of `metadata.csv`, plus the `path` of each log.
+    """
+    rows: List[List[Any]]
+    if jobs <= 1 or len(files) <= 1 :
+        rows = [Log.Metadata_Row_From_File(f) for f in files]
+    else :
+        if debug:
+            print("\tReading %i log headers with %i worker processes." % (len(files), jobs))
+
+        chunksize: int = max(1, len(files) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool :
+            rows = list(pool.map(Log.Metadata_Row_From_File, files, chunksize=chunksize))
+
+    inventory: pd.DataFrame = Log.metadata_rows_to_df(rows)
+    inventory['path'] = files
+    return inventory
+
+def inventory_darshan(directory: str, output_loc: str, debug: bool = False,
+                      jobs: Optional[int] = None, output_format: str = 'csv',
+                      discovery: Optional[LogDiscovery] = None) -> pd.DataFrame :
+    '''Writes the inventory of the `.darshan` logs in `directory`.
+
+    Like `aggregate_darshan`, but only the job metadata and the module
+    list of every log are read, and written to a single `inventory`
+    table. Returns the inventory.
+    '''
+    if jobs is None :
+        jobs = os.cpu_count() or 1
+
+    files_full: List[str] = list(discover_log_files(directory, debug, discovery))
+
+    inventory: pd.DataFrame = inventory_log_files(files_full, debug, jobs)
+
+    writer: OutputWriter = make_writer(output_loc, output_format)
+    writer.write("inventory", inventory)
+    writer.close()
+
+    if debug:
+        print("Wrote the inventory of %i logs." % len(inventory))
+
+    return inventory
+
+def merge_outputs(partials: List[str], output_loc: str, debug: bool = False) -> None :
+    '''Combines the outputs of several runs into one, e.g. of `--shard`ed runs.
+
+    Every partial output must have been written with the same format,
+    modules and schema. Their tables are appended in the order given,
+    copying the rows as they are, so no log is read again. Their
+    manifests are combined too, so the merged output can be updated
+    with `incremental` runs later.
+    '''
+    manifests: List[Manifest] = [Manifest.Open(p) for p in partials]
+    first: Manifest = manifests[0]
+
+    logs: Dict[str, Dict[str, Any]] = {}
+    for p, m in zip(partials, manifests) :
+        if (m.output_format, m.modules, m.compact, m.sampling) != (first.output_format, first.modules, first.compact, first.sampling) :
+            raise ValueError("Output in %s was not written with the same settings as %s." % (p, partials[0]))
+        for path in m.logs :
+            if path in logs :
+                raise ValueError("Log %s is in more than one of the outputs to merge." % path)
+        logs.update(m.logs)
+
+    writer: OutputWriter = make_writer(output_loc, first.output_format)
+    manifest: Manifest = Manifest(output_loc, first.output_format, first.modules, first.compact, first.sampling)
+    manifest.logs = logs
+
+    tables: List[str] = sorted(set(name for p in partials for name in writer.tables(p)))
+    seen_ids: Set[int] = set()
+    try :
+        for name in tables :
+            for p in partials :
+                if name in writer.tables(p) :
+                    if debug:
+                        print("\tMerging %s from %s." % (name, p))
+                    if name == "names" :
+                        # Partials share many files; keep every id once.
+                        writer.write(name, unseen_names(writer.read(name, ['id', 'path'], p), seen_ids))
+                    else :
+                        writer.copy_from(name, p)
+    finally :
+        writer.close()
+
+    manifest.tables = writer.state()
+    manifest.save()
+
+    if debug:
+        print("Merged %i outputs holding %i logs." % (len(partials), len(logs)))
@@ -0,0 +1,39 @@
+import json
+from wfmeta_darshan.objs import Log, LogCollection
+from benchmarks.synthetic import SyntheticReport
+from benchmarks import run
+
+def test_synthetic_report_decodes_like_a_log():
+    log = Log(SyntheticReport(7, n_ranks=2, files_per_rank=3, segments_per_file=5)).load()
+    assert log.loaded_modules == ["POSIX", "LUSTRE", "STDIO", "DXT_POSIX"]
+
+    coll = LogCollection([log])
+    posix = coll.get_module_as_df("POSIX")
+    assert len(posix["counters"]) == 6 and list(posix["counters"].columns[:5]) == ["jobid", "juid", "rank", "id", "POSIX_OPENS"]
+    assert len(coll.get_module_as_df("LUSTRE")["counters"]) == 6
+
+    dxt = coll.get_module_as_df("DXT_POSIX")
+    assert len(dxt["read_segments"]) == 6 * 2 and len(dxt["write_segments"]) == 6 * 3
+    assert "pthread_id" in dxt["read_segments"].columns
+
+def test_baseline_round_trip(tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    args = ["--logs", "2", "--segments", "4", "--index-jobs", "1000", "--repeat", "1"]
+    assert run.main(args + ["--save", baseline]) == 0
+
+    with open(baseline) as f:
+        saved = json.load(f)
+    assert [c["name"] for c in saved["cases"]] == ["logs=2,ranks=4,segments=4", "fingerprints=1000"]
+    assert set(saved["cases"][0]["phases"]) == set(run.phases)
+    assert set(saved["cases"][1]["phases"]) == set(run.index_phases)
+
+    # a huge tolerance, as timings this small are noisy.
+    assert run.main(args + ["--compare", baseline, "--tolerance", "100"]) == 0
+
+def test_compare_flags_time_and_memory():
+    def results(seconds, peak_mb):
+        return {"cases": [{"name": "case", "phases": {"write": {"seconds": seconds, "peak_mb": peak_mb}}}]}
+    baseline = results(1.0, 100.0)
+    assert run.compare(results(1.1, 110.0), baseline, 0.25) == []
+    assert run.compare(results(2.0, 110.0), baseline, 0.25) == ["case write time x2.00"]
+    assert run.compare(results(1.1, 300.0), baseline, 0.25) == ["case write memory x3.00"]
@@ -0,0 +1,104 @@
+import os
+import darshan
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from wfmeta_darshan import Log, aggregate_darshan, collect_log_files, read_log_files
+from wfmeta_darshan.objs import LogCollection
+from wfmeta_darshan.objs import cache as cache_module
+from wfmeta_darshan.objs.cache import DecodeCache
+from wfmeta_darshan.objs.manifest import file_hash
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def _files():
+    return [os.path.join(TEST_DIR, f) for f in collect_log_files(TEST_DIR)]
+
+def test_cached_logs_are_not_decoded_again(tmp_path, monkeypatch):
+    files = _files()
+    cache = DecodeCache(str(tmp_path))
+    expected = LogCollection(read_log_files(files, cache=cache))
+
+    def no_report(*args, **kwargs):
+        raise AssertionError("log was decoded despite being cached")
+    monkeypatch.setattr(darshan, "DarshanReport", no_report)
+
+    cached = LogCollection(read_log_files(files, cache=DecodeCache(str(tmp_path))))
+    pd.testing.assert_frame_equal(Log.get_total_metadata_df(cached.logs), Log.get_total_metadata_df(expected.logs))
+    for module in ["POSIX", "LUSTRE", "STDIO", "DXT_POSIX"]:
+        for name, df in cached.get_module_as_df(module).items():
+            pd.testing.assert_frame_equal(df, expected.get_module_as_df(module)[name], check_dtype=False)
+
+def test_cached_tables_are_not_copied(tmp_path):
+    cache = DecodeCache(str(tmp_path))
+    n = 200_000
+    df = pd.DataFrame({'rank': np.zeros(n, dtype=np.int64), 'POSIX_OPENS': np.arange(n),
+                       'POSIX_F_READ_TIME': np.linspace(0, 1, n)})
+    header = {}
+    cache.put_header("digest", False, header)
+    cache.put_tables("digest", False, "POSIX", header, {'counters': df})
+
+    before = pa.total_allocated_bytes()
+    tables = cache.get_tables("digest", False, "POSIX", header)
+    # the numeric columns are views of the memory-mapped file.
+    assert pa.total_allocated_bytes() - before < df.memory_usage().sum() / 10
+    pd.testing.assert_frame_equal(tables['counters'], df)
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    files = _files()[:3]
+    cache = DecodeCache(str(tmp_path))
+    read_log_files(files, cache=cache)
+    entries = [cache.entry(file_hash(f)) for f in files]
+    for i, entry in enumerate(entries):
+        os.utime(entry, (i, i))
+
+    # looking the first log up again makes the second the least recently used.
+    Log.From_File(files[0], cache=cache)
+    cache.max_bytes = cache.size() - 1
+    cache.evict()
+    assert [entry.exists() for entry in entries] == [True, False, True]
+
+def test_cache_evicts_once_per_batch(tmp_path, monkeypatch):
+    n_logs = len(_files())
+    evictions = []
+    evict = DecodeCache.evict
+    def counting_evict(self):
+        evictions.append(self.size())
+        evict(self)
+    monkeypatch.setattr(DecodeCache, "evict", counting_evict)
+
+    cap = 2 << 20
+    (tmp_path / "out").mkdir()
+    aggregate_darshan(TEST_DIR, str(tmp_path / "out"), jobs=2, batch_size=4, modules=["POSIX"],
+                      cache_dir=str(tmp_path / "cache"), cache_size=cap)
+    assert len(evictions) == (n_logs + 3) // 4
+    assert DecodeCache(str(tmp_path / "cache")).size() <= cap
+
+@pytest.mark.parametrize("change", ["schema", "version", "source"])
+def test_cache_invalidated_on_schema_change(tmp_path, monkeypatch, change):
+    files = _files()[:1]
+    cache = DecodeCache(str(tmp_path))
+    read_log_files(files, cache=cache)
+    old_root = cache.root
+
+    if change == "schema":
+        monkeypatch.setattr(DecodeCache, "schema_version", DecodeCache.schema_version + 1)
+    elif change == "version":
+        monkeypatch.setattr(cache_module, "_version", lambda package: "0.0.0")
+    else:
+        monkeypatch.setattr(cache_module, "_source_hash", lambda: "edited")
+    new_cache = DecodeCache(str(tmp_path))
+    assert new_cache.root != old_root
+    assert not old_root.exists()
+    assert list(new_cache.root.iterdir()) == []
+
+    # the log is decoded again rather than read from the old entry.
+    decoded = []
+    report = darshan.DarshanReport
+    def counting_report(*args, **kwargs):
+        decoded.append(args[0])
+        return report(*args, **kwargs)
+    monkeypatch.setattr(darshan, "DarshanReport", counting_report)
+    read_log_files(files, cache=new_cache)
+    assert set(decoded) == set(files)
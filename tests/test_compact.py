@@ -0,0 +1,31 @@
+import os
+import pandas as pd
+from wfmeta_darshan import aggregate_darshan, collect_log_files, read_log_files
+from wfmeta_darshan.objs import LogCollection
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def test_compact_dtypes():
+    files = [os.path.join(TEST_DIR, f) for f in collect_log_files(TEST_DIR)]
+    coll = LogCollection(read_log_files(files, compact=True))
+
+    counters = coll.get_module_as_df("POSIX")["counters"]
+    assert counters["id"].dtype == "uint64"
+    for col in ["jobid", "juid", "rank"]:
+        assert isinstance(counters[col].dtype, pd.CategoricalDtype)
+    # categories are unified across logs rather than dropped by the concat.
+    assert len(counters["jobid"].cat.categories) == len(files)
+
+    reads = coll.get_module_as_df("DXT_POSIX")["read_segments"]
+    assert list(reads.columns[:5]) == ["jobid", "juid", "rank", "id", "hostname"]
+    assert isinstance(reads["hostname"].dtype, pd.CategoricalDtype)
+
+def test_compact_csv_matches_default(tmp_path):
+    (tmp_path / "default").mkdir()
+    (tmp_path / "compact").mkdir()
+    aggregate_darshan(TEST_DIR, str(tmp_path / "default"), jobs=1, modules=["POSIX", "STDIO"])
+    aggregate_darshan(TEST_DIR, str(tmp_path / "compact"), jobs=1, modules=["POSIX", "STDIO"], compact=True)
+
+    for name in ["metadata", "POSIX_counters", "POSIX_fcounters", "STDIO_counters", "STDIO_fcounters"]:
+        with open(tmp_path / "default" / (name + ".csv")) as f, open(tmp_path / "compact" / (name + ".csv")) as g:
+            assert f.read() == g.read()
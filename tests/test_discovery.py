@@ -0,0 +1,86 @@
+import datetime
+import os
+import shutil
+import pytest
+from wfmeta_darshan import aggregate_darshan, collect_log_files
+from wfmeta_darshan.objs.discovery import LogDiscovery, log_date
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def _name(jobid, month, day, suffix=".darshan"):
+    return "user_python3.10_id%i-%i_%i-%i-57270-11270316508385156860_1%s" % (jobid, jobid, month, day, suffix)
+
+@pytest.fixture
+def log_tree(tmp_path):
+    # darshan's year/month/day layout, plus some stray files.
+    paths = [os.path.join("2024", "4", "18", _name(1, 4, 18)),
+             os.path.join("2024", "4", "18", _name(2, 4, 18, ".darshan_partial")),
+             os.path.join("2024", "4", "19", _name(3, 4, 19)),
+             os.path.join("2024", "5", "2", _name(4, 5, 2)),
+             os.path.join("2025", "1", "1", _name(5, 1, 1)),
+             os.path.join("2025", "1", "1", "notes.txt"),
+             _name(6, 4, 18)]
+    for p in paths:
+        os.makedirs(os.path.dirname(os.path.join(tmp_path, p)), exist_ok=True)
+        open(os.path.join(tmp_path, p), "w").close()
+    return tmp_path
+
+def _walk(root, **kwargs):
+    return [os.path.relpath(p, root) for p in LogDiscovery(**kwargs).walk(str(root))]
+
+def test_flat_by_default(log_tree):
+    assert _walk(log_tree) == [_name(6, 4, 18)]
+
+def test_recursive_sorted(log_tree):
+    assert _walk(log_tree, recursive=True) == [_name(6, 4, 18),
+                                               os.path.join("2024", "4", "18", _name(1, 4, 18)),
+                                               os.path.join("2024", "4", "19", _name(3, 4, 19)),
+                                               os.path.join("2024", "5", "2", _name(4, 5, 2)),
+                                               os.path.join("2025", "1", "1", _name(5, 1, 1))]
+
+def test_partial_and_globs(log_tree):
+    found = _walk(log_tree, recursive=True, partial=True, include=["2024/*"], exclude=["*/19/*"])
+    assert found == [os.path.join("2024", "4", "18", _name(1, 4, 18)),
+                     os.path.join("2024", "4", "18", _name(2, 4, 18, ".darshan_partial")),
+                     os.path.join("2024", "5", "2", _name(4, 5, 2))]
+
+def test_date_range(log_tree):
+    found = _walk(log_tree, recursive=True, since=datetime.date(2024, 4, 19), until=datetime.date(2024, 12, 31))
+    assert found == [os.path.join("2024", "4", "19", _name(3, 4, 19)),
+                     os.path.join("2024", "5", "2", _name(4, 5, 2))]
+
+def test_date_range_outside_date_layout(tmp_path):
+    mtime = datetime.datetime(2024, 3, 15, 12).timestamp()
+    # a tree rooted at a year directory, and numeric jobid directories.
+    paths = [os.path.join("2024", "3", "15", _name(1, 3, 15)),
+             os.path.join("12345", _name(2, 3, 15)),
+             os.path.join("7", "0", _name(3, 3, 15))]
+    for p in paths:
+        os.makedirs(os.path.dirname(os.path.join(tmp_path, p)), exist_ok=True)
+        open(os.path.join(tmp_path, p), "w").close()
+        os.utime(os.path.join(tmp_path, p), (mtime, mtime))
+
+    since = datetime.date(2020, 1, 1)
+    assert _walk(tmp_path / "2024", recursive=True, since=since) == [os.path.join("3", "15", _name(1, 3, 15))]
+    assert _walk(tmp_path, recursive=True, since=since, until=datetime.date(2024, 12, 31)) == \
+        [os.path.join("12345", _name(2, 3, 15)), os.path.join("2024", "3", "15", _name(1, 3, 15)),
+         os.path.join("7", "0", _name(3, 3, 15))]
+    assert _walk(tmp_path, recursive=True, until=datetime.date(2024, 3, 14)) == []
+
+def test_log_date_year_from_mtime():
+    mtime = datetime.datetime(2025, 1, 1, 0, 5).timestamp()
+    # written just before new year, closed just after.
+    assert log_date(_name(1, 12, 31), [], mtime) == datetime.date(2024, 12, 31)
+    assert log_date(_name(1, 1, 1), ["2023", "1", "1"], mtime) == datetime.date(2023, 1, 1)
+
+def test_aggregate_recursive(tmp_path):
+    logs = sorted(collect_log_files(TEST_DIR))[:2]
+    for i, f in enumerate(logs):
+        os.makedirs(os.path.join(tmp_path, "in", str(i)))
+        shutil.copy(os.path.join(TEST_DIR, f), os.path.join(tmp_path, "in", str(i), f))
+    os.makedirs(os.path.join(tmp_path, "out"))
+
+    aggregate_darshan(str(tmp_path / "in"), str(tmp_path / "out"), jobs=1, batch_size=1,
+                      modules=["POSIX"], discovery=LogDiscovery(recursive=True))
+    with open(os.path.join(tmp_path, "out", "metadata.csv")) as f:
+        assert len(f.readlines()) == 3
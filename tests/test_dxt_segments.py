@@ -0,0 +1,36 @@
+import pandas as pd
+from wfmeta_darshan.objs.colls import DXT_POSIX_coll
+
+def _record(rank, id, n_read, n_write):
+    def segs(n, base):
+        return [{'offset': base + 10 * i, 'length': 10, 'start_time': 0.5 * i,
+                 'end_time': 0.5 * i + 0.1, 'extra_info': 'pthread_id=%i' % (1000 + i % 2)}
+                for i in range(n)]
+    return {'id': id, 'rank': rank, 'hostname': 'node%i' % rank,
+            'read_count': n_read, 'write_count': n_write,
+            'read_segments': segs(n_read, 0), 'write_segments': segs(n_write, 1 << 40)}
+
+def _expected(records, which):
+    # the per-record construction the columnar builder replaces.
+    dfs = []
+    for r in records:
+        if len(r[which]) == 0:
+            continue
+        df = pd.DataFrame(r[which])
+        df.insert(0, "rank", r['rank'])
+        df.insert(1, "id", r['id'])
+        df = df.astype({'id': str})
+        df.insert(df.shape[1] - 1, 'pthread_id', [e.split('=')[1] for e in df['extra_info']])
+        dfs.append(df.drop('extra_info', axis=1))
+    return pd.concat(dfs, ignore_index=True)
+
+def test_columnar_segments_match_per_record_frames():
+    records = [_record(0, 2**64 - 5, 3, 0),
+               _record(1, 17, 0, 2),
+               _record(3, 2**63 + 1, 4, 5)]
+    coll = DXT_POSIX_coll(records, 1000, 42)
+
+    assert coll.has_read and coll.has_write
+    pd.testing.assert_frame_equal(coll.read_segments, _expected(records, 'read_segments'))
+    pd.testing.assert_frame_equal(coll.write_segments, _expected(records, 'write_segments'))
+    assert list(coll.read_segments['id'].unique()) == [str(2**64 - 5), str(2**63 + 1)]
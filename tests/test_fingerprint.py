@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from wfmeta_darshan import aggregate_darshan, read_log_files, FingerprintIndex, fingerprint_features
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+LOGS = [os.path.join(TEST_DIR, f) for f in sorted(os.listdir(TEST_DIR)) if f.endswith(".darshan")]
+
+def test_log_fingerprint():
+    for log in read_log_files(LOGS[:6]):
+        vector = dict(zip(fingerprint_features, log.fingerprint()))
+        assert len(vector) == len(fingerprint_features)
+        assert all(0 <= v <= 1 for v in vector.values())
+
+        job = log.rollup()['job']
+        if len(job) == 0:
+            continue
+        reads, writes = job['reads'].sum(), job['writes'].sum()
+        bytes_read, bytes_written = job['bytes_read'].sum(), job['bytes_written'].sum()
+        if reads > 0:
+            assert np.isclose(sum(v for f, v in vector.items() if f.startswith("read_size_")), 1)
+            assert np.isclose(vector['read_ops_fraction'], reads / (reads + writes))
+        if bytes_read + bytes_written > 0:
+            assert np.isclose(vector['read_bytes_fraction'], bytes_read / (bytes_read + bytes_written))
+        meta_time = job['meta_time'].sum()
+        assert np.isclose(vector['meta_time_share'], meta_time / (meta_time + job['read_time'].sum() + job['write_time'].sum()))
+
+def test_fingerprints_table(tmp_path):
+    aggregate_darshan(TEST_DIR, str(tmp_path / "csv"), jobs=2)
+    aggregate_darshan(TEST_DIR, str(tmp_path / "parquet"), jobs=2, output_format="parquet")
+    metadata = pd.read_csv(tmp_path / "csv" / "metadata.csv", index_col=0)
+    df = pd.read_csv(tmp_path / "csv" / "fingerprints.csv", index_col=0)
+    assert list(df.columns) == ['jobid', 'juid'] + fingerprint_features
+    assert list(df['jobid']) == list(metadata['jobid'])
+
+    index = FingerprintIndex.From_Output(str(tmp_path / "parquet"))
+    assert len(index) == len(df)
+    jobid = int(df['jobid'].iloc[1])
+    similar = index.query_job(jobid, k=5)
+    assert len(similar) == 5 and jobid not in list(similar['jobid'])
+    assert list(similar['similarity']) == sorted(similar['similarity'], reverse=True)
+    expected = FingerprintIndex.From_Table(df).query(df[fingerprint_features].iloc[1], k=6)
+    assert set(similar['jobid']) <= set(expected['jobid'])
+
+def test_top_k(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5000
+    vectors = rng.random((n, len(fingerprint_features)), dtype=np.float32)
+    vectors[7] = 0
+    index = FingerprintIndex(np.arange(n), np.zeros(n), vectors)
+
+    query = rng.random(len(fingerprint_features))
+    top = index.query(query, k=10)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(1e-12)
+    similarity = unit @ (query / np.linalg.norm(query))
+    assert list(top['jobid']) == list(np.argsort(-similarity, kind='stable')[:10])
+    assert np.allclose(top['similarity'], np.sort(similarity)[::-1][:10], atol=1e-5)
+
+    index.save(str(tmp_path / "index.npz"))
+    loaded = FingerprintIndex.Load(str(tmp_path / "index.npz"))
+    pd.testing.assert_frame_equal(loaded.query_job(3, k=3), index.query_job(3, k=3))
+    assert 3 not in list(loaded.query_job(3, k=3)['jobid'])
+    assert len(index.query(query, k=n + 5)) == n
+
+def test_bad_input():
+    index = FingerprintIndex([1, 2], [0, 0], np.eye(2, len(fingerprint_features)))
+    assert len(index.query_job(1, k=10)) == 1
+    with pytest.raises(ValueError):
+        index.query_job(3)
+    with pytest.raises(ValueError):
+        index.query(np.ones(3))
+    with pytest.raises(ValueError):
+        FingerprintIndex([1], [0], np.ones((1, 3)))
+    with pytest.raises(ValueError):
+        FingerprintIndex.From_Table(pd.DataFrame({'jobid': [1], 'juid': [0]}))
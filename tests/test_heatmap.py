@@ -0,0 +1,84 @@
+import os
+import numpy as np
+from darshan.datatypes.heatmap import Heatmap
+from wfmeta_darshan import Log, LogCollection
+from wfmeta_darshan.objs.colls import HEATMAP_coll, MPIIO_coll, DXT_MPIIO_coll
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def _heatmap(mod, ranks, read, write, width=0.5):
+    heatmap = Heatmap(mod)
+    for rank, r, w in zip(ranks, read, write):
+        heatmap.add_record({'rank': rank, 'nbins': len(r), 'bin_width_seconds': width, 'id': 0,
+                            'read_bins': np.array(r, dtype=np.uint64), 'write_bins': np.array(w, dtype=np.uint64)})
+    return heatmap
+
+def _coll(compact=False):
+    heatmaps = {'POSIX': _heatmap('POSIX', [1, 0], [[0, 5, 0], [1, 2, 3]], [[7, 0, 0], [0, 0, 4]]),
+                'STDIO': _heatmap('STDIO', [0], [[9, 9]], [[1, 0]], width=2.0)}
+    return HEATMAP_coll(heatmaps, "juid", "42", compact=compact)
+
+def test_heatmap_dense_arrays():
+    coll = _coll()
+    assert coll.submodules == ['POSIX', 'STDIO']
+    assert list(coll.rank_ids['POSIX']) == [0, 1]
+    assert coll.read_bins['POSIX'].tolist() == [[1, 2, 3], [0, 5, 0]]
+    assert coll.bin_widths['STDIO'] == 2.0
+    read, write = coll.totals('POSIX')
+    assert read.tolist() == [1, 7, 3]
+    assert write.tolist() == [7, 0, 4]
+
+def test_heatmap_tables_roundtrip():
+    for compact in (False, True):
+        coll = _coll(compact)
+        df = coll.get_df_with_ids()['bins']
+        assert len(df) == 2 * 3 + 2
+        assert df['read_bytes'].sum() == 11 + 18
+        assert np.allclose(df.loc[df['module'] == 'STDIO', 'bin_start'], [0.0, 2.0])
+
+        back = HEATMAP_coll.From_Tables({'bins': df}, "juid", "42", compact=compact)
+        for submodule in coll.submodules:
+            assert np.array_equal(back.read_bins[submodule], coll.read_bins[submodule])
+            assert np.array_equal(back.write_bins[submodule], coll.write_bins[submodule])
+            assert back.bin_widths[submodule] == coll.bin_widths[submodule]
+
+    empty = HEATMAP_coll({}, "juid", "42")
+    assert len(empty.get_df_with_ids()['bins']) == 0
+    assert HEATMAP_coll.From_Tables(empty.get_df_with_ids(), "juid", "42").submodules == []
+
+def test_new_modules_registered():
+    assert Log.module_colls["MPI-IO"] is MPIIO_coll
+    assert Log.module_colls["DXT_MPIIO"] is DXT_MPIIO_coll
+    assert Log.module_colls["HEATMAP"] is HEATMAP_coll
+    assert LogCollection.module_tables["HEATMAP"] == ['bins']
+
+class _FakeLog:
+    def __init__(self, start, coll):
+        self.loaded_modules = ["HEATMAP"]
+        self.metadata = {'job': {'start_time_sec': start, 'start_time_nsec': 0}}
+        self.HEATMAP = coll
+
+def test_collection_heatmap_sums_logs():
+    coll = _coll()
+    logs = [_FakeLog(100, coll), _FakeLog(101, coll)]
+    heatmap = LogCollection(logs).get_heatmap("POSIX")
+    assert heatmap['start'].iloc[0] == 100
+    # the second log starts two bins later.
+    assert heatmap['read_bytes'].tolist() == [1, 7, 4, 7, 3]
+    assert heatmap['read_bytes'].sum() == 2 * 11
+
+    coarse = LogCollection(logs).get_heatmap("POSIX", bin_width=2.5)
+    assert len(coarse) == 1
+    assert coarse['write_bytes'].sum() == 2 * 11
+
+    assert len(LogCollection(logs).get_heatmap("MPIIO")) == 0
+
+def test_heatmap_from_logs():
+    logs = [Log.From_File(os.path.join(TEST_DIR, f)) for f in sorted(os.listdir(TEST_DIR))[:4] if f.endswith(".darshan")]
+    for l in logs:
+        if "HEATMAP" not in l.loaded_modules:
+            continue
+        df = l.get_module_as_df("HEATMAP")['bins']
+        for submodule in l.HEATMAP.submodules:
+            rows = df[df['module'] == submodule]
+            assert rows['read_bytes'].sum() == l.HEATMAP.read_bins[submodule].sum()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import pandas as pd
+from wfmeta_darshan import aggregate_darshan, Manifest
+
+def _logs(d):
+    return sorted(f for f in os.listdir(d) if f.endswith(".darshan"))
+
+def _rows(output_dir, name):
+    df = pd.read_csv(os.path.join(output_dir, name), index_col=0)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+def test_incremental_matches_full_run(tmp_path):
+    src = "tests/test_data/ImageProcessing1"
+    logs_dir = tmp_path / "logs"
+    logs_dir.mkdir()
+    names = _logs(src)
+    first, second = names[:20], names[20:]
+
+    for f in first + second[:3]:
+        shutil.copy(os.path.join(src, f), logs_dir)
+
+    incr = tmp_path / "incremental"
+    incr.mkdir()
+    aggregate_darshan(str(logs_dir), str(incr), jobs=1)
+
+    # add the remaining logs, drop three of the first run's logs.
+    for f in second[3:]:
+        shutil.copy(os.path.join(src, f), logs_dir)
+    for f in second[:3]:
+        os.remove(logs_dir / f)
+    aggregate_darshan(str(logs_dir), str(incr), jobs=1, incremental=True)
+
+    manifest = Manifest.Load(str(incr))
+    assert len(manifest.logs) == len(first) + len(second) - 3
+
+    full = tmp_path / "full"
+    full.mkdir()
+    aggregate_darshan(str(logs_dir), str(full), jobs=1)
+
+    for name in ["metadata.csv", "POSIX_counters.csv", "STDIO_fcounters.csv",
+                 "DXT_POSIX_read_segments.csv"]:
+        pd.testing.assert_frame_equal(_rows(incr, name), _rows(full, name))
+
+def test_incremental_without_changes_reads_nothing(tmp_path):
+    src = "tests/test_data/ImageProcessing1"
+    aggregate_darshan(src, str(tmp_path), jobs=1)
+    before = (tmp_path / "POSIX_counters.csv").read_bytes()
+
+    aggregate_darshan(src, str(tmp_path), jobs=1, incremental=True)
+    assert (tmp_path / "POSIX_counters.csv").read_bytes() == before
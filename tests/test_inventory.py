@@ -0,0 +1,23 @@
+import os
+import re
+import sys
+import pandas as pd
+import wfmeta_darshan as darshan_agg
+
+def test_inventory_matches_metadata(tmp_path):
+    test_file_dir = "tests/test_data/ImageProcessing1"
+    files = sorted(os.path.join(test_file_dir, f) for f in os.listdir(test_file_dir) if re.match(".+darshan$", f))
+
+    inventory = darshan_agg.inventory_log_files(files, jobs=2)
+    metadata = darshan_agg.Log.get_total_metadata_df(darshan_agg.read_log_files(files))
+
+    assert list(inventory['path']) == files
+    pd.testing.assert_frame_equal(inventory.drop(columns='path'), metadata)
+
+def test_inventory_cli(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["wfmeta_darshan", "inventory", "-j", "1",
+                                      "tests/test_data/ImageProcessing1", str(tmp_path)])
+    darshan_agg.create_parser_and_run()
+
+    assert os.listdir(tmp_path) == ["inventory.csv"]
+    assert len(pd.read_csv(tmp_path / "inventory.csv", index_col=0)) == 33
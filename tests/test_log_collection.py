@@ -0,0 +1,25 @@
+import os
+import pandas as pd
+from wfmeta_darshan import collect_log_files, read_log_files
+from wfmeta_darshan.objs import LogCollection
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def test_arrow_tables_match_concatenated_frames():
+    logs = read_log_files([os.path.join(TEST_DIR, f) for f in collect_log_files(TEST_DIR)])
+    lc = LogCollection(logs)
+
+    for module in ["POSIX", "STDIO", "DXT_POSIX"]:
+        for key in lc.get_module_as_arrow(module):
+            frames = [log.get_module_as_df(module)[key] for log in logs if module in log.loaded_modules]
+            expected = pd.concat(frames, ignore_index=True)
+
+            table = lc.to_arrow(module, key)
+            assert table.num_rows == len(expected)
+            assert lc.to_arrow(module, key) is table
+            if len(expected.columns) == 0:
+                # e.g. no log has DXT write segments.
+                assert table.num_columns == 0
+                continue
+
+            pd.testing.assert_frame_equal(lc.to_pandas(module, key), expected, check_dtype=False)
@@ -0,0 +1,32 @@
+import os
+import pytest
+from wfmeta_darshan import Log, aggregate_darshan
+
+TEST_LOG = "tests/test_data/ImageProcessing1/python3.10_id11297-11297_4-18-57270-11270316508385156860_1.darshan"
+
+def test_modules_decoded_on_first_access():
+    log = Log.From_File(TEST_LOG)
+    assert "POSIX" in log.loaded_modules and "DXT_POSIX" in log.loaded_modules
+    assert log._colls == {}
+
+    assert len(log.POSIX.counters_df) > 0
+    assert list(log._colls.keys()) == ["POSIX"]
+
+    # the same collection is handed out again, not re-decoded.
+    assert log.POSIX is log._colls["POSIX"]
+
+def test_unselected_modules_are_not_loaded():
+    log = Log.From_File(TEST_LOG, modules=["STDIO"]).load()
+    assert log.loaded_modules == ["STDIO"]
+    assert list(log._colls.keys()) == ["STDIO"]
+    with pytest.raises(AttributeError):
+        log.DXT_POSIX
+
+    # module presence in the metadata does not depend on the selection.
+    assert bool(log.get_metadata_df().iloc[0, 12 + Log.expected_modules.index("DXT_POSIX")])
+
+def test_aggregate_selected_modules(tmp_path):
+    aggregate_darshan("tests/test_data/ImageProcessing1", str(tmp_path), jobs=1, modules=["POSIX"])
+    written = sorted(f for f in os.listdir(tmp_path) if f.endswith(".csv"))
+    assert written == ["POSIX_counters.csv", "POSIX_fcounters.csv", "fingerprints.csv", "metadata.csv", "names.csv",
+                       "rollup_file.csv", "rollup_job.csv", "rollup_rank.csv"]
@@ -0,0 +1,44 @@
+import os
+import pandas as pd
+from wfmeta_darshan import Log, LogCollection, aggregate_darshan, join_paths
+from wfmeta_darshan.objs.cache import DecodeCache
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+TEST_LOG = os.path.join(TEST_DIR, "python3.10_id11297-11297_4-18-57270-11270316508385156860_1.darshan")
+
+def test_log_names_and_report_released():
+    log = Log.From_File(TEST_LOG)
+    assert log.report is None and log.names is None
+
+    log.load()
+    assert len(log.names) > 0
+    assert not hasattr(log.POSIX, "records")
+
+    posix = join_paths(log.POSIX.counters_df, log.get_names_df())
+    assert posix["path"].notna().all()
+
+def test_names_cached(tmp_path):
+    cache = DecodeCache(str(tmp_path))
+    first = Log.From_File(TEST_LOG, cache=cache).load()
+    second = Log.From_File(TEST_LOG, cache=cache).load()
+    assert second.names == first.names
+
+def test_names_table_written_once(tmp_path):
+    aggregate_darshan(TEST_DIR, str(tmp_path), jobs=2, batch_size=4)
+
+    names = pd.read_csv(tmp_path / "names.csv", index_col=0, dtype={"id": str})
+    assert names["id"].is_unique
+    counters = pd.read_csv(tmp_path / "STDIO_counters.csv", index_col=0, dtype={"id": str})
+    assert set(counters["id"]) <= set(names["id"])
+    assert join_paths(counters, names)["path"].notna().all()
+
+    # an incremental run over changed logs adds no duplicates.
+    aggregate_darshan(TEST_DIR, str(tmp_path), jobs=1, incremental=True)
+    assert pd.read_csv(tmp_path / "names.csv", index_col=0, dtype={"id": str})["id"].is_unique
+
+def test_collection_names_deduplicated():
+    log = Log.From_File(TEST_LOG, compact=True)
+    names = LogCollection([log, log]).get_names()
+    assert names["id"].is_unique
+    assert len(names) == len(log.names)
+    assert names["id"].dtype == "uint64"
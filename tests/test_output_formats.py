@@ -0,0 +1,61 @@
+import pytest
+import os
+import pandas as pd
+import pyarrow.dataset as ds
+from wfmeta_darshan import aggregate_darshan, make_writer, output_formats
+
+@pytest.mark.parametrize("output_format, ds_format", [("parquet", "parquet"), ("arrow", "ipc")])
+def test_dataset_output_matches_csv(tmp_path, output_format, ds_format):
+    test_data_dir = "tests/test_data/ImageProcessing1"
+    csv_dir = tmp_path / "csv"
+    ds_dir = tmp_path / output_format
+    csv_dir.mkdir()
+    ds_dir.mkdir()
+
+    aggregate_darshan(test_data_dir, str(csv_dir), jobs=1)
+    aggregate_darshan(test_data_dir, str(ds_dir), jobs=1, batch_size=10, output_format=output_format)
+
+    csv_df: pd.DataFrame = pd.read_csv(csv_dir / "POSIX_counters.csv", index_col=0)
+    dataset = ds.dataset(ds_dir / "POSIX_counters", format=ds_format, partitioning="hive")
+    assert dataset.count_rows() == len(csv_df)
+
+    # Every job gets its own partition, so filtering on jobid only
+    #   touches that job's files.
+    jobid = int(csv_df['jobid'].iloc[0])
+    job_files = [f for f in dataset.files if "jobid=%i" % jobid in f]
+    assert len(job_files) > 0
+    table = dataset.to_table(filter=ds.field('jobid') == jobid, columns=['id', 'POSIX_OPENS'])
+    assert table.num_rows == (csv_df['jobid'] == jobid).sum()
+
+    assert os.path.isdir(ds_dir / "metadata")
+
+@pytest.mark.parametrize("output_format", output_formats)
+def test_batches_with_different_columns(tmp_path, output_format):
+    batches = [pd.DataFrame({'jobid': [1, 1], 'a': [1, 2], 'b': [10, 20]}),
+               pd.DataFrame({'b': [30], 'c': [300], 'jobid': [2], 'a': [3]}),
+               pd.DataFrame({'jobid': [1], 'a': [4]})]
+    expected = pd.DataFrame({'a': [1, 2, 3, 4], 'b': [10, 20, 30, -1], 'c': [-1, -1, 300, -1]})
+
+    def check(writer):
+        df = writer.read("t", ['a', 'b', 'c'])
+        df = df.apply(pd.to_numeric, errors='coerce').fillna(-1).astype(int)
+        pd.testing.assert_frame_equal(df.sort_values('a').reset_index(drop=True), expected)
+
+    (tmp_path / "out").mkdir()
+    (tmp_path / "merged").mkdir()
+    writer = make_writer(str(tmp_path / "out"), output_format)
+    for df in batches[:2]:
+        writer.write("t", df)
+    # A later writer picks the columns up from what was written.
+    resumed = make_writer(str(tmp_path / "out"), output_format)
+    resumed.resume(writer.state())
+    resumed.write("t", batches[2])
+    resumed.close()
+    check(resumed)
+
+    # Merged outputs keep every column too.
+    merged = make_writer(str(tmp_path / "merged"), output_format)
+    merged.write("t", pd.DataFrame({'jobid': [3], 'a': [0], 'd': [5]}))
+    merged.copy_from("t", str(tmp_path / "out"))
+    merged.close()
+    assert set(merged.read("t", ['a', 'b', 'c', 'd'])['a'].astype(int)) == {0, 1, 2, 3, 4}
@@ -0,0 +1,31 @@
+import pytest
+import os
+import re
+import pandas as pd
+import wfmeta_darshan as darshan_agg
+
+
+@pytest.fixture(scope="module")
+def ImageProcessingFixture() :
+    test_file_dir = "tests/test_data/ImageProcessing1"
+    test_files = sorted(os.listdir(test_file_dir))
+    only_full_logs = [f for f in test_files if re.match(".+darshan$", f)]
+    yield [os.path.join(test_file_dir, f) for f in only_full_logs]
+
+def test_parallel_matches_serial(ImageProcessingFixture) :
+    serial = darshan_agg.read_log_files(ImageProcessingFixture, jobs=1)
+    parallel = darshan_agg.read_log_files(ImageProcessingFixture, jobs=4)
+
+    assert [l.jobid for l in serial] == [l.jobid for l in parallel]
+    assert all(l.report is None for l in parallel)
+
+    pd.testing.assert_frame_equal(darshan_agg.Log.get_total_metadata_df(serial),
+                                  darshan_agg.Log.get_total_metadata_df(parallel))
+
+    lc_s = darshan_agg.LogCollection(serial)
+    lc_p = darshan_agg.LogCollection(parallel)
+    for module in ["POSIX", "STDIO", "DXT_POSIX"] :
+        dfs_s = lc_s.get_module_as_df(module)
+        dfs_p = lc_p.get_module_as_df(module)
+        for key in dfs_s :
+            pd.testing.assert_frame_equal(dfs_s[key], dfs_p[key])
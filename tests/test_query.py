@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from wfmeta_darshan import aggregate_darshan, OutputReader
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+@pytest.fixture(scope="module", params=[("csv", False), ("parquet", True), ("arrow", False)])
+def output(request, tmp_path_factory):
+    output_format, compact = request.param
+    out = tmp_path_factory.mktemp(output_format)
+    aggregate_darshan(TEST_DIR, str(out), jobs=2, batch_size=7, output_format=output_format, compact=compact)
+    full = tmp_path_factory.mktemp("csv-full")
+    aggregate_darshan(TEST_DIR, str(full), jobs=2)
+    yield OutputReader(str(out)), full
+
+def _csv(full, name):
+    return pd.read_csv(full / (name + ".csv"), index_col=0, dtype={'id': str})
+
+def test_filters(output):
+    reader, full = output
+    counters = _csv(full, "POSIX_counters")
+    jobid = int(counters['jobid'].iloc[0])
+    file_id = int(counters['id'].iloc[-1])
+
+    df = reader.read("POSIX_counters", ['jobid', 'rank', 'id', 'POSIX_OPENS'], jobid=jobid)
+    assert list(df.columns) == ['jobid', 'rank', 'id', 'POSIX_OPENS']
+    assert len(df) == (counters['jobid'] == jobid).sum()
+    assert df['POSIX_OPENS'].sum() == counters.loc[counters['jobid'] == jobid, 'POSIX_OPENS'].sum()
+
+    df = reader.read("POSIX_counters", file_id=file_id, rank=[0, 1])
+    expected = counters[(counters['id'] == str(file_id)) & counters['rank'].isin([0, 1])]
+    assert len(df) == len(expected)
+    assert sorted(df['POSIX_BYTES_READ']) == sorted(expected['POSIX_BYTES_READ'])
+    assert len(reader.read("names", file_id=str(file_id))) == 1
+
+    assert len(reader.read("POSIX_counters", jobid=-1)) == 0
+    with pytest.raises(ValueError):
+        reader.read("names", rank=0)
+    with pytest.raises(ValueError):
+        reader.read("not_a_table")
+
+def test_time_window(output):
+    reader, full = output
+    metadata = _csv(full, "metadata")
+    segments = _csv(full, "DXT_POSIX_read_segments")
+    starts = metadata['start_time_sec'] + metadata['start_time_nsec'] * 1e-9
+    ends = metadata['end_time_sec'] + metadata['end_time_nsec'] * 1e-9
+    t0, t1 = float(np.median(starts)), float(np.median(starts)) + 600
+
+    jobs = reader.jobs(start=t0, end=t1)
+    assert len(jobs) == ((ends >= t0) & (starts < t1)).sum()
+
+    job_start = segments[['jobid', 'juid']].merge(pd.DataFrame({'jobid': metadata['jobid'], 'juid': metadata['uid'],
+                                                                'job_start': starts}), how='left')['job_start'].to_numpy()
+    a, b = job_start + segments['start_time'], job_start + segments['end_time']
+    expected = ((b > t0) | (a >= t0)) & (a < t1)
+    df = reader.read("DXT_POSIX_read_segments", ['rank', 'length'], start=t0, end=t1)
+    assert list(df.columns) == ['rank', 'length']
+    assert len(df) == expected.sum() > 0
+
+def test_metadata_join(output):
+    reader, full = output
+    df = reader.read("rollup_job", ['jobid', 'juid', 'module', 'bytes_read'], metadata=['exe', 'nprocs'])
+    expected = _csv(full, "rollup_job").merge(_csv(full, "metadata").rename(columns={'uid': 'juid'}),
+                                              on=['jobid', 'juid'], how='left')
+    assert len(df) == len(expected)
+    assert df['nprocs'].sum() == expected['nprocs'].sum()
+    assert set(df['exe'].astype(str)) == set(expected['exe'])
+
+def test_projection_without_keys(output):
+    reader, full = output
+    jobid = int(_csv(full, "metadata")['jobid'].iloc[0])
+    df = reader.read("POSIX_counters", ['POSIX_OPENS'], jobid=jobid, metadata=['nprocs'])
+    assert list(df.columns) == ['POSIX_OPENS', 'nprocs']
+    assert len(df) > 0 and df['nprocs'].notna().all()
+    assert list(reader.read("POSIX_counters", ['POSIX_OPENS'], jobid=-1, metadata=['nprocs']).columns) == ['POSIX_OPENS', 'nprocs']
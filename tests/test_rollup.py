@@ -0,0 +1,44 @@
+import pandas as pd
+from wfmeta_darshan import Log, LogCollection, aggregate_darshan
+
+TEST_LOG = "tests/test_data/ImageProcessing1/python3.10_id11297-11297_4-18-57270-11270316508385156860_1.darshan"
+
+def test_log_rollup_matches_counters():
+    log = Log.From_File(TEST_LOG)
+    rollup = log.rollup()
+    assert set(rollup) == {"job", "file", "rank"}
+
+    counters = log.POSIX.counters_df
+    fcounters = log.POSIX.fcounters_df
+    job = rollup["job"].set_index("module").loc["POSIX"]
+    assert job["bytes_read"] == counters["POSIX_BYTES_READ"].clip(lower=0).sum()
+    assert job["writes"] == counters["POSIX_WRITES"].clip(lower=0).sum()
+    assert job["meta_time"] == fcounters["POSIX_F_META_TIME"].clip(lower=0).sum()
+    assert job["files"] == counters["id"].nunique()
+
+    # every level sums to the same totals.
+    for level in ["file", "rank"]:
+        posix = rollup[level][rollup[level]["module"] == "POSIX"]
+        assert posix["bytes_read"].sum() == job["bytes_read"]
+        assert posix["records"].sum() == job["records"]
+    assert len(rollup["file"][rollup["file"]["module"] == "POSIX"]) == counters["id"].nunique()
+
+def test_rollup_tables_written(tmp_path):
+    aggregate_darshan("tests/test_data/ImageProcessing1", str(tmp_path), jobs=2, batch_size=4)
+
+    posix = pd.read_csv(tmp_path / "POSIX_counters.csv")
+    job = pd.read_csv(tmp_path / "rollup_job.csv", index_col=0)
+    metadata = pd.read_csv(tmp_path / "metadata.csv")
+
+    assert job[job["module"] == "POSIX"]["bytes_written"].sum() == posix["POSIX_BYTES_WRITTEN"].clip(lower=0).sum()
+    assert set(job["jobid"]) <= set(metadata["jobid"])
+    for level in ["file", "rank"]:
+        df = pd.read_csv(tmp_path / ("rollup_%s.csv" % level), index_col=0)
+        assert df.groupby("module")["reads"].sum().equals(job.groupby("module")["reads"].sum())
+
+def test_collection_rollups_compact():
+    logs = [Log.From_File(TEST_LOG, compact=True)]
+    tables = LogCollection(logs).get_rollups()
+    assert set(tables) == {"rollup_job", "rollup_file", "rollup_rank"}
+    assert len(tables["rollup_file"]) > 0
+    assert (tables["rollup_rank"]["records"] > 0).all()
@@ -0,0 +1,42 @@
+import json
+import pstats
+import pandas as pd
+from wfmeta_darshan import aggregate_darshan
+
+def test_run_report(tmp_path):
+    test_data_dir = "tests/test_data/ImageProcessing1"
+    aggregate_darshan(test_data_dir, str(tmp_path), jobs=2, batch_size=4)
+
+    with open(tmp_path / "run_report.json") as f:
+        report = json.load(f)
+
+    metadata = pd.read_csv(tmp_path / "metadata.csv")
+    assert report["logs"] == len(metadata)
+    assert report["settings"]["batch_size"] == 4
+    for phase in ["discovery", "decode", "metadata", "concat", "write"]:
+        assert report["phases"][phase]["calls"] > 0, phase
+        assert report["phases"][phase]["wall_seconds"] >= 0, phase
+
+    # Rows per module match what was written.
+    posix = pd.read_csv(tmp_path / "POSIX_counters.csv")
+    posix_f = pd.read_csv(tmp_path / "POSIX_fcounters.csv")
+    assert report["modules"]["POSIX"]["rows"] == len(posix) + len(posix_f)
+    assert report["modules"]["POSIX"]["bytes"] > 0
+    assert report["modules"]["POSIX"]["decode_seconds"] > 0
+
+    slowest = report["slowest_logs"]
+    assert 0 < len(slowest) <= 10
+    seconds = [log["decode_seconds"] for log in slowest]
+    assert seconds == sorted(seconds, reverse=True)
+    assert "header" in slowest[0]["parts"]
+
+def test_profile(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    profile = tmp_path / "run.prof"
+    aggregate_darshan("tests/test_data/ImageProcessing1", str(out), jobs=1,
+                      modules=["POSIX"], profile=str(profile))
+
+    stats = pstats.Stats(str(profile))
+    assert any(func[2] == "aggregate_darshan" for func in stats.stats)
+    assert (out / "run_report.json").exists()
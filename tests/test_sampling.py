@@ -0,0 +1,98 @@
+import os
+import argparse
+import filecmp
+import numpy as np
+import pandas as pd
+import pytest
+from wfmeta_darshan import aggregate_darshan, read_log_files, DxtSampling, DXT_POSIX_coll, LogCollection, sample_spec
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+LOGS = [os.path.join(TEST_DIR, f) for f in sorted(os.listdir(TEST_DIR)) if f.endswith(".darshan")]
+
+def _records(n_segments):
+    rng = np.random.default_rng(0)
+    records = []
+    for i, n in enumerate(n_segments):
+        starts = np.sort(rng.random(n) * 100)
+        segments = [{'offset': int(j) * 4096, 'length': int(l), 'start_time': float(s), 'end_time': float(s) + 0.01}
+                    for j, (l, s) in enumerate(zip(rng.integers(1, 1 << 20, n), starts))]
+        records.append({'rank': i % 2, 'id': 1000 + i // 2, 'hostname': "node%i" % (i % 2),
+                        'read_count': n, 'write_count': 0, 'read_segments': segments, 'write_segments': []})
+    return records
+
+@pytest.mark.parametrize("method", ["reservoir", "time"])
+def test_sampled_segments(method):
+    records = _records([5000, 300, 20])
+    coll = DXT_POSIX_coll(records, "juid", "1", sampling=DxtSampling(100, method))
+    df = coll.read_segments
+    assert len(df) == 100 + 100 + 20
+    assert list(df.groupby(['rank', 'id'], sort=False)['weight'].sum()) == [5000, 300, 20]
+
+    true_bytes = [sum(s['length'] for s in r['read_segments']) for r in records]
+    totals = coll.get_df_with_ids()['totals']
+    assert list(totals['read_segments']) == [5000, 300, 20]
+    assert list(totals['read_bytes']) == true_bytes
+    estimate = (df['length'] * df['weight']).groupby([df['rank'], df['id']], sort=False).sum()
+    assert estimate.iloc[2] == true_bytes[2]
+    assert abs(estimate.iloc[0] / true_bytes[0] - 1) < 0.3
+
+    # Same log, same sample.
+    again = DXT_POSIX_coll(records, "juid", "1", sampling=DxtSampling(100, method))
+    pd.testing.assert_frame_equal(df, again.get_df_with_ids()["read_segments"])
+
+def test_sampling_is_unbiased():
+    records = _records([400])
+    true_bytes = sum(s['length'] for s in records[0]['read_segments'])
+    for method in ["reservoir", "time"]:
+        estimates = []
+        for seed in range(200):
+            df = DXT_POSIX_coll(records, "juid", "1", sampling=DxtSampling(10, method, seed)).read_segments
+            estimates.append((df['length'] * df['weight']).sum())
+        assert abs(np.mean(estimates) / true_bytes - 1) < 0.05, method
+
+def test_time_sample_covers_the_run():
+    records = _records([1000])
+    df = DXT_POSIX_coll(records, "juid", "1", sampling=DxtSampling(10, "time")).read_segments
+    starts = np.sort([s['start_time'] for s in records[0]['read_segments']])
+    # One segment from each tenth of the run.
+    assert list(np.searchsorted(starts[::100][1:], df.sort_values('start_time')['start_time'], side='right')) == list(range(10))
+
+def test_sampled_aggregate(tmp_path):
+    full = tmp_path / "full"
+    sampled = tmp_path / "sampled"
+    aggregate_darshan(TEST_DIR, str(full), jobs=2)
+    aggregate_darshan(TEST_DIR, str(sampled), jobs=2, sampling=DxtSampling(1))
+
+    for name in os.listdir(full):
+        if name.startswith("DXT_POSIX") or name.endswith(".json"):
+            continue
+        assert filecmp.cmp(full / name, sampled / name, shallow=False), name
+
+    segments = pd.read_csv(full / "DXT_POSIX_read_segments.csv")
+    sample = pd.read_csv(sampled / "DXT_POSIX_read_segments.csv")
+    totals = pd.read_csv(sampled / "DXT_POSIX_totals.csv")
+    assert not (full / "DXT_POSIX_totals.csv").exists()
+    assert len(sample) < len(segments)
+    assert sample['weight'].sum() == len(segments) == totals['read_segments'].sum()
+    assert np.allclose(totals['read_time'].sum(), (segments['end_time'] - segments['start_time']).sum())
+
+    with pytest.raises(ValueError):
+        aggregate_darshan(TEST_DIR, str(sampled), jobs=1, incremental=True)
+    aggregate_darshan(TEST_DIR, str(sampled), jobs=1, incremental=True, sampling=DxtSampling(1))
+
+def test_weighted_timeline():
+    full = LogCollection(read_log_files(LOGS[:6])).get_segment_store()
+    sampled = LogCollection(read_log_files(LOGS[:6], sampling=DxtSampling(1))).get_segment_store()
+    assert full.weight is None
+    assert len(sampled) < len(full)
+    assert sampled.timeline(60.0)['read_ops'].sum() == full.timeline(60.0)['read_ops'].sum()
+    assert sampled.window()['weight'].sum() == len(full)
+
+def test_sample_spec():
+    assert sample_spec("500") == ("reservoir", 500, 0)
+    assert sample_spec("time:20:3") == ("time", 20, 3)
+    for bad in ["time", "0", "random:10", "1:2:3"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            sample_spec(bad)
+    with pytest.raises(ValueError):
+        DxtSampling(10, "random")
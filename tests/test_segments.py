@@ -0,0 +1,73 @@
+import os
+import numpy as np
+import pytest
+from wfmeta_darshan import Log, LogCollection, SegmentStore
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def _random_store(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    start = rng.random(n) * 100
+    columns = {'start': start,
+               'end': start + rng.random(n) * 5 * (rng.random(n) > 0.1),
+               'offset': rng.integers(0, 1 << 20, n),
+               'length': rng.integers(1, 1000, n),
+               'op': rng.integers(0, 2, n).astype(np.int8),
+               'rank': rng.integers(0, 4, n).astype(np.int32),
+               'log': rng.integers(0, 3, n).astype(np.int32),
+               'file': rng.integers(0, 10, n).astype(np.int32)}
+    expected = {k: v.copy() for k, v in columns.items()}
+    return SegmentStore(columns, np.array([7, 8, 7]), np.arange(10, dtype=np.uint64) * 3), expected
+
+@pytest.mark.parametrize("t0,t1,jobid,file_id,op", [(10, 20, None, None, None),
+                                                    (None, 5, None, None, "write"),
+                                                    (50, None, 7, None, None),
+                                                    (30, 60, 8, 9, "read"),
+                                                    (None, None, None, 12, None)])
+def test_select_matches_scan(t0, t1, jobid, file_id, op):
+    store, seg = _random_store()
+    lo = -np.inf if t0 is None else t0
+    hi = np.inf if t1 is None else t1
+    mask = ((seg['end'] > lo) | (seg['start'] >= lo)) & (seg['start'] < hi)
+    if jobid is not None:
+        mask &= np.array([7, 8, 7])[seg['log']] == jobid
+    if file_id is not None:
+        mask &= seg['file'] * 3 == file_id
+    if op is not None:
+        mask &= seg['op'] == ["read", "write"].index(op)
+
+    window = store.window(t0, t1, jobid, file_id, op)
+    assert len(window) == mask.sum()
+    assert np.all(np.diff(window['start']) >= 0)
+    assert sorted(window['offset']) == sorted(seg['offset'][mask])
+
+def test_timeline_spreads_bytes():
+    store, seg = _random_store()
+    timeline = store.timeline(7.0)
+    assert np.isclose(timeline['read_bytes'].sum() + timeline['write_bytes'].sum(), seg['length'].sum())
+    assert timeline['read_ops'].sum() + timeline['write_ops'].sum() == len(seg['length'])
+    assert np.allclose(timeline['write_bandwidth'], timeline['write_bytes'] / 7.0)
+
+    # a segment over 4 whole bins puts a quarter of its bytes in each.
+    one = SegmentStore({'start': np.array([2.0]), 'end': np.array([6.0]), 'offset': np.array([0]),
+                        'length': np.array([400]), 'op': np.array([1], dtype=np.int8),
+                        'rank': np.array([0], dtype=np.int32), 'log': np.array([0], dtype=np.int32),
+                        'file': np.array([0], dtype=np.int32)}, np.array([1]), np.array([5], dtype=np.uint64))
+    assert list(one.timeline(1.0, 0.0, 8.0)['write_bytes']) == [0, 0, 100, 100, 100, 100, 0, 0]
+
+    with pytest.raises(ValueError):
+        store.timeline(0)
+
+def test_store_from_logs():
+    logs = [Log.From_File(os.path.join(TEST_DIR, f)) for f in sorted(os.listdir(TEST_DIR))[:6] if f.endswith(".darshan")]
+    store = LogCollection(logs).get_segment_store()
+    n_segments = sum(len(df) for l in logs if "DXT_POSIX" in l.loaded_modules
+                     for df in l.get_module_as_df("DXT_POSIX").values())
+    assert len(store) == n_segments
+    assert np.all(np.diff(store.start) >= 0)
+
+    log = next(l for l in logs if "DXT_POSIX" in l.loaded_modules)
+    job_start = log.metadata['job']['start_time_sec']
+    window = store.window(jobid=log.jobid)
+    assert len(window) > 0
+    assert (window['start'] >= job_start).all()
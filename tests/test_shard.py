@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from wfmeta_darshan import aggregate_darshan, collect_log_files, create_parser_and_run, merge_outputs
+from wfmeta_darshan.objs.discovery import LogDiscovery
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+N_SHARDS = 3
+
+def test_shards_are_disjoint_and_complete():
+    shards = [set(collect_log_files(TEST_DIR, discovery=LogDiscovery(shard=(i, N_SHARDS))))
+              for i in range(N_SHARDS)]
+    assert sum(len(s) for s in shards) == len(collect_log_files(TEST_DIR))
+    assert set.union(*shards) == set(collect_log_files(TEST_DIR))
+
+def _rows(path):
+    # the same rows, whatever order the shards wrote them in.
+    df = pd.read_csv(path, index_col=0, dtype=str, keep_default_na=False)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+def test_sharded_processes_merge_to_full_run(tmp_path, output_format):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(["src"] + [p for p in [env.get("PYTHONPATH")] if p])
+
+    partials = [str(tmp_path / ("shard-%i" % i)) for i in range(N_SHARDS)]
+    procs = []
+    for i, out in enumerate(partials):
+        os.makedirs(out)
+        procs.append(subprocess.Popen([sys.executable, "-m", "wfmeta_darshan", "aggregate",
+                                       "--shard", "%i/%i" % (i, N_SHARDS), "-j", "1", "-m", "POSIX,STDIO",
+                                       "-f", output_format, TEST_DIR, out], env=env))
+    assert [p.wait() for p in procs] == [0] * N_SHARDS
+
+    merged = tmp_path / "merged"
+    full = tmp_path / "full"
+    merged.mkdir()
+    full.mkdir()
+    merge_outputs(partials, str(merged))
+    aggregate_darshan(TEST_DIR, str(full), jobs=1, modules=["POSIX", "STDIO"], output_format=output_format)
+
+    if output_format == "csv":
+        # Only runs that read logs leave a run report.
+        assert sorted(os.listdir(merged)) == sorted(set(os.listdir(full)) - {"run_report.json"})
+        for name in os.listdir(full):
+            if name.endswith(".csv"):
+                pd.testing.assert_frame_equal(_rows(merged / name), _rows(full / name))
+    else:
+        import pyarrow.dataset as ds
+        for name in ["metadata", "POSIX_counters", "STDIO_fcounters"]:
+            m = ds.dataset(merged / name, partitioning="hive").to_table()
+            f = ds.dataset(full / name, partitioning="hive").to_table()
+            assert m.num_rows == f.num_rows
+            assert m.schema.names == f.schema.names
+            assert sorted(m["jobid"].to_pylist()) == sorted(f["jobid"].to_pylist())
+
+    # the merged manifest knows every log, so incremental runs can continue from it.
+    aggregate_darshan(TEST_DIR, str(merged), jobs=1, modules=["POSIX", "STDIO"],
+                      output_format=output_format, incremental=True)
+    if output_format == "csv":
+        pd.testing.assert_frame_equal(_rows(merged / "metadata.csv"), _rows(full / "metadata.csv"))
+
+def test_more_shards_than_logs(tmp_path):
+    log = collect_log_files(TEST_DIR)[0]
+    (tmp_path / "in").mkdir()
+    os.symlink(os.path.abspath(os.path.join(TEST_DIR, log)), tmp_path / "in" / log)
+
+    # every shard but one gets no log, and still leaves an output to merge.
+    partials = [str(tmp_path / ("shard-%i" % i)) for i in range(N_SHARDS)]
+    for i, out in enumerate(partials):
+        os.makedirs(out)
+        create_parser_and_run(["aggregate", "--shard", "%i/%i" % (i, N_SHARDS), "-j", "1", "-m", "POSIX",
+                               str(tmp_path / "in"), out])
+        assert os.path.exists(os.path.join(out, "manifest.json"))
+    assert sorted(len(os.listdir(out)) > 2 for out in partials) == [False] * (N_SHARDS - 1) + [True]
+
+    merged = tmp_path / "merged"
+    merged.mkdir()
+    merge_outputs(partials, str(merged))
+    assert len(pd.read_csv(merged / "metadata.csv", index_col=0)) == 1
+
+    # an input without any log is still an error, sharded or not.
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(SystemExit):
+        create_parser_and_run(["aggregate", "--shard", "0/2", str(tmp_path / "empty"), partials[0]])
@@ -0,0 +1,134 @@
+import os
+import filecmp
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+from concurrent.futures import Future
+from wfmeta_darshan import aggregate_darshan, Log, CSVWriter, SpillWriter, DxtSampling
+from wfmeta_darshan.objs.colls import DxtSpill, spilled_coll
+from wfmeta_darshan.pipeline import _bounded_map
+from wfmeta_darshan.objs.instrument import estimate_nbytes
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+
+def test_spilled_matches_unspilled(tmp_path):
+    plain = tmp_path / "plain"
+    spilled = tmp_path / "spilled"
+    plain.mkdir()
+    spilled.mkdir()
+
+    aggregate_darshan(TEST_DIR, str(plain), jobs=2, batch_size=5)
+    # A limit of one byte spills after every log.
+    aggregate_darshan(TEST_DIR, str(spilled), jobs=2, batch_size=5, memory_limit=1)
+
+    assert sorted(os.listdir(plain)) == sorted(os.listdir(spilled))
+    for name in os.listdir(plain):
+        if name in ("run_report.json", "manifest.json"):
+            continue
+        assert filecmp.cmp(plain / name, spilled / name, shallow=False), name
+
+    with open(spilled / "run_report.json") as f:
+        report = json.load(f)
+    assert report["spilled_bytes"] > 0
+    assert report["phases"]["spill_merge"]["calls"] > 0
+
+def test_spilled_dataset(tmp_path):
+    plain = tmp_path / "plain"
+    spilled = tmp_path / "spilled"
+    aggregate_darshan(TEST_DIR, str(plain), jobs=1, output_format="parquet", modules=["POSIX"])
+    aggregate_darshan(TEST_DIR, str(spilled), jobs=1, output_format="parquet", modules=["POSIX"],
+                      memory_limit=50000)
+
+    assert not any(p.name.startswith(".spill-") for p in spilled.iterdir())
+    for name in ["metadata", "POSIX_counters", "names", "rollup_file"]:
+        a = ds.dataset(plain / name, format="parquet", partitioning="hive").to_table().to_pandas().astype(str)
+        b = ds.dataset(spilled / name, format="parquet", partitioning="hive").to_table().to_pandas().astype(str)
+        a = a.sort_values(list(a.columns), ignore_index=True)
+        b = b.sort_values(list(b.columns), ignore_index=True)
+        pd.testing.assert_frame_equal(a, b)
+
+def test_spill_writer_drains_in_order(tmp_path):
+    spill = SpillWriter(str(tmp_path))
+    spill.write("t", pd.DataFrame({'a': [1, 2]}))
+    spill.write_arrow("empty", pa.table({}))
+    spill.write("t", pd.DataFrame({'a': [3]}))
+    assert spill.nbytes > 0
+
+    out = CSVWriter(str(tmp_path))
+    spill.drain(out)
+    spill.close()
+    out.close()
+    assert list(pd.read_csv(tmp_path / "t.csv", index_col=0)['a']) == [1, 2, 3]
+    assert (tmp_path / "empty.csv").exists()
+    assert not spill.spill_dir.exists()
+
+def test_estimate_nbytes():
+    df = pd.DataFrame({'n': range(1000), 'job': "a shared job key", 'id': [str(i) * 20 for i in range(1000)]},
+                      dtype=object).astype({'n': int})
+    estimate = estimate_nbytes(df)
+    exact = df.memory_usage(index=False, deep=True).sum()
+    # The shared key is only counted once, the rest close to exactly.
+    assert df.memory_usage(index=False, deep=False).sum() < estimate < exact
+    assert estimate > 0.8 * (exact - df['job'].memory_usage(index=False, deep=True))
+
+    log = Log.From_File(os.path.join(TEST_DIR, sorted(f for f in os.listdir(TEST_DIR) if f.endswith(".darshan"))[0]))
+    log.load()
+    assert log.nbytes() > 0
+
+def _dxt_tables(log):
+    return {name: pa.concat_tables(chunks, promote_options="permissive").to_pandas()
+            for name, chunks in log.get_module_as_arrow("DXT_POSIX").items()}
+
+@pytest.mark.parametrize("sampling", [None, DxtSampling(1, "reservoir")])
+def test_dxt_spilled_in_chunks(tmp_path, sampling):
+    most_chunks = 0
+    for name in sorted(f for f in os.listdir(TEST_DIR) if f.endswith(".darshan")):
+        path = os.path.join(TEST_DIR, name)
+        whole = Log.From_File(path, sampling=sampling)
+        whole.load()
+        if "DXT_POSIX" not in whole._colls:
+            continue
+        # A chunk of one byte spills after every record.
+        log = Log.From_File(path, sampling=sampling, spill=DxtSpill(str(tmp_path), 1))
+        log.load()
+        assert isinstance(log._colls["DXT_POSIX"], spilled_coll)
+        assert not isinstance(log._colls["POSIX"], spilled_coll)
+        most_chunks = max(most_chunks, *map(len, log._colls["DXT_POSIX"].files.values()))
+
+        expected = _dxt_tables(whole)
+        spilled = _dxt_tables(log)
+        assert sorted(expected) == sorted(spilled)
+        for table in expected:
+            pd.testing.assert_frame_equal(expected[table], spilled[table], check_dtype=False)
+
+        log.remove_spilled()
+        assert os.listdir(tmp_path) == []
+    assert most_chunks > 1
+
+def test_dxt_spill_chunks():
+    spill = DxtSpill("unused", 1000)
+    records = [{'read_count': n, 'write_count': 0} for n in [0, 1, 5, 0, 0]]
+    # 400, 800 | 2400 | 400, 400 bytes.
+    assert [len(c) for c in spill.chunks(records)] == [2, 1, 2]
+
+class _CountingPool:
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, arg):
+        self.submitted += 1
+        future = Future()
+        future.set_result(fn(arg))
+        return future
+
+def test_bounded_map_window():
+    pool = _CountingPool()
+    out = []
+    for result in _bounded_map(pool, lambda x: x * 2, list(range(10)), 3):
+        out.append(result)
+        # Never more than 3 submitted ahead of what has been consumed.
+        assert pool.submitted - len(out) <= 3
+    assert out == [x * 2 for x in range(10)]
+    assert pool.submitted == 10
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+import wfmeta_darshan
+
+HEAVY_MODULES = ["darshan", "pandas", "numpy", "pyarrow"]
+# `import wfmeta_darshan` (as timed by `python -X importtime`) may take
+#   this many times as long as starting a bare interpreter. Both slow
+#   down alike on a loaded machine; pandas alone takes over 20 times as long.
+IMPORT_BUDGET_STARTUPS = 8
+
+def _run(code, *args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(["src"] + sys.path))
+    result = subprocess.run([sys.executable, "-c", code, *args], env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()
+
+LOADED = "print('loaded:' + ','.join(m for m in %r if m in sys.modules))" % HEAVY_MODULES
+
+def _import_seconds():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(["src"] + sys.path))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import wfmeta_darshan"], env=env,
+                            capture_output=True, text=True, check=True)
+    # e.g. "import time:       368 |      23480 | wfmeta_darshan", in microseconds.
+    cumulative = [line.split("|")[1] for line in result.stderr.splitlines() if line.split("|")[-1].strip() == "wfmeta_darshan"]
+    return int(cumulative[0]) / 1e6
+
+def _startup_seconds():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+def test_import_time_budget():
+    code = "import sys, wfmeta_darshan; wfmeta_darshan.create_parser(); " + LOADED
+    assert _run(code)[-1] == "loaded:"
+
+    # Alternated, so both see the same load; the fastest of each counts.
+    imports, startups = [], []
+    for _ in range(5):
+        imports.append(_import_seconds())
+        startups.append(_startup_seconds())
+    assert min(imports) < IMPORT_BUDGET_STARTUPS * min(startups), (imports, startups)
+
+def test_help_and_empty_run_stay_light(tmp_path):
+    code = ("import sys\nfrom wfmeta_darshan import create_parser_and_run\n"
+            "try:\n    create_parser_and_run(sys.argv[1:])\nexcept SystemExit:\n    pass\n" + LOADED)
+    assert _run(code, "aggregate", "--help")[-1] == "loaded:"
+    assert _run(code, "inventory", "--help")[-1] == "loaded:"
+    # No logs to read: exits before loading the pipeline.
+    assert _run(code, str(tmp_path), str(tmp_path / "out"))[-1] == "loaded:"
+
+def test_lazy_exports():
+    from wfmeta_darshan import pipeline
+    from wfmeta_darshan.objs import log
+    assert wfmeta_darshan.aggregate_darshan is pipeline.aggregate_darshan
+    assert wfmeta_darshan.Log is log.Log
+    assert "SegmentStore" in dir(wfmeta_darshan)
+    for name in wfmeta_darshan.__all__:
+        assert getattr(wfmeta_darshan, name) is not None, name
+    with pytest.raises(AttributeError):
+        wfmeta_darshan.not_a_function
+
+def test_legacy_command_line():
+    from wfmeta_darshan.cli import create_parser, parse_args
+    args = parse_args(create_parser(), ["-j", "2", "logs", "out"])
+    assert args.command == "aggregate"
+    assert (args.input, args.output, args.jobs) == ("logs", "out", 2)
@@ -0,0 +1,68 @@
+import os
+import filecmp
+import pandas as pd
+import pytest
+from wfmeta_darshan import aggregate_darshan, CSVWriter
+
+def test_batched_matches_single_batch(tmp_path):
+    test_data_dir = "tests/test_data/ImageProcessing1"
+    single = tmp_path / "single"
+    batched = tmp_path / "batched"
+    single.mkdir()
+    batched.mkdir()
+
+    aggregate_darshan(test_data_dir, str(single), jobs=1)
+    aggregate_darshan(test_data_dir, str(batched), jobs=2, batch_size=4)
+
+    for name in ["metadata.csv", "POSIX_counters.csv", "POSIX_fcounters.csv",
+                 "STDIO_counters.csv", "DXT_POSIX_read_segments.csv",
+                 "DXT_POSIX_write_segments.csv"]:
+        assert filecmp.cmp(single / name, batched / name, shallow=False), name
+
+    assert sorted(os.listdir(single)) == sorted(os.listdir(batched))
+
+def test_pipeline_depth_and_write_jobs(tmp_path):
+    test_data_dir = "tests/test_data/ImageProcessing1"
+    serial = tmp_path / "serial"
+    overlapped = tmp_path / "overlapped"
+    serial.mkdir()
+    overlapped.mkdir()
+
+    aggregate_darshan(test_data_dir, str(serial), jobs=1, batch_size=3, write_jobs=1, queue_depth=0)
+    aggregate_darshan(test_data_dir, str(overlapped), jobs=1, batch_size=3, write_jobs=8, queue_depth=3)
+
+    assert sorted(os.listdir(serial)) == sorted(os.listdir(overlapped))
+    for name in os.listdir(serial):
+        if name == "run_report.json":
+            # Timings differ from run to run.
+            continue
+        assert filecmp.cmp(serial / name, overlapped / name, shallow=False), name
+
+def test_pipeline_write_errors_propagate(tmp_path, monkeypatch):
+    def fail(self, name, table):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(CSVWriter, "write_arrow", fail)
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        aggregate_darshan("tests/test_data/ImageProcessing1", str(tmp_path), jobs=1, batch_size=2)
+
+def test_batches_with_different_columns(tmp_path):
+    writer = CSVWriter(str(tmp_path))
+    writer.write("t", pd.DataFrame({'a': [1], 'b': [2]}))
+    writer.write("t", pd.DataFrame({'b': [3], 'c': [4], 'a': [5]}))
+    writer.write("t", pd.DataFrame({'a': [6]}))
+
+    df = pd.read_csv(tmp_path / "t.csv", index_col=0)
+    assert list(df.columns) == ['a', 'b', 'c']
+    assert list(df['a']) == [1, 5, 6]
+    assert list(df['b'].fillna(-1)) == [2, 3, -1]
+    assert list(df['c'].fillna(-1)) == [-1, 4, -1]
+
+    # A later writer picks the columns up from the file.
+    resumed = CSVWriter(str(tmp_path))
+    resumed.resume(writer.state())
+    resumed.write("t", pd.DataFrame({'d': [7], 'a': [8]}))
+    df = pd.read_csv(tmp_path / "t.csv", index_col=0)
+    assert list(df.columns) == ['a', 'b', 'c', 'd']
+    assert list(df['a']) == [1, 5, 6, 8]
+    assert list(df.index) == [0, 1, 2, 3]
@@ -0,0 +1,130 @@
+import os
+import json
+import filecmp
+import shutil
+import threading
+import time
+import pandas as pd
+import pytest
+from wfmeta_darshan import aggregate_darshan, watch_darshan, LogWatcher, Manifest, CSVWriter, DatasetWriter
+
+TEST_DIR = "tests/test_data/ImageProcessing1"
+LOGS = sorted(f for f in os.listdir(TEST_DIR) if f.endswith(".darshan"))
+
+def _copy_logs(dest, names, age=60):
+    dest.mkdir(exist_ok=True)
+    for name in names:
+        shutil.copy(os.path.join(TEST_DIR, name), dest / name)
+        # Written a while ago, so already settled.
+        past = time.time() - age
+        os.utime(dest / name, (past, past))
+
+def test_watch_matches_aggregate(tmp_path):
+    _copy_logs(tmp_path / "in", LOGS[:8])
+    aggregate_darshan(str(tmp_path / "in"), str(tmp_path / "aggregated"), jobs=1, batch_size=3)
+    metrics = watch_darshan(str(tmp_path / "in"), str(tmp_path / "watched"), jobs=2, batch_size=3, polls=1)
+
+    assert metrics.ingested == 8
+    assert metrics.batches == 3
+    for name in os.listdir(tmp_path / "aggregated"):
+        if name.endswith(".json"):
+            continue
+        assert filecmp.cmp(tmp_path / "aggregated" / name, tmp_path / "watched" / name, shallow=False), name
+
+def test_watch_picks_up_completed_logs(tmp_path):
+    watched = tmp_path / "in"
+    _copy_logs(watched, LOGS[:2])
+    out = tmp_path / "out"
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_darshan, args=(str(watched), str(out)),
+                              kwargs={'jobs': 1, 'interval': 0.05, 'settle': 0.2, 'stop': stop})
+    thread.start()
+    try:
+        # Darshan writes to .darshan_partial, then renames the finished log.
+        shutil.copy(os.path.join(TEST_DIR, LOGS[2]), watched / (LOGS[2] + "_partial"))
+        time.sleep(0.5)
+        os.rename(watched / (LOGS[2] + "_partial"), watched / LOGS[2])
+
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            if (out / "manifest.json").exists() and len(Manifest.Open(str(out)).logs) == 3:
+                break
+            time.sleep(0.1)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert len(Manifest.Open(str(out)).logs) == 3
+    with open(out / "watch_metrics.json") as f:
+        metrics = json.load(f)
+    assert metrics["ingested"] == 3
+    assert metrics["backlog"] == 0
+    assert 0 < metrics["latency_seconds"]["p50"] < 60 + 30
+
+    expected = tmp_path / "expected"
+    aggregate_darshan(str(watched), str(expected), jobs=1)
+    assert len(pd.read_csv(out / "POSIX_counters.csv")) == len(pd.read_csv(expected / "POSIX_counters.csv"))
+
+def test_watcher_waits_for_logs_to_settle(tmp_path):
+    _copy_logs(tmp_path, LOGS[:1])
+    shutil.copy(os.path.join(TEST_DIR, LOGS[1]), tmp_path / LOGS[1])
+    shutil.copy(os.path.join(TEST_DIR, LOGS[2]), tmp_path / (LOGS[2] + "_partial"))
+
+    watcher = LogWatcher(str(tmp_path), settle=30)
+    assert watcher.poll() == [str(tmp_path / LOGS[0])]
+    assert list(watcher.pending) == [str(tmp_path / LOGS[1])]
+    # Handed out only once.
+    assert watcher.poll() == []
+
+    watcher.failed(str(tmp_path / LOGS[0]))
+    assert watcher.poll() == []
+    os.utime(tmp_path / LOGS[0], (time.time() - 120, time.time() - 120))
+    assert watcher.poll() == [str(tmp_path / LOGS[0])]
+
+    with pytest.raises(ValueError):
+        LogWatcher(str(tmp_path), watcher.discovery.__class__(partial=True))
+
+def test_watch_skips_bad_logs(tmp_path):
+    _copy_logs(tmp_path / "in", LOGS[:2])
+    bad = tmp_path / "in" / "bad_id1-1_1-1-1-1_1.darshan"
+    bad.write_bytes(os.urandom(4096))
+    os.utime(bad, (time.time() - 60, time.time() - 60))
+
+    metrics = watch_darshan(str(tmp_path / "in"), str(tmp_path / "out"), jobs=2, polls=2, interval=0)
+    assert metrics.ingested == 2
+    assert metrics.failed == 1
+    assert len(Manifest.Open(str(tmp_path / "out")).logs) == 2
+
+def test_uncommitted_batch_is_rolled_back(tmp_path):
+    _copy_logs(tmp_path / "in", LOGS[:2])
+    out = tmp_path / "out"
+    watch_darshan(str(tmp_path / "in"), str(out), jobs=1, polls=1)
+    before = pd.read_csv(out / "POSIX_counters.csv", index_col=0)
+
+    # A batch that died halfway through its writes.
+    manifest = Manifest.Open(str(out))
+    writer = CSVWriter(str(out))
+    writer.resume(manifest.tables)
+    manifest.begin(writer.state())
+    writer.write("POSIX_counters", before.head(5).copy())
+    writer.write("extra", pd.DataFrame({'a': [1]}))
+
+    _copy_logs(tmp_path / "in", LOGS[2:3])
+    watch_darshan(str(tmp_path / "in"), str(out), jobs=1, polls=1)
+    assert not (out / "extra.csv").exists()
+    assert Manifest.Open(str(out)).uncommitted is None
+
+    expected = tmp_path / "expected"
+    aggregate_darshan(str(tmp_path / "in"), str(expected), jobs=1)
+    assert filecmp.cmp(expected / "POSIX_counters.csv", out / "POSIX_counters.csv", shallow=False)
+
+def test_dataset_rollback(tmp_path):
+    writer = DatasetWriter(str(tmp_path))
+    writer.write("t", pd.DataFrame({'jobid': [1, 2], 'a': [1, 2]}))
+    state = writer.state()
+    writer.write("t", pd.DataFrame({'jobid': [2, 3], 'a': [3, 4]}))
+    writer.write("u", pd.DataFrame({'jobid': [1], 'a': [5]}))
+
+    DatasetWriter(str(tmp_path)).rollback(state)
+    assert sorted(writer.read("t", ['a'])['a']) == [1, 2]
+    assert not (tmp_path / "u").exists()